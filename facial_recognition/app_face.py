@@ -1,13 +1,11 @@
 import streamlit as st
 from streamlit_webrtc import webrtc_streamer, VideoTransformerBase
 import cv2
-import numpy as np
 from mtcnn import MTCNN
-from deepface import DeepFace
-from scipy.spatial.distance import cosine
 from pathlib import Path
 from datetime import datetime
-import os
+
+from embedding_store import EmbeddingStore, get_embedder
 
 # -----------------------------
 # Config
@@ -22,16 +20,21 @@ recognition_smooth_frames = 3
 # -----------------------------
 # Load known embeddings
 # -----------------------------
-known_embeddings = []
-known_names = []
-
-for file in os.listdir(db_path):
-    if file.lower().endswith((".jpg", ".png", ".jpeg")):
-        img_path = str(db_path / file)
-        emb = DeepFace.represent(img_path=img_path, model_name="VGG-Face", enforce_detection=True)[0]["embedding"]
-        emb = emb / np.linalg.norm(emb)
-        known_embeddings.append(emb)
-        known_names.append(file.split(".")[0])
+# Cached in faces/.embeddings; only new or changed images are embedded.
+# Built once per server process rather than on every Streamlit rerun, so
+# faces enrolled while the app runs show up after a restart.
+@st.cache_resource
+def load_known_faces():
+    embedding_store = EmbeddingStore(db_path, model_name="VGG-Face")
+    known_index = embedding_store.load_index()
+    for skipped in embedding_store.skipped():
+        print(f"No face found in {skipped}, skipping")
+    return known_index
+
+
+known_index = load_known_faces()
+# The model the enrollment images were embedded with, for the live faces.
+embedder = get_embedder("VGG-Face")
 
 # -----------------------------
 # Helper: IoU
@@ -66,6 +69,7 @@ class FaceRecognizer(VideoTransformerBase):
         rgb_frame = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         detections = self.detector.detect_faces(rgb_frame)
 
+        boxes, crops = [], []
         for face in detections:
             if face.get("confidence", 0) < confidence_threshold:
                 continue
@@ -76,19 +80,13 @@ class FaceRecognizer(VideoTransformerBase):
             face_img = img[y1:y2, x1:x2]
             if face_img.size == 0:
                 continue
-            face_img_rgb = cv2.cvtColor(cv2.resize(face_img, (224, 224)), cv2.COLOR_BGR2RGB)
-            emb = DeepFace.represent(img_path=face_img_rgb, model_name="VGG-Face", enforce_detection=False)[0]["embedding"]
-            emb = emb / np.linalg.norm(emb)
-
-            # Compare with known faces
-            if known_embeddings:
-                distances = [cosine(emb, k_emb) for k_emb in known_embeddings]
-                min_idx = int(np.argmin(distances))
-                min_dist = float(distances[min_idx])
-                name = known_names[min_idx] if min_dist < cosine_threshold else "Unknown"
-            else:
-                name = "Unknown"
+            boxes.append((x1, y1, x2, y2))
+            crops.append(face_img)
 
+        # Embed every face in the frame in one model call and compare them
+        # with known faces at once
+        matches = known_index.match(embedder.embed(crops), cosine_threshold) if crops else []
+        for (x1, y1, x2, y2), (name, _) in zip(boxes, matches):
             # Add attendance
             if name != "Unknown" and name not in self.attendance:
                 self.attendance[name] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -1,12 +1,24 @@
+import argparse
+import queue
+import threading
+import time
 import cv2
-import os
-import numpy as np
 from mtcnn import MTCNN
-from deepface import DeepFace
 from pathlib import Path
-from scipy.spatial.distance import cosine
 from datetime import datetime
 
+from embedding_store import EmbeddingStore, get_embedder
+from pipeline import (
+    DropQueue,
+    StageStats,
+    drain,
+    get_until,
+    put_until,
+    raise_failed,
+    report,
+    start_stage,
+)
+
 # -----------------------------
 # Configuration
 # -----------------------------
@@ -20,6 +32,15 @@ recognition_smooth_frames = 3
 iou_threshold = 0.3
 remove_iou_threshold = 0.20
 unknown_drop_frames = 3
+# Queue sizes between stages. Frames waiting for tracking or display are
+# replaced by newer ones; a detection request waits for the detector to be
+# free, or is skipped; faces waiting to be embedded are dropped past the
+# limit (their trackers are embedded again on the next refresh).
+frame_queue_size = 2
+detect_queue_size = 1
+embed_queue_size = 64
+render_queue_size = 2
+max_embed_batch = 32
 
 
 # -----------------------------
@@ -39,127 +60,45 @@ def iou(boxA, boxB):
 
 
 # -----------------------------
-# Load known embeddings
+# Stage: capture
 # -----------------------------
-known_embeddings = []
-known_names = []
-
-for file in os.listdir(db_path):
-    if file.lower().endswith((".jpg", ".png", ".jpeg")):
-        img_path = str(db_path / file)
-        emb = DeepFace.represent(
-            img_path=img_path, model_name="VGG-Face", enforce_detection=True
-        )[0]["embedding"]
-        emb = emb / np.linalg.norm(emb)
-        known_embeddings.append(emb)
-        known_names.append(os.path.splitext(file)[0])
+def capture_stage(cap, frames, stop, stats, drop):
+    # Reads frames as fast as the source gives them. A camera (or a file
+    # read with drop=True) never waits for tracking: a full queue loses its
+    # oldest frame. With drop=False every frame of a file is processed.
+    frame_id = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        ret, frame = cap.read()
+        if not ret:
+            break
+        stats.record(time.perf_counter() - start)
+        frame_id += 1
+        item = (frame_id, start, frame)
+        if drop:
+            frames.offer(item)
+        else:
+            put_until(frames, item, stop)
+    put_until(frames, None, stop)
 
-print("Loaded embeddings for:", known_names)
 
 # -----------------------------
-# Initialize
+# Stage: detection
 # -----------------------------
-attendance = set()  # keep only names seen once
-trackers = []
-frame_count = 0
-cap = cv2.VideoCapture(0)
-detector = MTCNN()
-print("Starting camera... Press 'q' to quit.")
-
-# -----------------------------
-# Main loop
-# -----------------------------
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    frame_count += 1
-    h_frame, w_frame = frame.shape[:2]
-    updated_trackers = []
-
-    # --- Update trackers ---
-    for t in trackers:
-        success, bbox = t["tracker"].update(frame)
-        if success:
-            x, y, w, h = [int(v) for v in bbox]
-            x1, y1 = max(0, x), max(0, y)
-            x2, y2 = min(x + w, w_frame), min(y + h, h_frame)
-            if x2 - x1 <= 0 or y2 - y1 <= 0:
-                t["missed_frames"] += 1
-                if t["missed_frames"] < max_missed_frames:
-                    updated_trackers.append(t)
-                continue
-
-            t["bbox"] = (x1, y1, x2 - x1, y2 - y1)
-            t["missed_frames"] = 0
-
-            # recompute embedding periodically
-            if frame_count % embedding_refresh_interval == 0:
-                face_img = frame[y1:y2, x1:x2]
-                if face_img.size > 0:
-                    face_img = cv2.resize(face_img, (224, 224))
-                    face_img_rgb = cv2.cvtColor(face_img, cv2.COLOR_BGR2RGB)
-                    emb = DeepFace.represent(
-                        img_path=face_img_rgb,
-                        model_name="VGG-Face",
-                        enforce_detection=False,
-                    )[0]["embedding"]
-                    t["embedding"] = emb / np.linalg.norm(emb)
-
-            # compare to known faces
-            distances = [cosine(t["embedding"], k_emb) for k_emb in known_embeddings]
-            min_idx = int(np.argmin(distances))
-            min_dist = float(distances[min_idx])
-            candidate = (
-                known_names[min_idx] if min_dist < cosine_threshold else "Unknown"
-            )
-
-            if candidate != t.get("last_candidate", "Unknown"):
-                t["consecutive_frames"] = 1
-                t["last_candidate"] = candidate
-            else:
-                t["consecutive_frames"] = t.get("consecutive_frames", 0) + 1
-
-            # confirm recognition
-            if t["consecutive_frames"] >= recognition_smooth_frames:
-                prev_name = t.get("name", "Unknown")
-                if prev_name != candidate:
-                    t["name"] = candidate
-                    if candidate != "Unknown" and candidate not in attendance:
-                        attendance.add(candidate)
-                        print(
-                            f"[ATTENDANCE] {candidate} recognized at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-                        )
-
-            color = (
-                (0, 255, 0) if t.get("name", "Unknown") != "Unknown" else (0, 255, 255)
-            )
-            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-            cv2.putText(
-                frame,
-                t.get("name", "Unknown"),
-                (x1, y1 - 10),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.8,
-                color,
-                2,
-            )
-
-            updated_trackers.append(t)
-        else:
-            t["missed_frames"] += 1
-            if t["missed_frames"] < max_missed_frames:
-                updated_trackers.append(t)
-
-    trackers = updated_trackers
-
-    # --- Run face detection every N frames ---
-    if frame_count % detect_interval == 0:
+def detect_stage(detector, jobs, results, stop, stats):
+    # MTCNN on the frames tracking hands over; returns the accepted boxes
+    # with a crop of each, cut from the frame they were found in.
+    while True:
+        job = get_until(jobs, stop)
+        if job is None:
+            return
+        frame_id, frame = job
+        start = time.perf_counter()
+        h_frame, w_frame = frame.shape[:2]
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         detections = detector.detect_faces(rgb_frame)
 
-        det_boxes = []
+        faces = []
         for face in detections:
             if face.get("confidence", 0) < confidence_threshold:
                 continue
@@ -169,13 +108,70 @@ while True:
             ww, hh = x2 - x1, y2 - y1
             if ww <= 0 or hh <= 0 or ww < 40 or hh < 40:
                 continue
-            det_boxes.append((x1, y1, ww, hh))
+            faces.append(((x1, y1, ww, hh), frame[y1:y2, x1:x2]))
+        stats.record(time.perf_counter() - start)
+        results.put((frame_id, faces))
+
+
+# -----------------------------
+# Stage: embedding
+# -----------------------------
+def embed_stage(embedder, index, jobs, results, stop, stats):
+    # Embeds every face waiting at once and matches the batch against the
+    # known faces.
+    while True:
+        job = get_until(jobs, stop)
+        if job is None:
+            return
+        batch = [job] + drain(jobs, max_embed_batch - 1)
+        start = time.perf_counter()
+        embeddings = embedder.embed([crop for _, crop in batch])
+        matches = index.match(embeddings, cosine_threshold)
+        stats.record(time.perf_counter() - start, items=len(batch))
+        results.put(
+            [
+                (tracker_id, emb, candidate)
+                for (tracker_id, _), emb, (candidate, _) in zip(batch, embeddings, matches)
+            ]
+        )
+
+
+# -----------------------------
+# Stage: tracking
+# -----------------------------
+class AttendanceTracker:
+    # CSRT trackers, recognition smoothing and attendance. Only the
+    # tracking thread touches this; detection and embedding results come
+    # back through queues and are applied at the start of the next frame.
+    # By then tracking has moved on, so a detection result is applied to
+    # the frame it was found in: new trackers start on that frame (and
+    # are carried to the current one by the next update), and trackers are
+    # compared by where they were on it.
+    def __init__(self, detect_jobs, detect_results, embed_jobs, embed_results, draw=True):
+        self.detect_jobs = detect_jobs
+        self.detect_results = detect_results
+        self.embed_jobs = embed_jobs
+        self.embed_results = embed_results
+        self.draw = draw
+        self.attendance = set()  # keep only names seen once
+        self.trackers = []
+        self.frame_count = 0
+        self.next_id = 0
+        # frame_id -> (frame, {tracker id: bbox on that frame}) for the
+        # frames the detector is working on.
+        self.pending_detections = {}
+
+    def apply_detections(self, frame, boxes, faces):
+        # frame and boxes are the detected frame and each tracker's bbox on
+        # it; trackers started after it was handed over are kept as they are.
+        det_boxes = [box for box, _ in faces]
 
         # remove inactive trackers
         kept = []
-        for t in trackers:
-            bbox_t = t.get("bbox")
+        for t in self.trackers:
+            bbox_t = boxes.get(t["id"])
             if bbox_t is None:
+                kept.append(t)
                 continue
             if len(det_boxes) == 0:
                 kept.append(t)
@@ -192,72 +188,280 @@ while True:
                 continue
             kept.append(t)
 
-        trackers = kept
+        self.trackers = kept
 
         # add new trackers for new detections
-        for db in det_boxes:
+        for db, face_img in faces:
             duplicate = any(
-                "bbox" in t and iou(t["bbox"], db) > iou_threshold for t in trackers
+                iou(boxes.get(t["id"], t["bbox"]), db) > iou_threshold for t in self.trackers
             )
             if duplicate:
                 continue
 
-            x1, y1, w1, h1 = db
-            face_img = frame[y1 : y1 + h1, x1 : x1 + w1]
-            if face_img.size == 0:
-                continue
-            face_img = cv2.resize(face_img, (224, 224))
-            face_img_rgb = cv2.cvtColor(face_img, cv2.COLOR_BGR2RGB)
-
-            emb = DeepFace.represent(
-                img_path=face_img_rgb, model_name="VGG-Face", enforce_detection=False
-            )[0]["embedding"]
-            emb = emb / np.linalg.norm(emb)
-
-            distances = (
-                [cosine(emb, k_emb) for k_emb in known_embeddings]
-                if known_embeddings
-                else [1.0]
-            )
-            min_idx = int(np.argmin(distances)) if distances else 0
-            min_dist = float(distances[min_idx]) if distances else 1.0
-            name = known_names[min_idx] if min_dist < cosine_threshold else "Unknown"
-
             tracker = cv2.legacy.TrackerCSRT_create()
-            tracker.init(frame, (x1, y1, w1, h1))
-            trackers.append(
+            tracker.init(frame, db)
+            self.next_id += 1
+            self.trackers.append(
                 {
+                    "id": self.next_id,
                     "tracker": tracker,
                     "name": "Unknown",
-                    "embedding": emb,
                     "missed_frames": 0,
-                    "bbox": (x1, y1, w1, h1),
-                    "last_candidate": name,
-                    "consecutive_frames": 1,
+                    "bbox": db,
                     "unknown_count": 0,
                 }
             )
+            self.embed_jobs.offer((self.next_id, face_img))
+
+    def apply_embeddings(self, results):
+        by_id = {t["id"]: t for t in self.trackers}
+        for tracker_id, emb, candidate in results:
+            t = by_id.get(tracker_id)
+            if t is not None:
+                t["embedding"] = emb
+                t["candidate"] = candidate
+
+    def process(self, frame_id, frame):
+        for detected_id, faces in drain(self.detect_results):
+            detected_frame, boxes = self.pending_detections.pop(detected_id)
+            self.apply_detections(detected_frame, boxes, faces)
+        for results in drain(self.embed_results):
+            self.apply_embeddings(results)
+
+        self.frame_count += 1
+        h_frame, w_frame = frame.shape[:2]
+        updated_trackers = []
+        visible = []
+
+        # --- Update trackers ---
+        for t in self.trackers:
+            success, bbox = t["tracker"].update(frame)
+            if success:
+                x, y, w, h = [int(v) for v in bbox]
+                x1, y1 = max(0, x), max(0, y)
+                x2, y2 = min(x + w, w_frame), min(y + h, h_frame)
+                if x2 - x1 <= 0 or y2 - y1 <= 0:
+                    t["missed_frames"] += 1
+                    if t["missed_frames"] < max_missed_frames:
+                        updated_trackers.append(t)
+                    continue
+
+                t["bbox"] = (x1, y1, x2 - x1, y2 - y1)
+                t["missed_frames"] = 0
+
+                # recompute embedding periodically
+                if self.frame_count % embedding_refresh_interval == 0:
+                    face_img = frame[y1:y2, x1:x2]
+                    if face_img.size > 0:
+                        self.embed_jobs.offer((t["id"], face_img))
+
+                visible.append(t)
+                updated_trackers.append(t)
+            else:
+                t["missed_frames"] += 1
+                if t["missed_frames"] < max_missed_frames:
+                    updated_trackers.append(t)
 
-    # --- UI ---
-    if len(trackers) == 0:
-        cv2.putText(
-            frame,
-            "No face detected",
-            (50, 50),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            1,
-            (0, 0, 255),
-            2,
-        )
+        self.trackers = updated_trackers
+
+        # --- Hand every Nth frame to the detector, unless it is still busy ---
+        if self.frame_count % detect_interval == 0:
+            if self.detect_jobs.offer((frame_id, frame)):
+                self.pending_detections[frame_id] = (
+                    frame,
+                    {t["id"]: t["bbox"] for t in self.trackers},
+                )
+
+        # --- Smooth the latest match of each visible face ---
+        for t in visible:
+            candidate = t.get("candidate")
+            if candidate is None:
+                continue
+            if candidate != t.get("last_candidate", "Unknown"):
+                t["consecutive_frames"] = 1
+                t["last_candidate"] = candidate
+            else:
+                t["consecutive_frames"] = t.get("consecutive_frames", 0) + 1
+
+            # confirm recognition
+            if t["consecutive_frames"] >= recognition_smooth_frames:
+                prev_name = t.get("name", "Unknown")
+                if prev_name != candidate:
+                    t["name"] = candidate
+                    if candidate != "Unknown" and candidate not in self.attendance:
+                        self.attendance.add(candidate)
+                        print(
+                            f"[ATTENDANCE] {candidate} recognized at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+                        )
+
+        if not self.draw:
+            return frame
+        # Drawn on a copy: the detector may still be reading this frame.
+        frame = frame.copy()
+        for t in visible:
+            x1, y1, w, h = t["bbox"]
+            color = (
+                (0, 255, 0) if t.get("name", "Unknown") != "Unknown" else (0, 255, 255)
+            )
+            cv2.rectangle(frame, (x1, y1), (x1 + w, y1 + h), color, 2)
+            cv2.putText(
+                frame,
+                t.get("name", "Unknown"),
+                (x1, y1 - 10),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.8,
+                color,
+                2,
+            )
+
+        # --- UI ---
+        if len(self.trackers) == 0:
+            cv2.putText(
+                frame,
+                "No face detected",
+                (50, 50),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                1,
+                (0, 0, 255),
+                2,
+            )
+        return frame
 
-    cv2.imshow("Face Recognition Attendance System", frame)
-    if cv2.waitKey(1) & 0xFF == ord("q"):
-        break
 
-# cleanup
-cap.release()
-cv2.destroyAllWindows()
+def track_stage(attendance_tracker, frames, rendered, stop, stats):
+    while True:
+        item = get_until(frames, stop)
+        if item is None:
+            break
+        frame_id, captured_at, frame = item
+        start = time.perf_counter()
+        frame = attendance_tracker.process(frame_id, frame)
+        stats.record(time.perf_counter() - start)
+        rendered.offer((frame_id, captured_at, frame))
+    put_until(rendered, None, stop)
 
-print("\nFinal attendance:")
-for name in attendance:
-    print(f"- {name}")
+
+# -----------------------------
+# Main
+# -----------------------------
+def run(source, headless=False, drop=True, max_frames=None):
+    # Runs capture, tracking, detection and embedding on their own threads;
+    # this thread shows the annotated frames, or in headless mode only
+    # counts them. Returns the attendance set.
+    embedding_store = EmbeddingStore(db_path, model_name="VGG-Face")
+    known_index = embedding_store.load_index()
+    for skipped in embedding_store.skipped():
+        print(f"No face found in {skipped}, skipping")
+    print(f"Loaded embeddings for {len(known_index)} faces")
+
+    stats = {
+        name: StageStats(name)
+        for name in ["capture", "track", "detect", "embed", "render", "end-to-end"]
+    }
+    frames = DropQueue(frame_queue_size, stats["capture"])
+    detect_jobs = DropQueue(detect_queue_size, stats["detect"], drop_oldest=False)
+    embed_jobs = DropQueue(embed_queue_size, stats["embed"], drop_oldest=False)
+    rendered = DropQueue(render_queue_size, stats["render"])
+    detect_results = queue.Queue()
+    embed_results = queue.Queue()
+    stop = threading.Event()
+
+    cap = cv2.VideoCapture(source)
+    attendance_tracker = AttendanceTracker(
+        detect_jobs, detect_results, embed_jobs, embed_results, draw=not headless
+    )
+    detector = MTCNN()
+    # The model the enrollment images were embedded with.
+    embedder = get_embedder("VGG-Face")
+    embedder.max_batch = max_embed_batch
+    print("Running headless..." if headless else "Starting camera... Press 'q' to quit.")
+    started = time.perf_counter()
+    threads = [
+        start_stage(
+            "capture", capture_stage, (cap, frames, stop, stats["capture"], drop), stop
+        ),
+        start_stage(
+            "track",
+            track_stage,
+            (attendance_tracker, frames, rendered, stop, stats["track"]),
+            stop,
+        ),
+        start_stage(
+            "detect",
+            detect_stage,
+            (detector, detect_jobs, detect_results, stop, stats["detect"]),
+            stop,
+        ),
+        start_stage(
+            "embed",
+            embed_stage,
+            (embedder, known_index, embed_jobs, embed_results, stop, stats["embed"]),
+            stop,
+        ),
+    ]
+
+    try:
+        while True:
+            item = get_until(rendered, stop)
+            if item is None:
+                break
+            _, captured_at, frame = item
+            start = time.perf_counter()
+            if not headless:
+                cv2.imshow("Face Recognition Attendance System", frame)
+                if cv2.waitKey(1) & 0xFF == ord("q"):
+                    break
+            now = time.perf_counter()
+            stats["render"].record(now - start)
+            stats["end-to-end"].record(now - captured_at)
+            if max_frames and stats["track"].count >= max_frames:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        elapsed = time.perf_counter() - started
+        stop.set()
+        for thread in threads:
+            thread.join()
+        # cleanup
+        cap.release()
+        if not headless:
+            cv2.destroyAllWindows()
+    # A failed stage ends the run with its exception rather than a report.
+    raise_failed(threads)
+
+    print()
+    for line in report(stats.values(), stats["track"].count, elapsed):
+        print(line)
+    return attendance_tracker.attendance
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Face recognition attendance.")
+    parser.add_argument("--video", help="Video file to read instead of the camera")
+    parser.add_argument("--camera", type=int, default=0)
+    parser.add_argument(
+        "--headless", action="store_true", help="No window; print throughput and stage latencies"
+    )
+    parser.add_argument(
+        "--no-drop",
+        action="store_true",
+        help="Process every frame of a video file instead of keeping up in real time",
+    )
+    parser.add_argument("--max-frames", type=int)
+    args = parser.parse_args()
+
+    attendance = run(
+        args.video if args.video else args.camera,
+        headless=args.headless,
+        drop=not (args.no_drop and args.video),
+        max_frames=args.max_frames,
+    )
+
+    print("\nFinal attendance:")
+    for name in attendance:
+        print(f"- {name}")
+
+
+if __name__ == "__main__":
+    main()
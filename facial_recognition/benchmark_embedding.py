@@ -0,0 +1,74 @@
+import argparse
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from face_embedder import FaceEmbedder
+
+test_faces = Path(__file__).parent / "test_faces"
+
+
+def sample_crops(count, seed=0):
+    # Face-sized BGR crops cut at random from the test images, like the
+    # boxes a detector hands over, in varying sizes.
+    rng = np.random.default_rng(seed)
+    images = [cv2.imread(str(path)) for path in sorted(test_faces.glob("*.jpg"))]
+    crops = []
+    for i in range(count):
+        img = images[i % len(images)]
+        h, w = img.shape[:2]
+        size = int(rng.integers(min(h, w) // 3, min(h, w) + 1))
+        y, x = int(rng.integers(0, h - size + 1)), int(rng.integers(0, w - size + 1))
+        crops.append(img[y : y + size, x : x + size])
+    return crops
+
+
+def per_face(crops, model_name):
+    # The old approach: DeepFace.represent once per crop.
+    from deepface import DeepFace
+
+    for crop in crops:
+        face = cv2.cvtColor(cv2.resize(crop, (224, 224)), cv2.COLOR_BGR2RGB)
+        DeepFace.represent(img_path=face, model_name=model_name, enforce_detection=False)
+
+
+def timed(run, faces, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return faces / best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Faces embedded per second by batch size, against one DeepFace.represent call per face."
+    )
+    parser.add_argument("--model", default="VGG-Face")
+    parser.add_argument("--faces", type=int, default=64)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    crops = sample_crops(args.faces)
+    embedder = FaceEmbedder(model_name=args.model)
+    # First calls build the model's graph; keep them out of the timings.
+    embedder.embed(crops[:1])
+    per_face(crops[:1], args.model)
+    print(f"{args.model}, {args.faces} faces, best of {args.repeat}\n")
+    print(f"  {'batch':>5}  {'faces/s':>9}  {'ms/face':>8}  {'speedup':>7}")
+
+    before = timed(lambda: per_face(crops, args.model), len(crops), args.repeat)
+    print(f"  {'old':>5}  {before:9.1f}  {1000 / before:8.2f}  {1:7.2f}x   DeepFace.represent per face")
+    for batch in args.batch_sizes:
+        embedder.max_batch = batch
+        embedder.embed(crops[:batch])
+        rate = timed(lambda: embedder.embed(crops), len(crops), args.repeat)
+        print(f"  {batch:>5}  {rate:9.1f}  {1000 / rate:8.2f}  {rate / before:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
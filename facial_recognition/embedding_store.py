@@ -0,0 +1,264 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+image_suffixes = (".jpg", ".png", ".jpeg")
+# Images per task sent to an embedding worker.
+worker_chunk = 8
+# Each worker process loads its own copy of the model (about 0.5 GB for
+# VGG-Face), so only a few are ever started.
+max_workers = 4
+# Part of the manifest; stores written with another version are embedded
+# again. Version 2 prepares enrollment faces with FaceEmbedder, like the
+# live crops they are compared with.
+cache_version = 2
+# One FaceEmbedder per model in this process, built on first use.
+_embedders = {}
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def face_crop(img_path):
+    # The BGR region of the face DeepFace detects in an enrollment image,
+    # unaligned like the detector boxes of live frames, or None when no face
+    # is found in it.
+    import cv2
+    from deepface import DeepFace
+
+    img = cv2.imread(str(img_path))
+    if img is None:
+        return None
+    try:
+        face = DeepFace.extract_faces(img_path=img, enforce_detection=True, align=False)[0]
+    except ValueError:
+        return None
+    area = face["facial_area"]
+    x, y = max(0, area["x"]), max(0, area["y"])
+    crop = img[y : y + area["h"], x : x + area["w"]]
+    return crop if crop.size else None
+
+
+def get_embedder(model_name):
+    from face_embedder import FaceEmbedder
+
+    if model_name not in _embedders:
+        _embedders[model_name] = FaceEmbedder(model_name)
+    return _embedders[model_name]
+
+
+def _embed_chunk(img_paths, model_name):
+    # Unit-length embeddings of the images' faces, None where there is no
+    # face, embedded in one batch by the same FaceEmbedder as live faces.
+    crops = [face_crop(img_path) for img_path in img_paths]
+    embeddings = iter(get_embedder(model_name).embed([c for c in crops if c is not None]))
+    return [None if crop is None else next(embeddings) for crop in crops]
+
+
+def _init_worker(model_name):
+    # Builds the model once when a worker starts, for every image the
+    # worker embeds after that.
+    get_embedder(model_name)
+
+
+def embed_images(img_paths, model_name, workers=1):
+    # Embeddings of many images, in this process by default. With more
+    # than one worker they are spread over a pool of at most max_workers
+    # spawned processes: forking a process that already runs TensorFlow
+    # (such as the Streamlit app on a rerun) can deadlock, and a spawned
+    # worker re-imports the __main__ module, so only the command line
+    # below, which is guarded, asks for workers.
+    workers = min(workers, max_workers, -(-len(img_paths) // worker_chunk))
+    if workers <= 1:
+        return _embed_chunk(img_paths, model_name)
+    chunks = [
+        img_paths[i : i + worker_chunk] for i in range(0, len(img_paths), worker_chunk)
+    ]
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        workers, mp_context=context, initializer=_init_worker, initargs=(model_name,)
+    ) as pool:
+        results = pool.map(_embed_chunk, chunks, [model_name] * len(chunks))
+        return [emb for chunk in results for emb in chunk]
+
+
+class EmbeddingStore:
+    # Embeddings of the enrollment images in a directory, kept on disk per
+    # model as <model>.npy (one unit-length float32 row per face) plus a
+    # <model>.json manifest of each image's path, mtime, size, content hash
+    # and row. Loading memory-maps the .npy, so it costs nothing however
+    # many faces are enrolled; only images that are new or whose content
+    # changed are embedded again. A file touched without changing keeps its
+    # row, and so does a copy or rename of an image already embedded. A
+    # trained IVF index over the matrix is kept beside it as <model>.ivf.npz.
+    def __init__(self, directory, model_name="VGG-Face", cache_dir=None):
+        self.directory = Path(directory)
+        self.model_name = model_name
+        self.cache_dir = Path(cache_dir or self.directory / ".embeddings")
+        self.matrix_path = self.cache_dir / f"{model_name}.npy"
+        self.manifest_path = self.cache_dir / f"{model_name}.json"
+        self.ivf_path = self.cache_dir / f"{model_name}.ivf.npz"
+        self.embedded = 0
+
+    def _read(self):
+        # (manifest entries, memory-mapped matrix) as last saved.
+        if not (self.manifest_path.exists() and self.matrix_path.exists()):
+            return [], None
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("model") != self.model_name or manifest.get("version") != cache_version:
+            return [], None
+        return manifest["entries"], np.load(self.matrix_path, mmap_mode="r")
+
+    def _images(self):
+        return sorted(
+            file
+            for file in os.listdir(self.directory)
+            if file.lower().endswith(image_suffixes)
+            and (self.directory / file).is_file()
+        )
+
+    def sync(self, workers=1):
+        # Brings the store up to date with the directory. Returns whether
+        # anything had to change on disk.
+        entries, matrix = self._read()
+        by_path = {entry["path"]: entry for entry in entries}
+        by_hash = {entry["sha256"]: entry for entry in entries}
+        current, pending = [], []
+        for file in self._images():
+            stat = (self.directory / file).stat()
+            old = by_path.get(file)
+            unchanged = (stat.st_mtime, stat.st_size)
+            if old is not None and (old["mtime"], old["size"]) == unchanged:
+                current.append(old)
+                continue
+            entry = {
+                "path": file,
+                "name": os.path.splitext(file)[0],
+                "mtime": stat.st_mtime,
+                "size": stat.st_size,
+                "sha256": file_hash(self.directory / file),
+            }
+            old = by_hash.get(entry["sha256"])
+            if old is not None:
+                current.append(dict(entry, row=old["row"]))
+            else:
+                pending.append(entry)
+                current.append(entry)
+        if not pending and current == entries:
+            return False
+
+        # Rows are rewritten in directory order: kept ones copied from the
+        # old matrix, new ones embedded. An image without a face gets row
+        # None, so it is not embedded again until it changes.
+        img_paths = [str(self.directory / entry["path"]) for entry in pending]
+        new = embed_images(img_paths, self.model_name, workers)
+        self.embedded += len(pending)
+        vectors = {id(entry): emb for entry, emb in zip(pending, new)}
+        rows = []
+        for entry in current:
+            if id(entry) in vectors:
+                emb = vectors[id(entry)]
+            elif entry["row"] is not None:
+                emb = matrix[entry["row"]]
+            else:
+                emb = None
+            entry["row"] = None if emb is None else len(rows)
+            if emb is not None:
+                rows.append(emb)
+        new_matrix = np.array(rows, dtype=np.float32)
+        del matrix
+
+        self.cache_dir.mkdir(exist_ok=True)
+        tmp_matrix = self.cache_dir / f"{self.model_name}.tmp.npy"
+        np.save(tmp_matrix, new_matrix)
+        os.replace(tmp_matrix, self.matrix_path)
+        tmp_manifest = self.cache_dir / f"{self.model_name}.tmp.json"
+        with open(tmp_manifest, "w") as f:
+            json.dump(
+                {"model": self.model_name, "version": cache_version, "entries": current},
+                f,
+                indent=1,
+            )
+        os.replace(tmp_manifest, self.manifest_path)
+        return True
+
+    def load(self, workers=1):
+        # (names, embeddings) for every enrolled face, after a sync. The
+        # embeddings are a read-only memory map of the .npy file.
+        self.sync(workers)
+        entries, matrix = self._read()
+        rows = [entry for entry in entries if entry["row"] is not None]
+        if matrix is None or not rows:
+            return [], np.empty((0, 0), dtype=np.float32)
+        rows.sort(key=lambda entry: entry["row"])
+        return [entry["name"] for entry in rows], matrix
+
+    def _matrix_stamp(self):
+        stat = self.matrix_path.stat()
+        return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+    def _read_ivf(self):
+        # The saved IVF state, or None if there is none for the current matrix.
+        try:
+            with np.load(self.ivf_path) as saved:
+                if not np.array_equal(saved["matrix"], self._matrix_stamp()):
+                    return None
+                return {"centroids": saved["centroids"], "lists": saved["lists"]}
+        except (FileNotFoundError, KeyError, ValueError):
+            return None
+
+    def _write_ivf(self, state):
+        tmp_ivf = self.cache_dir / f"{self.model_name}.tmp.ivf.npz"
+        with open(tmp_ivf, "wb") as f:
+            np.savez(f, matrix=self._matrix_stamp(), **state)
+        os.replace(tmp_ivf, self.ivf_path)
+
+    def load_index(self, workers=1, **kwargs):
+        # A FaceIndex over load()'s embeddings. Past ann_threshold faces its
+        # k-means training is saved and reused until the matrix changes, so
+        # only the first start after an enrollment pays for it.
+        from face_index import FaceIndex
+
+        names, matrix = self.load(workers)
+        ivf = self._read_ivf() if len(names) else None
+        index = FaceIndex.from_vectors(names, matrix, ivf=ivf, **kwargs)
+        if ivf is None and index.ivf_state() is not None:
+            self._write_ivf(index.ivf_state())
+        return index
+
+    def skipped(self):
+        # Enrollment images in which no face was found.
+        entries, _ = self._read()
+        return [entry["path"] for entry in entries if entry["row"] is None]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Embed new or changed enrollment images ahead of time, on several processes."
+    )
+    parser.add_argument("directory", nargs="?", default=Path(__file__).parent / "faces")
+    parser.add_argument("--model", default="VGG-Face")
+    parser.add_argument("--workers", type=int, default=max_workers)
+    args = parser.parse_args()
+
+    store = EmbeddingStore(args.directory, model_name=args.model)
+    store.sync(workers=args.workers)
+    print(f"{store.embedded} image(s) embedded, {len(store.load()[0])} face(s) enrolled")
+    for skipped in store.skipped():
+        print(f"No face found in {skipped}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+
+# Crops per model call; larger batches are split into several calls.
+max_batch = 32
+
+
+class FaceEmbedder:
+    # Runs the recognition model once on a stack of face crops instead of
+    # calling DeepFace.represent per face. Crops are the BGR regions cut
+    # from a frame by the detector or a tracker; each is prepared as
+    # DeepFace prepares a detected face for the model, without running a
+    # second face detector on it.
+    def __init__(
+        self, model_name="VGG-Face", max_batch=max_batch, forward=None, input_size=None
+    ):
+        if forward is None:
+            from deepface import DeepFace
+
+            model = DeepFace.build_model(model_name)
+            input_size = model.input_shape
+
+            def forward(batch):
+                return model.model(batch, training=False).numpy()
+
+        self.model_name = model_name
+        self.max_batch = max_batch
+        self.forward = forward
+        self.input_size = tuple(input_size or (224, 224))
+        self.calls = 0
+        self.faces = 0
+
+    def prepare(self, crop):
+        # Scaled to fit the model input with its aspect ratio kept, padded
+        # with black around it to the full size, left in BGR order and
+        # scaled to [0, 1].
+        width, height = self.input_size
+        factor = min(height / crop.shape[0], width / crop.shape[1])
+        size = (max(1, int(crop.shape[1] * factor)), max(1, int(crop.shape[0] * factor)))
+        face = cv2.resize(crop, size)
+        pad_h, pad_w = height - face.shape[0], width - face.shape[1]
+        face = np.pad(
+            face,
+            ((pad_h // 2, pad_h - pad_h // 2), (pad_w // 2, pad_w - pad_w // 2), (0, 0)),
+        )
+        if face.shape[:2] != (height, width):
+            face = cv2.resize(face, (width, height))
+        return face.astype(np.float32) / 255
+
+    def embed(self, crops):
+        # (len(crops), dim) unit-length float32 embeddings, in order.
+        if len(crops) == 0:
+            return np.empty((0, 0), dtype=np.float32)
+        batch = np.stack([self.prepare(crop) for crop in crops])
+        out = [
+            np.asarray(self.forward(batch[i : i + self.max_batch]), dtype=np.float32)
+            for i in range(0, len(batch), self.max_batch)
+        ]
+        self.calls += len(out)
+        self.faces += len(crops)
+        embeddings = np.concatenate(out)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
@@ -0,0 +1,203 @@
+import numpy as np
+
+# Enrolled faces past which search switches from comparing against every
+# embedding to the inverted-file (IVF) index below.
+ann_threshold = 20000
+# Inverted lists searched per query once the index is approximate. More
+# lists find more true nearest neighbours at the cost of speed.
+nprobe = 8
+# k-means iterations and training sample size (per list) for the IVF index.
+kmeans_iterations = 10
+kmeans_sample_per_list = 64
+
+
+def normalize(embeddings):
+    # Rows scaled to unit length as float32, so a dot product is the cosine
+    # similarity.
+    embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+def top_k(similarities, k):
+    # Column indices of the k largest similarities in each row, best first.
+    k = min(k, similarities.shape[1])
+    if k < similarities.shape[1]:
+        part = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    else:
+        part = np.broadcast_to(np.arange(k), (len(similarities), k))
+    order = np.argsort(-np.take_along_axis(similarities, part, axis=1), axis=1)
+    return np.take_along_axis(part, order, axis=1)
+
+
+def spherical_kmeans(vectors, n_lists, iterations, rng):
+    # Unit-length centroids of n_lists clusters of unit vectors, assigning
+    # each vector to the centroid with the largest dot product.
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        # An empty cluster keeps its old centroid.
+        empty = ~np.bincount(assign, minlength=n_lists).astype(bool)
+        sums[empty] = centroids[empty]
+        centroids = normalize(sums)
+    return centroids
+
+
+class FaceIndex:
+    # Known face embeddings in one contiguous float32 matrix, L2-normalized,
+    # with the name for each row. A batch of query faces is matched with a
+    # single matrix multiply. Once more than ann_threshold faces are
+    # enrolled, the rows are clustered into inverted lists (IVF) and each
+    # query is only compared with the rows of its nprobe closest lists.
+    # The rows stay where they are; each list is a slice of a row order.
+    def __init__(self, dim=None, ann_threshold=ann_threshold, nprobe=nprobe, seed=0):
+        self.dim = dim
+        self.ann_threshold = ann_threshold
+        self.nprobe = nprobe
+        self.names = []
+        self._vectors = np.empty((0, dim or 0), dtype=np.float32)
+        self._size = 0
+        self._rng = np.random.default_rng(seed)
+        # IVF state: centroids, each row's list, and the rows ordered by
+        # list (list i is rows order[offsets[i]:offsets[i + 1]]).
+        self._centroids = None
+        self._lists = np.empty(0, dtype=np.int64)
+        self._order = None
+        self._offsets = None
+        self._trained_size = 0
+
+    @classmethod
+    def from_vectors(cls, names, vectors, ivf=None, **kwargs):
+        # An index over rows that are already unit-length float32, such as
+        # a memory-mapped EmbeddingStore matrix, used as they are rather
+        # than copied. ivf is an earlier ivf_state() for the same rows,
+        # which saves training the index again.
+        if len(names) != len(vectors):
+            raise ValueError("One name is needed per embedding")
+        if len(vectors) == 0:
+            return cls(**kwargs)
+        index = cls(dim=vectors.shape[1], **kwargs)
+        index._vectors = vectors
+        index._size = len(vectors)
+        index.names = list(names)
+        if index.approximate:
+            if ivf is not None and len(ivf["lists"]) == index._size:
+                index._centroids = ivf["centroids"]
+                index._lists = ivf["lists"]
+                index._trained_size = index._size
+            else:
+                index._train()
+            index._group_lists()
+        return index
+
+    def ivf_state(self):
+        # The trained IVF index as arrays, for from_vectors(ivf=...); None
+        # while the index is exact.
+        if self._centroids is None:
+            return None
+        return {"centroids": self._centroids, "lists": self._lists[: self._size]}
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def vectors(self):
+        return self._vectors[: self._size]
+
+    @property
+    def approximate(self):
+        return self._size > self.ann_threshold
+
+    def add(self, names, embeddings):
+        embeddings = normalize(embeddings)
+        if len(names) != len(embeddings):
+            raise ValueError("One name is needed per embedding")
+        if self.dim is None:
+            self.dim = embeddings.shape[1]
+            self._vectors = np.empty((0, self.dim), dtype=np.float32)
+        if embeddings.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dimensional embeddings")
+        # Grow by doubling so enrolling one face at a time stays cheap.
+        needed = self._size + len(embeddings)
+        if needed > len(self._vectors):
+            grown = np.empty((max(needed, 2 * len(self._vectors)), self.dim), dtype=np.float32)
+            grown[: self._size] = self.vectors
+            self._vectors = grown
+        self._vectors[self._size : needed] = embeddings
+        self.names.extend(names)
+        self._size = needed
+        if self.approximate and (self._centroids is None or needed >= 2 * self._trained_size):
+            self._train()
+            self._group_lists()
+        elif self._centroids is not None:
+            self._lists = np.append(self._lists, np.argmax(embeddings @ self._centroids.T, axis=1))
+            self._order = None
+
+    def _train(self):
+        # Clusters the rows into about 4 * sqrt(n) lists. Done when the
+        # index first passes ann_threshold and again whenever it has
+        # doubled since, at enrollment rather than on a video frame.
+        n_lists = int(4 * np.sqrt(self._size))
+        sample = self.vectors
+        if self._size > kmeans_sample_per_list * n_lists:
+            rows = self._rng.choice(self._size, kmeans_sample_per_list * n_lists, replace=False)
+            sample = self.vectors[rows]
+        self._centroids = spherical_kmeans(sample, n_lists, kmeans_iterations, self._rng)
+        self._lists = np.concatenate(
+            [
+                np.argmax(self.vectors[i : i + 4096] @ self._centroids.T, axis=1)
+                for i in range(0, self._size, 4096)
+            ]
+        )
+        self._trained_size = self._size
+        self._order = None
+
+    def _group_lists(self):
+        # Orders the row numbers by list so each list is one slice of them;
+        # only needed again after new faces are added.
+        self._order = np.argsort(self._lists, kind="stable")
+        counts = np.bincount(self._lists, minlength=len(self._centroids))
+        self._offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def search(self, queries, k=1):
+        # (cosine distances, row indices), each (queries x k), nearest
+        # first. Rows with no match (fewer than k candidates) get distance
+        # inf and index -1.
+        queries = normalize(queries)
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        indices = np.full((len(queries), k), -1, dtype=np.int64)
+        if self._size == 0 or len(queries) == 0:
+            return distances, indices
+        if not self.approximate:
+            similarities = queries @ self.vectors.T
+            best = top_k(similarities, k)
+            found = best.shape[1]
+            indices[:, :found] = best
+            distances[:, :found] = 1 - np.take_along_axis(similarities, best, axis=1)
+            return distances, indices
+
+        if self._order is None:
+            self._group_lists()
+        probes = top_k(queries @ self._centroids.T, self.nprobe)
+        for q, lists in enumerate(probes):
+            rows = np.concatenate(
+                [self._order[self._offsets[i] : self._offsets[i + 1]] for i in lists]
+            )
+            if len(rows) == 0:
+                continue
+            similarities = self.vectors[rows] @ queries[q]
+            best = top_k(similarities[None, :], k)[0]
+            indices[q, : len(best)] = rows[best]
+            distances[q, : len(best)] = 1 - similarities[best]
+        return distances, indices
+
+    def match(self, queries, threshold):
+        # (name, cosine distance) of the nearest known face for each query;
+        # "Unknown" when it is not closer than threshold.
+        distances, indices = self.search(queries, k=1)
+        return [
+            (self.names[i] if i >= 0 and d < threshold else "Unknown", float(d))
+            for d, i in zip(distances[:, 0], indices[:, 0])
+        ]
@@ -0,0 +1,141 @@
+import queue
+import threading
+from collections import deque
+
+import numpy as np
+
+# Seconds a stage waits on a queue before checking whether to stop.
+poll_timeout = 0.1
+
+
+class StageStats:
+    # Latency of one pipeline stage: every item counted, the most recent
+    # samples kept for percentiles, and items dropped under backpressure.
+    def __init__(self, name, samples=5000):
+        self.name = name
+        self.count = 0
+        self.dropped = 0
+        self._samples = deque(maxlen=samples)
+        self._lock = threading.Lock()
+
+    def record(self, seconds, items=1):
+        with self._lock:
+            self.count += items
+            self._samples.append(seconds)
+
+    def drop(self, items=1):
+        with self._lock:
+            self.dropped += items
+
+    def summary(self):
+        with self._lock:
+            samples = np.array(self._samples) * 1000
+            count, dropped = self.count, self.dropped
+        if len(samples) == 0:
+            return {"stage": self.name, "items": count, "dropped": dropped}
+        return {
+            "stage": self.name,
+            "items": count,
+            "dropped": dropped,
+            "mean_ms": samples.mean(),
+            "p50_ms": np.percentile(samples, 50),
+            "p95_ms": np.percentile(samples, 95),
+            "max_ms": samples.max(),
+        }
+
+
+class DropQueue(queue.Queue):
+    # A bounded queue whose producer never waits: when it is full, offer
+    # either throws out the oldest item to make room (the newest frame
+    # wins) or refuses the new one, counting the drop on stats.
+    def __init__(self, maxsize, stats, drop_oldest=True):
+        super().__init__(maxsize)
+        self.stats = stats
+        self.drop_oldest = drop_oldest
+
+    def offer(self, item):
+        while True:
+            try:
+                self.put_nowait(item)
+                return True
+            except queue.Full:
+                if not self.drop_oldest:
+                    self.stats.drop()
+                    return False
+            try:
+                self.get_nowait()
+                self.stats.drop()
+            except queue.Empty:
+                pass
+
+
+def put_until(q, item, stop):
+    # Blocking put that gives up once stop is set.
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=poll_timeout)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def get_until(q, stop):
+    # Blocking get that returns None once stop is set.
+    while not stop.is_set():
+        try:
+            return q.get(timeout=poll_timeout)
+        except queue.Empty:
+            continue
+    return None
+
+
+def drain(q, limit=None):
+    # The items already waiting in q (at most limit), without blocking.
+    items = []
+    while limit is None or len(items) < limit:
+        try:
+            items.append(q.get_nowait())
+        except queue.Empty:
+            break
+    return items
+
+
+def start_stage(name, target, args, stop):
+    # Runs a stage on its own thread. If it fails, stop is set so the other
+    # stages wind down instead of waiting on it forever, and the exception
+    # is kept on thread.error for raise_failed.
+    def run():
+        try:
+            target(*args)
+        except Exception as e:
+            thread.error = e
+            stop.set()
+
+    thread = threading.Thread(target=run, name=name, daemon=True)
+    thread.error = None
+    thread.start()
+    return thread
+
+
+def raise_failed(threads):
+    # Re-raises the exception of the first stage that failed, once the
+    # stages have been joined.
+    for thread in threads:
+        if thread.error is not None:
+            raise thread.error
+
+
+def report(stats, frames, elapsed):
+    # Throughput and a per-stage latency table, as printed lines.
+    fps = frames / max(elapsed, 1e-9)
+    columns = ["items", "dropped", "mean ms", "p50 ms", "p95 ms", "max ms"]
+    lines = [f"{frames} frames in {elapsed:.1f}s ({fps:.1f} fps)"]
+    lines.append(f"  {'stage':<12}" + "".join(f"{column:>9}" for column in columns))
+    for stage in stats:
+        row = stage.summary()
+        timings = [row.get(key) for key in ("mean_ms", "p50_ms", "p95_ms", "max_ms")]
+        cells = "".join(f"{t:9.1f}" if t is not None else f"{'-':>9}" for t in timings)
+        lines.append(f"  {row['stage']:<12}{row['items']:>9}{row['dropped']:>9}{cells}")
+    return lines
+
@@ -0,0 +1,115 @@
+import queue
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import app_multi_face
+from app_multi_face import AttendanceTracker
+
+
+class StubTracker:
+    # Stands in for CSRT: remembers the frame it was started on and moves
+    # its box step pixels to the right on every update.
+    step = 45
+
+    def init(self, frame, bbox):
+        self.frame = frame
+        self.bbox = bbox
+
+    def update(self, frame):
+        x, y, w, h = self.bbox
+        self.bbox = (x + self.step, y, w, h)
+        return True, self.bbox
+
+
+class Jobs:
+    # A stage's input queue: takes every job offered, or none while busy.
+    def __init__(self):
+        self.busy = False
+        self.offered = []
+
+    def offer(self, item):
+        if not self.busy:
+            self.offered.append(item)
+        return not self.busy
+
+
+@pytest.fixture
+def tracker(monkeypatch):
+    cv2 = SimpleNamespace(legacy=SimpleNamespace(TrackerCSRT_create=StubTracker))
+    monkeypatch.setattr(app_multi_face, "cv2", cv2)
+    return AttendanceTracker(Jobs(), queue.Queue(), Jobs(), queue.Queue(), draw=False)
+
+
+def frame(frame_id):
+    return np.full((240, 1000, 3), frame_id, dtype=np.uint8)
+
+
+def run(tracker, frame_ids):
+    frames = {frame_id: frame(frame_id) for frame_id in frame_ids}
+    for frame_id, image in frames.items():
+        tracker.process(frame_id, image)
+    return frames
+
+
+def face(box):
+    x, y, w, h = box
+    return box, frame(0)[y : y + h, x : x + w]
+
+
+def test_detections_apply_to_the_frame_they_came_from(tracker):
+    frames = run(tracker, range(1, 6))
+    assert [frame_id for frame_id, _ in tracker.detect_jobs.offered] == [5]
+
+    # The face found on frame 5 is tracked from frame 5, so by frame 10 it
+    # has been carried through five updates.
+    tracker.detect_results.put((5, [face((0, 50, 60, 60))]))
+    frames.update(run(tracker, range(6, 11)))
+    (t,) = tracker.trackers
+    assert t["tracker"].frame is frames[5]
+    assert t["bbox"] == (225, 50, 60, 60)
+    assert tracker.embed_jobs.offered[0][0] == t["id"]
+
+    # When frame 10's detection comes back the tracker has moved on; it is
+    # compared by where it was on frame 10, so it is kept and no second
+    # tracker starts on the same face.
+    assert tracker.pending_detections[10][1] == {t["id"]: (225, 50, 60, 60)}
+    tracker.detect_results.put((10, [face((225, 50, 60, 60))]))
+    run(tracker, range(11, 16))
+    assert [t["id"] for t in tracker.trackers] == [1]
+
+    # A tracker the detector no longer finds where it was is dropped.
+    tracker.detect_results.put((15, [face((800, 100, 60, 60))]))
+    run(tracker, [16])
+    assert [t["id"] for t in tracker.trackers] == [2]
+
+
+def test_trackers_started_after_a_detected_frame_are_kept(tracker):
+    # Frames 5 and 10 are both with the detector before either comes back.
+    run(tracker, range(1, 11))
+    assert sorted(tracker.pending_detections) == [5, 10]
+    tracker.detect_results.put((5, [face((0, 50, 60, 60))]))
+    tracker.detect_results.put((10, [face((600, 50, 60, 60))]))
+    run(tracker, [11])
+    # Tracker 1 did not exist on frame 10, so it is not removed for being
+    # away from frame 10's face, and that face gets a tracker of its own.
+    assert [t["id"] for t in tracker.trackers] == [1, 2]
+    assert [t["tracker"].frame[0, 0, 0] for t in tracker.trackers] == [5, 10]
+
+
+def test_pending_detections_bookkeeping(tracker):
+    # A frame the busy detector refuses is not waited for.
+    tracker.detect_jobs.busy = True
+    run(tracker, range(1, 6))
+    assert tracker.pending_detections == {} and tracker.detect_jobs.offered == []
+
+    tracker.detect_jobs.busy = False
+    frames = run(tracker, range(6, 11))
+    detected, boxes = tracker.pending_detections[10]
+    assert detected is frames[10] and boxes == {}
+
+    # Its result is applied once and forgotten.
+    tracker.detect_results.put((10, []))
+    run(tracker, [11])
+    assert tracker.pending_detections == {}
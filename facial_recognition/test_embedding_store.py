@@ -0,0 +1,138 @@
+import hashlib
+import os
+
+import numpy as np
+import pytest
+
+import embedding_store
+import face_index
+from embedding_store import EmbeddingStore
+
+
+@pytest.fixture
+def embedded(monkeypatch):
+    # Stands in for the model: an image's embedding is derived from its
+    # bytes, and one containing "no face" has none. Returns the names of
+    # the images embedded so far.
+    names = []
+
+    def embed_images(img_paths, model_name, workers=None):
+        embeddings = []
+        for img_path in img_paths:
+            names.append(os.path.basename(img_path))
+            data = open(img_path, "rb").read()
+            if data == b"no face":
+                embeddings.append(None)
+                continue
+            emb = np.frombuffer(hashlib.sha256(data).digest(), dtype=np.uint8).astype(np.float32)
+            embeddings.append(emb / np.linalg.norm(emb))
+        return embeddings
+
+    monkeypatch.setattr(embedding_store, "embed_images", embed_images)
+    return names
+
+
+@pytest.fixture
+def faces(tmp_path):
+    directory = tmp_path / "faces"
+    directory.mkdir()
+    for name, data in [("alice.jpg", b"alice"), ("bob.png", b"bob"), ("empty.jpg", b"no face")]:
+        (directory / name).write_bytes(data)
+    (directory / "notes.txt").write_bytes(b"not an image")
+    return directory
+
+
+def test_unchanged_images_are_reused(faces, embedded):
+    store = EmbeddingStore(faces)
+    names, matrix = store.load()
+    assert names == ["alice", "bob"]
+    assert sorted(embedded) == ["alice.jpg", "bob.png", "empty.jpg"]
+    assert store.skipped() == ["empty.jpg"]
+
+    # A new store over the same directory embeds nothing, including the
+    # image without a face, and reads the same rows.
+    again = EmbeddingStore(faces)
+    assert not again.sync()
+    names_again, matrix_again = again.load()
+    assert len(embedded) == 3 and again.embedded == 0
+    assert names_again == names
+    np.testing.assert_array_equal(matrix_again, matrix)
+
+    # Touching a file rewrites the manifest but keeps its row.
+    os.utime(faces / "alice.jpg", (1, 1))
+    assert again.sync()
+    assert len(embedded) == 3
+    np.testing.assert_array_equal(again.load()[1], matrix)
+
+
+def test_renamed_and_copied_images_keep_their_rows(faces, embedded):
+    store = EmbeddingStore(faces)
+    _, matrix = store.load()
+    alice = np.array(matrix[0])
+    os.rename(faces / "alice.jpg", faces / "carol.jpg")
+    (faces / "dave.jpg").write_bytes(b"bob")
+
+    names, matrix = store.load()
+    assert names == ["bob", "carol", "dave"]
+    assert len(embedded) == 3
+    np.testing.assert_array_equal(matrix[1], alice)
+    np.testing.assert_array_equal(matrix[2], matrix[0])
+
+
+def test_changed_and_deleted_images(faces, embedded):
+    store = EmbeddingStore(faces)
+    _, matrix = store.load()
+    bob = np.array(matrix[1])
+    (faces / "alice.jpg").write_bytes(b"alice, new photo")
+    os.remove(faces / "empty.jpg")
+    (faces / "erin.jpg").write_bytes(b"erin")
+
+    names, matrix = store.load()
+    assert names == ["alice", "bob", "erin"]
+    assert embedded[3:] == ["alice.jpg", "erin.jpg"]
+    assert store.skipped() == []
+    np.testing.assert_array_equal(matrix[1], bob)
+
+    os.remove(faces / "bob.png")
+    names, matrix = store.load()
+    assert names == ["alice", "erin"] and len(matrix) == 2
+    assert len(embedded) == 5
+
+
+def test_models_are_stored_apart(faces, embedded):
+    EmbeddingStore(faces, model_name="VGG-Face").load()
+    names, _ = EmbeddingStore(faces, model_name="Facenet").load()
+    assert names == ["alice", "bob"]
+    assert len(embedded) == 6
+    assert sorted(os.listdir(faces / ".embeddings")) == [
+        "Facenet.json",
+        "Facenet.npy",
+        "VGG-Face.json",
+        "VGG-Face.npy",
+    ]
+
+
+def test_trained_index_is_reused_until_the_matrix_changes(faces, embedded, monkeypatch):
+    for i in range(30):
+        (faces / f"person{i:02}.jpg").write_bytes(f"person {i}".encode())
+    index = EmbeddingStore(faces).load_index(ann_threshold=10)
+    assert index.approximate and (faces / ".embeddings" / "VGG-Face.ivf.npz").exists()
+    _, matrix = EmbeddingStore(faces).load()
+    expected = index.search(matrix[:5], k=3)
+
+    # A restart loads the saved lists instead of running k-means again.
+    def train(self):
+        raise AssertionError("trained again")
+
+    real_train = face_index.FaceIndex._train
+    monkeypatch.setattr(face_index.FaceIndex, "_train", train)
+    again = EmbeddingStore(faces).load_index(ann_threshold=10)
+    np.testing.assert_array_equal(again.search(matrix[:5], k=3)[1], expected[1])
+    assert again.names == index.names
+
+    # A new enrollment rewrites the matrix, so the index is trained afresh.
+    (faces / "zoe.jpg").write_bytes(b"zoe")
+    with pytest.raises(AssertionError, match="trained again"):
+        EmbeddingStore(faces).load_index(ann_threshold=10)
+    monkeypatch.setattr(face_index.FaceIndex, "_train", real_train)
+    assert len(EmbeddingStore(faces).load_index(ann_threshold=10)) == 33
@@ -0,0 +1,75 @@
+import cv2
+import numpy as np
+import pytest
+
+from face_embedder import FaceEmbedder
+
+
+def deepface_resize_image(img, target_size):
+    # deepface.commons.preprocessing.resize_image, which DeepFace.represent
+    # calls with target_size=(input_shape[1], input_shape[0]), i.e. (h, w).
+    factor = min(target_size[0] / img.shape[0], target_size[1] / img.shape[1])
+    img = cv2.resize(img, (int(img.shape[1] * factor), int(img.shape[0] * factor)))
+    diff_0, diff_1 = target_size[0] - img.shape[0], target_size[1] - img.shape[1]
+    img = np.pad(
+        img, ((diff_0 // 2, diff_0 - diff_0 // 2), (diff_1 // 2, diff_1 - diff_1 // 2), (0, 0)), "constant"
+    )
+    if img.shape[0:2] != target_size:
+        img = cv2.resize(img, target_size)
+    img = img.astype(np.float32)
+    return img / 255 if img.max() > 1 else img
+
+
+def crop(height, width, seed=0):
+    return np.random.default_rng(seed).integers(1, 256, (height, width, 3), dtype=np.uint8)
+
+
+def brightness(batch):
+    # A stand-in model: each face's embedding says how bright it is.
+    means = batch.reshape(len(batch), -1).mean(axis=1)
+    return np.stack([np.ones_like(means), means, 2 * means], axis=1)
+
+
+@pytest.mark.parametrize("input_size", [(224, 224), (55, 47)])
+def test_prepare_letterboxes_like_deepface(input_size):
+    embedder = FaceEmbedder(forward=brightness, input_size=input_size)
+    for seed, (height, width) in enumerate([(100, 80), (60, 200), (47, 55), (10, 300), (224, 224)]):
+        face = crop(height, width, seed)
+        prepared = embedder.prepare(face)
+        assert prepared.shape == (input_size[1], input_size[0], 3)
+        np.testing.assert_array_equal(prepared, deepface_resize_image(face, (input_size[1], input_size[0])))
+
+
+def test_batches_are_split_in_order():
+    sizes = []
+
+    def forward(batch):
+        sizes.append(len(batch))
+        return brightness(batch)
+
+    crops = [crop(40 + i, 30 + 2 * i, seed=i) for i in range(10)]
+    embedder = FaceEmbedder(forward=forward, max_batch=4, input_size=(32, 32))
+    embeddings = embedder.embed(crops)
+    assert sizes == [4, 4, 2]
+    assert (embedder.calls, embedder.faces) == (3, 10)
+    one_by_one = np.concatenate([FaceEmbedder(forward=brightness, input_size=(32, 32)).embed([c]) for c in crops])
+    np.testing.assert_allclose(embeddings, one_by_one, rtol=1e-6)
+
+
+def test_embeddings_are_unit_length():
+    embedder = FaceEmbedder(forward=lambda batch: 10 * brightness(batch), input_size=(32, 32))
+    embeddings = embedder.embed([crop(50, 40, seed) for seed in range(3)])
+    assert embeddings.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, rtol=1e-6)
+    # An all-zero output stays zero rather than turning into NaN.
+    zeros = FaceEmbedder(forward=lambda batch: np.zeros((len(batch), 3)), input_size=(32, 32))
+    assert not zeros.embed([crop(50, 40)]).any()
+
+
+def test_no_crops_runs_no_model():
+    def forward(batch):
+        raise AssertionError("model called")
+
+    embedder = FaceEmbedder(forward=forward)
+    assert embedder.embed([]).shape == (0, 0)
+    assert (embedder.calls, embedder.faces) == (0, 0)
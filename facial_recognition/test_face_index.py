@@ -0,0 +1,107 @@
+import numpy as np
+
+from face_index import FaceIndex, normalize
+
+
+def random_faces(count, dim=64, seed=0):
+    return normalize(np.random.default_rng(seed).normal(size=(count, dim)))
+
+
+def clustered_faces(count, clusters=200, dim=64, spread=1.0, seed=0):
+    # Faces grouped around a few hundred people, like an enrollment set
+    # with several images each, so there is structure for IVF to find.
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    return normalize(centers[rng.integers(0, clusters, count)] + spread * rng.normal(size=(count, dim)))
+
+
+def brute_force(vectors, queries, k):
+    return np.argsort(-(normalize(queries) @ vectors.T), axis=1)[:, :k]
+
+
+def test_exact_top_k_matches_brute_force():
+    vectors = random_faces(500)
+    queries = random_faces(20, seed=1)
+    index = FaceIndex()
+    index.add([f"face{i}" for i in range(500)], vectors)
+    assert not index.approximate
+
+    distances, indices = index.search(queries, k=5)
+    np.testing.assert_array_equal(indices, brute_force(vectors, queries, 5))
+    expected = 1 - np.take_along_axis(queries @ vectors.T, indices, axis=1)
+    np.testing.assert_allclose(distances, expected, atol=1e-6)
+    assert [name for name, _ in index.match(vectors[:3], 0.1)] == ["face0", "face1", "face2"]
+
+
+def test_k_beyond_the_index_pads_with_no_match():
+    index = FaceIndex()
+    index.add(["a", "b"], random_faces(2))
+    distances, indices = index.search(random_faces(1, seed=1), k=4)
+    assert sorted(indices[0, :2]) == [0, 1]
+    assert list(indices[0, 2:]) == [-1, -1]
+    assert np.isinf(distances[0, 2:]).all()
+
+
+def test_ivf_recall():
+    # Queries are new faces of the enrolled people; the approximate
+    # nearest face should almost always be the exact one.
+    faces = clustered_faces(4200)
+    vectors, queries = faces[:4000], faces[4000:]
+    names = [f"face{i}" for i in range(4000)]
+    index = FaceIndex.from_vectors(names, vectors, ann_threshold=1000)
+    assert index.approximate
+
+    _, exact = FaceIndex.from_vectors(names, vectors).search(queries, k=1)
+    _, approximate = index.search(queries, k=1)
+    found = [index.names[i] for i in approximate[:, 0]]
+    expected = [names[i] for i in exact[:, 0]]
+    recall = np.mean([a == b for a, b in zip(found, expected)])
+    assert recall >= 0.95
+
+
+def test_add_after_from_vectors(tmp_path):
+    # from_vectors uses a read-only memory map as it is; adding faces
+    # copies it instead of writing to the file.
+    vectors = random_faces(10)
+    np.save(tmp_path / "faces.npy", vectors)
+    stored = np.load(tmp_path / "faces.npy", mmap_mode="r")
+    index = FaceIndex.from_vectors([f"face{i}" for i in range(10)], stored)
+    new = random_faces(3, seed=1)
+    index.add(["x", "y", "z"], new)
+
+    assert len(index) == 13
+    np.testing.assert_array_equal(np.load(tmp_path / "faces.npy"), vectors)
+    assert [name for name, _ in index.match(np.vstack([vectors[4], new]), 0.1)] == ["face4", "x", "y", "z"]
+
+
+def test_ivf_state_is_reused(tmp_path):
+    # The trained lists are all from_vectors needs, and the memory map is
+    # searched in place rather than reordered into a copy.
+    vectors = clustered_faces(1200)
+    np.save(tmp_path / "faces.npy", vectors)
+    stored = np.load(tmp_path / "faces.npy", mmap_mode="r")
+    names = [f"face{i}" for i in range(1200)]
+    trained = FaceIndex.from_vectors(names, stored, ann_threshold=1000)
+    reused = FaceIndex.from_vectors(names, stored, ivf=trained.ivf_state(), ann_threshold=1000)
+    assert reused._vectors is stored and reused.names == names
+    np.testing.assert_array_equal(reused.search(vectors[:20], k=3)[1], trained.search(vectors[:20], k=3)[1])
+    assert FaceIndex.from_vectors(names[:10], stored[:10]).ivf_state() is None
+
+
+def test_add_after_from_vectors_when_approximate():
+    vectors = clustered_faces(1200)
+    index = FaceIndex.from_vectors([f"face{i}" for i in range(1200)], vectors, ann_threshold=1000)
+    new = clustered_faces(50, seed=1)
+    index.add([f"new{i}" for i in range(50)], new)
+
+    assert len(index) == 1250 and index.approximate
+    assert [name for name, _ in index.match(new[:5], 0.01)] == [f"new{i}" for i in range(5)]
+    assert index.match(vectors[7], 0.01)[0][0] == "face7"
+
+
+def test_empty_index():
+    for index in (FaceIndex(), FaceIndex.from_vectors([], np.empty((0, 0), dtype=np.float32))):
+        assert len(index) == 0
+        distances, indices = index.search(random_faces(2), k=3)
+        assert (indices == -1).all() and np.isinf(distances).all()
+        assert index.match(random_faces(2), 0.5) == [("Unknown", float("inf"))] * 2
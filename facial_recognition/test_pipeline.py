@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+
+from pipeline import DropQueue, StageStats, drain, get_until, raise_failed, start_stage
+
+
+def test_drop_oldest_keeps_the_newest_items():
+    stats = StageStats("capture")
+    frames = DropQueue(2, stats)
+    assert all(frames.offer(i) for i in range(5))
+    assert drain(frames) == [3, 4]
+    assert stats.dropped == 3
+    assert stats.summary()["dropped"] == 3
+
+
+def test_drop_newest_refuses_items_past_the_limit():
+    stats = StageStats("detect")
+    jobs = DropQueue(2, stats, drop_oldest=False)
+    assert [jobs.offer(i) for i in range(4)] == [True, True, False, False]
+    assert drain(jobs) == [0, 1]
+    assert stats.dropped == 2
+
+    # Room again once the consumer has caught up.
+    assert jobs.offer(4)
+    assert drain(jobs) == [4]
+    assert stats.dropped == 2
+
+
+def test_drain_takes_at_most_limit():
+    q = DropQueue(10, StageStats("embed"))
+    for i in range(5):
+        q.offer(i)
+    assert drain(q, 3) == [0, 1, 2]
+    assert drain(q) == [3, 4]
+    assert drain(q) == []
+
+
+def test_a_failed_stage_stops_the_others_and_is_raised():
+    stop = threading.Event()
+    jobs = DropQueue(1, StageStats("detect"))
+
+    def waits(q, stop):
+        # Would wait forever for a job without stop.
+        get_until(q, stop)
+
+    def fails():
+        raise RuntimeError("detector crashed")
+
+    threads = [start_stage("wait", waits, (jobs, stop), stop), start_stage("fail", fails, (), stop)]
+    for thread in threads:
+        thread.join(timeout=5)
+    assert stop.is_set()
+    assert not any(thread.is_alive() for thread in threads)
+    with pytest.raises(RuntimeError, match="detector crashed"):
+        raise_failed(threads)
+
+
+def test_stages_that_finish_raise_nothing():
+    stop = threading.Event()
+    thread = start_stage("done", lambda: None, (), stop)
+    thread.join()
+    assert not stop.is_set()
+    raise_failed([thread])
@@ -0,0 +1,68 @@
+# Lets the inventory be driven from the repository root, e.g.
+#   python -m o2_inventory bulk-receive truck_0412.csv
+#   python -m o2_inventory bulk-ship shipped.jsonl --db units.db
+#   python -m o2_inventory            (the interactive menu)
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from o2_concentrator_inventory_system import (  # noqa: E402
+    compact_inventory,
+    events_path,
+    file_path,
+    journal_path,
+    load_units_from_csv,
+    main,
+    open_sqlite_inventory,
+    read_records,
+)
+from inventory_storage import TableStorage  # noqa: E402
+
+
+def run_bulk(args):
+    if args.server:
+        from inventory_server import InventoryClient
+        client = InventoryClient(args.server)
+        if args.command == "bulk-receive":
+            result = client.receive_many(record for _, record in read_records(args.file))
+        else:
+            result = client.ship_many(record for _, record in read_records(args.file))
+        client.close()
+        print(json.dumps(result, indent=2))
+        return 1 if result["errors"] else 0
+
+    if args.db:
+        inv = open_sqlite_inventory(args.db, events_file=events_path)
+    else:
+        inv = load_units_from_csv(file_path, journal_path, storage=TableStorage() if args.columnar else None, events_file=events_path)
+
+    if args.command == "bulk-receive":
+        result = inv.receive_many(args.file)
+    else:
+        result = inv.ship_many(args.file)
+    print(result)
+
+    if inv.journal and inv.journal.needs_compaction():
+        compact_inventory(inv)
+    inv.close()
+    return 1 if result.errors else 0
+
+
+parser = argparse.ArgumentParser(prog="python -m o2_inventory", description="O2 concentrator inventory management system")
+parser.add_argument("--db", help="keep the inventory in this SQLite database instead of units.csv")
+parser.add_argument("--columnar", action="store_true", help="hold the inventory in compact columns (for very large inventories)")
+parser.add_argument("--server", help="use the inventory served by inventory_server.py at this URL, e.g. http://127.0.0.1:8765")
+commands = parser.add_subparsers(dest="command")
+receive_parser = commands.add_parser("bulk-receive", help="receive every unit listed in a CSV or JSONL file")
+receive_parser.add_argument("file")
+ship_parser = commands.add_parser("bulk-ship", help="ship every RMA listed in a CSV or JSONL file")
+ship_parser.add_argument("file")
+args = parser.parse_args()
+
+if args.command is None:
+    main(args.db, args.columnar, args.server)
+else:
+    sys.exit(run_bulk(args))
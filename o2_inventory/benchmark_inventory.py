@@ -0,0 +1,118 @@
+import argparse
+import random
+import time
+
+from o2_concentrator_inventory_system import (
+    HomeConcentrator,
+    Inventory,
+    PediatricConcentrator,
+    PortableConcentrator,
+)
+from inventory_storage import SQLiteStorage
+
+MODELS = ["525DD", "525DDP", "1025DD", "EVERFLOW", "EVERFLOW Q", "P2"]
+WARRANTY_TYPES = ["Manufacture Warranty", "Flat rate", "QM Warranty"]
+REPAIR_STATUSES = ["Completed", "Not completed"]
+
+
+class ListInventory:
+    # The list-backed Inventory as it was before the RMA index, kept here as
+    # the baseline the benchmark compares against.
+    def __init__(self):
+        self._stock = []
+
+    def receive_unit(self, unit):
+        if any(u._rma == unit._rma for u in self._stock):
+            return False
+        self._stock.append(unit)
+        return True
+
+    def ship_unit(self, unit):
+        if unit in self._stock:
+            self._stock.remove(unit)
+            return True
+        return False
+
+    def check_repair_status(self, rma):
+        unit = next((u for u in self._stock if u._rma == rma), None)
+        return unit._is_repaired if unit else None
+
+
+def synthetic_units(count, seed=0):
+    rng = random.Random(seed)
+    for i in range(count):
+        model = rng.choice(MODELS)
+        warranty = "Flat rate" if model == "P2" else rng.choice(WARRANTY_TYPES)
+        status = rng.choice(REPAIR_STATUSES)
+        rma = f"QM{i:08d}"
+        kind = rng.randrange(3)
+        if kind == 0:
+            yield HomeConcentrator(model, rma, warranty, 299.98, 5.0, status, rng.uniform(35, 60))
+        elif kind == 1:
+            yield PortableConcentrator(model, rma, warranty, 299.98, 2.0, status, rng.randrange(101))
+        else:
+            yield PediatricConcentrator(model, rma, warranty, 299.98, 1.5, status, rng.randrange(1, 18))
+
+
+def run(inv, units, lookups, seed=0):
+    results = {}
+
+    start = time.perf_counter()
+    for unit in units:
+        inv.receive_unit(unit)
+    results["receive"] = time.perf_counter() - start
+
+    rng = random.Random(seed)
+    sample = [units[rng.randrange(len(units))] for _ in range(lookups)]
+    start = time.perf_counter()
+    for unit in sample:
+        inv.check_repair_status(unit._rma)
+    results["lookup"] = time.perf_counter() - start
+
+    to_ship = rng.sample(units, max(1, len(units) // 10))
+    start = time.perf_counter()
+    for unit in to_ship:
+        inv.ship_unit(unit)
+    results["ship"] = time.perf_counter() - start
+
+    return results, {"receive": len(units), "lookup": len(sample), "ship": len(to_ship)}
+
+
+def report(name, results, counts):
+    print(f"\n{name}")
+    for op, elapsed in results.items():
+        rate = counts[op] / elapsed if elapsed else float("inf")
+        print(f"  {op:<8} {counts[op]:>9,} ops  {elapsed:9.3f}s  {rate:>14,.0f} ops/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the indexed Inventory against the old list-backed one.")
+    parser.add_argument("--units", type=int, default=1_000_000, help="synthetic units loaded into the indexed Inventory")
+    parser.add_argument("--list-units", type=int, default=20_000, help="units loaded into the list baseline (it is quadratic)")
+    parser.add_argument("--lookups", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sqlite", metavar="PATH", help="also benchmark the SQLite backend using this database file")
+    args = parser.parse_args()
+
+    units = list(synthetic_units(args.units, args.seed))
+    results, counts = run(Inventory(), units, args.lookups, args.seed)
+    report(f"Indexed Inventory ({args.units:,} units)", results, counts)
+
+    if args.sqlite:
+        inv = Inventory(SQLiteStorage(args.sqlite))
+        results, counts = run(inv, units, args.lookups, args.seed)
+        inv.close()
+        report(f"SQLite Inventory ({args.units:,} units)", results, counts)
+
+    list_units = units[: args.list_units]
+    results, counts = run(ListInventory(), list_units, args.lookups, args.seed)
+    report(f"List baseline ({len(list_units):,} units)", results, counts)
+
+    # Bulk receiving into the list is quadratic, so scale the measured time by
+    # the square of the size ratio to estimate the full load.
+    scale = (args.units / max(1, len(list_units))) ** 2
+    print(f"\nEstimated list baseline receive time for {args.units:,} units: {results['receive'] * scale:,.0f}s")
+
+
+if __name__ == "__main__":
+    main()
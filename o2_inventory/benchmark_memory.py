@@ -0,0 +1,78 @@
+import argparse
+import csv
+import gc
+import tracemalloc
+
+from benchmark_inventory import synthetic_units
+from concentrators import unit_from_row, unit_to_row
+from inventory_table import InventoryTable
+
+
+class DictConcentrator:
+    # The dict-backed unit layout from before __slots__, with one string
+    # object per field per unit, as csv.reader hands them out.
+    def __init__(self, unit_type, model, rma, warranty_type, revenue, flow_rate, is_repaired, noise, battery, age):
+        self._model = model
+        self._rma = rma
+        self._warranty_type = warranty_type
+        self._revenue = float(revenue)
+        self._flow_rate = flow_rate
+        self._is_repaired = is_repaired
+        if unit_type == "HomeConcentrator":
+            self._noise_level = float(noise)
+        elif unit_type == "PortableConcentrator":
+            self._battery_level = battery
+        else:
+            self._age = age
+
+
+def csv_rows(count, seed=0):
+    # Round-trip synthetic units through CSV text so each row is built from
+    # freshly parsed strings, the same as loading units.csv.
+    lines = (",".join(map(str, unit_to_row(unit))) for unit in synthetic_units(count, seed))
+    return csv.reader(lines)
+
+
+def build_dict_objects(rows):
+    return [DictConcentrator(*row) for row in rows]
+
+
+def build_slotted_objects(rows):
+    return [unit_from_row(row) for row in rows]
+
+
+def build_table(rows):
+    table = InventoryTable()
+    table.extend(map(unit_from_row, rows))
+    return table
+
+
+def measure(build, count, seed):
+    gc.collect()
+    tracemalloc.start()
+    result = build(csv_rows(count, seed))
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes per unit for each concentrator representation.")
+    parser.add_argument("--units", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"Memory held after loading {args.units:,} units\n")
+    for name, build in (
+        ("dict-backed objects (before)", build_dict_objects),
+        ("__slots__ objects", build_slotted_objects),
+        ("InventoryTable columns", build_table),
+    ):
+        current, peak = measure(build, args.units, args.seed)
+        print(f"  {name:<30} {current / args.units:8.1f} bytes/unit   {current / 2**20:9.1f} MiB   (peak {peak / 2**20:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
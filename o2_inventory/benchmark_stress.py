@@ -0,0 +1,255 @@
+import argparse
+import asyncio
+import datetime
+import json
+import multiprocessing
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmark_inventory import synthetic_units
+from o2_concentrator_inventory_system import Inventory, load_units_from_csv, open_sqlite_inventory, save_units_to_csv
+from inventory_storage import MemoryStorage, SQLiteStorage, TableStorage
+
+BACKENDS = ("memory", "table", "sqlite")
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+
+def make_storage(backend, workdir):
+    if backend == "memory":
+        return MemoryStorage()
+    if backend == "table":
+        return TableStorage()
+    return SQLiteStorage(Path(workdir) / "stress.db")
+
+
+def timed(results, backend, units, op, count, action):
+    start = time.perf_counter()
+    action()
+    elapsed = time.perf_counter() - start
+    results.append({
+        "backend": backend,
+        "units": units,
+        "op": op,
+        "count": count,
+        "seconds": elapsed,
+        "ops_per_sec": count / elapsed if elapsed else None,
+    })
+
+
+def run_fleet(backend, size, lookups, workdir, seed=0):
+    # Times each Inventory operation on one synthetic fleet of the given size.
+    results = []
+    fleet = list(synthetic_units(size, seed))
+    rng = random.Random(seed)
+    sample = [fleet[rng.randrange(size)]._rma for _ in range(lookups)]
+    to_ship = rng.sample(fleet, max(1, size // 10))
+    snapshot = Path(workdir) / f"stress_{backend}_{size}.csv"
+    inv = Inventory(make_storage(backend, workdir))
+
+    def receive():
+        for unit in fleet:
+            inv.receive_unit(unit)
+
+    def check():
+        for rma in sample:
+            inv.check_repair_status(rma)
+
+    def revenue():
+        for _ in range(lookups):
+            inv.show_revenue()
+
+    def ship():
+        for unit in to_ship:
+            inv.ship_unit(unit)
+
+    def load():
+        if backend == "sqlite":
+            open_sqlite_inventory(Path(workdir) / "stress_load.db", snapshot).close()
+        else:
+            load_units_from_csv(snapshot, storage=make_storage(backend, workdir)).close()
+
+    timed(results, backend, size, "receive_unit", size, receive)
+    timed(results, backend, size, "check_repair_status", lookups, check)
+    timed(results, backend, size, "show_revenue", lookups, revenue)
+    timed(results, backend, size, "ship_unit", len(to_ship), ship)
+    remaining = len(inv)
+    timed(results, backend, size, "save_units_to_csv", remaining, lambda: save_units_to_csv(inv, snapshot))
+    inv.close()
+    timed(results, backend, size, "load_units_from_csv", remaining, load)
+    snapshot.unlink()
+    return results
+
+
+def load_generator(url, worker, operations, seed):
+    # One client process: a random mix of receives, status checks, status
+    # changes and ships against the server. Returns per-operation latencies.
+    from inventory_server import InventoryClient
+
+    client = InventoryClient(url)
+    rng = random.Random(seed + worker)
+    received = []
+    latencies = {"receive_unit": [], "check_repair_status": [], "update_repair_status": [], "ship_unit": []}
+    units = synthetic_units(operations, seed + worker)
+    for i, unit in enumerate(units):
+        unit._rma = f"W{worker}-{i}"
+        roll = rng.random()
+        if roll < 0.4 or not received:
+            op = "receive_unit"
+            start = time.perf_counter()
+            client.receive_unit(unit)
+            received.append(unit)
+        elif roll < 0.75:
+            op = "check_repair_status"
+            start = time.perf_counter()
+            client.check_repair_status(rng.choice(received)._rma)
+        elif roll < 0.9:
+            op = "update_repair_status"
+            start = time.perf_counter()
+            client.update_repair_status(rng.choice(received)._rma, rng.choice(("Completed", "Not completed")))
+        else:
+            op = "ship_unit"
+            start = time.perf_counter()
+            client.ship_unit(received.pop(rng.randrange(len(received))))
+        latencies[op].append(time.perf_counter() - start)
+    client.close()
+    return latencies
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else None
+
+
+def run_concurrent(backend, size, clients, operations, workdir, seed=0):
+    # Serves a preloaded fleet with InventoryServer and drives it from
+    # several client processes at once. The server runs on this thread's
+    # event loop (SQLite connections stay on the thread that opened them)
+    # while the loop waits for the client processes to finish.
+    from inventory_server import InventoryServer
+
+    inv = Inventory(make_storage(backend, workdir))
+    inv._stock.add_many(synthetic_units(size, seed))
+    inv.refresh_totals()
+    server = InventoryServer(inv, port=0, snapshot=Path(workdir) / "stress_server.csv")
+
+    async def drive():
+        await server.start()
+        url = f"http://127.0.0.1:{server.port}"
+        try:
+            with multiprocessing.Pool(clients) as pool:
+                pending = pool.starmap_async(load_generator, [(url, worker, operations, seed) for worker in range(clients)])
+                return await asyncio.get_running_loop().run_in_executor(None, pending.get)
+        finally:
+            await server.stop()
+
+    start = time.perf_counter()
+    try:
+        per_worker = asyncio.run(drive())
+    finally:
+        inv.close()
+    elapsed = time.perf_counter() - start
+
+    results = []
+    for op in per_worker[0]:
+        latencies = [latency for worker in per_worker for latency in worker[op]]
+        results.append({
+            "backend": backend,
+            "units": size,
+            "op": f"concurrent:{op}",
+            "clients": clients,
+            "count": len(latencies),
+            "seconds": elapsed,
+            "ops_per_sec": len(latencies) / elapsed if elapsed else None,
+            "p50_ms": percentile(latencies, 0.50) * 1000 if latencies else None,
+            "p95_ms": percentile(latencies, 0.95) * 1000 if latencies else None,
+            "p99_ms": percentile(latencies, 0.99) * 1000 if latencies else None,
+        })
+    return results
+
+
+def compare(results, baseline, tolerance):
+    # Operations whose throughput fell more than tolerance (a fraction)
+    # below the baseline run, as (backend, units, op, baseline, now).
+    before = {(r["backend"], r["units"], r["op"]): r["ops_per_sec"] for r in baseline["results"]}
+    slower = []
+    for r in results["results"]:
+        old = before.get((r["backend"], r["units"], r["op"]))
+        if old and r["ops_per_sec"] is not None and r["ops_per_sec"] < old * (1 - tolerance):
+            slower.append((r["backend"], r["units"], r["op"], old, r["ops_per_sec"]))
+    return slower
+
+
+def run_suite(sizes=DEFAULT_SIZES, backends=BACKENDS, lookups=10_000, clients=0, operations=1000, seed=0, workdir=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = workdir or tmp
+        results = []
+        for size in sizes:
+            for backend in backends:
+                print(f"{backend} / {size:,} units", file=sys.stderr)
+                results.extend(run_fleet(backend, size, lookups, workdir, seed))
+                # Each SQLite run starts from empty databases.
+                for path in Path(workdir).glob("stress*.db*"):
+                    path.unlink()
+                if clients:
+                    results.extend(run_concurrent(backend, size, clients, operations, workdir, seed))
+                    for path in Path(workdir).glob("stress*.db*"):
+                        path.unlink()
+    return {
+        "started": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": multiprocessing.cpu_count(),
+        "settings": {"sizes": list(sizes), "backends": list(backends), "lookups": lookups, "clients": clients, "operations": operations, "seed": seed},
+        "results": results,
+    }
+
+
+def report(results):
+    for r in results["results"]:
+        rate = f"{r['ops_per_sec']:>14,.0f} ops/s" if r["ops_per_sec"] else f"{'-':>20}"
+        line = f"  {r['backend']:<7} {r['units']:>11,}  {r['op']:<36} {r['count']:>10,} ops {r['seconds']:9.3f}s {rate}"
+        if "p95_ms" in r and r["p95_ms"] is not None:
+            line += f"  p50 {r['p50_ms']:.2f}ms  p95 {r['p95_ms']:.2f}ms  p99 {r['p99_ms']:.2f}ms"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time inventory operations on synthetic fleets of increasing size.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma separated fleet sizes, e.g. 10000,100000,1000000,10000000")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--lookups", type=int, default=10_000, help="status checks and revenue reports per fleet")
+    parser.add_argument("--clients", type=int, default=0, help="also run this many client processes against the inventory server")
+    parser.add_argument("--operations", type=int, default=1000, help="operations per client process")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="stress_results.json", help="where to write the results as JSON")
+    parser.add_argument("--baseline", help="results file from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed throughput drop against the baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    backends = args.backends.split(",")
+    for backend in backends:
+        if backend not in BACKENDS:
+            parser.error(f"unknown backend: {backend}")
+    results = run_suite(
+        [int(size) for size in args.sizes.split(",")], backends, args.lookups, args.clients, args.operations, args.seed
+    )
+    with open(args.output, mode="w") as file:
+        json.dump(results, file, indent=2)
+    report(results)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            slower = compare(results, json.load(file), args.tolerance)
+        for backend, units, op, old, new in slower:
+            print(f"REGRESSION {backend} {units:,} {op}: {old:,.0f} -> {new:,.0f} ops/s")
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# Unit classes shared by the inventory program and its storage backends.
+import sys
+
+CSV_HEADER = ["Concentrator_type", "Model", "RMA", "Warranty_type", "Revenue", "Flow_rate", "Repair_status", "Noise_level", "Battery_level", "Age"]
+
+# Warranty types and repair statuses are a small closed set, so each unit
+# points at one shared string (and the columnar InventoryTable stores the
+# code, i.e. the position in these tuples) instead of its own copy.
+WARRANTY_TYPES = ("Manufacture Warranty", "Flat rate", "QM Warranty")
+REPAIR_STATUSES = ("Completed", "Not completed")
+UNIT_TYPES = ("HomeConcentrator", "PortableConcentrator", "PediatricConcentrator")
+
+WARRANTY_CODES = {name: code for code, name in enumerate(WARRANTY_TYPES)}
+
+# The letter used for each warranty type at the receiving prompt and in the
+# pricing rules.
+WARRANTY_NAMES = {"m": "Manufacture Warranty", "f": "Flat rate", "q": "QM Warranty"}
+WARRANTY_LETTERS = {name: letter for letter, name in WARRANTY_NAMES.items()}
+REPAIR_CODES = {name: code for code, name in enumerate(REPAIR_STATUSES)}
+UNIT_TYPE_CODES = {name: code for code, name in enumerate(UNIT_TYPES)}
+
+
+def intern_value(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class Concentrator:
+    __slots__ = ("_model", "_rma", "_warranty_type", "_revenue", "_flow_rate", "_is_repaired")
+
+    def __init__(self, model, rma, warranty_type, revenue, flow_rate, is_repaired):
+        self._model = intern_value(model)
+        self._rma = rma
+        self._warranty_type = intern_value(warranty_type)
+        self._revenue = float(revenue)
+        self._flow_rate = flow_rate
+        self._is_repaired = intern_value(is_repaired)
+
+    @property
+    def unit_type(self):
+        return type(self).__name__
+
+    @property
+    def warranty_type(self):
+        return self._warranty_type
+
+    @property
+    def warranty_code(self):
+        return WARRANTY_CODES.get(self._warranty_type)
+    
+    @property
+    def is_repaired(self):
+        return self._is_repaired
+
+    @is_repaired.setter
+    def is_repaired(self, value):
+        self._is_repaired = intern_value(value)
+
+    def get_info(self):
+        return f"Model: {self._model} - RMA: {self._rma} | Warranty Type: {self._warranty_type} | Revenue: ${self._revenue} | Flow Rate: {self._flow_rate}L | Repaired: {self._is_repaired}"
+
+    def __str__(self):
+        return self.get_info()
+
+
+class HomeConcentrator(Concentrator):
+    __slots__ = ("_noise_level",)
+
+    def __init__(self, model, rma, warranty_type, revenue, flow_rate, is_repaired, noise_level):
+        super().__init__(model, rma, warranty_type, revenue, flow_rate, is_repaired)
+        self._noise_level = float(noise_level)
+
+    def get_info(self):
+        return super().get_info() + f" | Noise level: {self._noise_level} dB"
+
+
+class PortableConcentrator(Concentrator):
+    __slots__ = ("_battery_level",)
+
+    def __init__(self, model, rma, warranty_type, revenue, flow_rate, is_repaired, battery_level):
+        super().__init__(model, rma, warranty_type, revenue, flow_rate, is_repaired)
+        self._battery_level = battery_level
+
+    def get_info(self):
+        return super().get_info() + f" | Battery level: {self._battery_level}%"
+
+
+class PediatricConcentrator(Concentrator):
+    __slots__ = ("_age",)
+
+    def __init__(self, model, rma, warranty_type, revenue, flow_rate, is_repaired, age):
+        super().__init__(model, rma, warranty_type, revenue, flow_rate, is_repaired)
+        self._age = age
+
+    def get_info(self):
+        return super().get_info() + f" | Age: {self._age}"
+
+
+def unit_to_row(unit):
+    return [unit.unit_type, unit._model, unit._rma, unit._warranty_type, unit._revenue, unit._flow_rate, unit._is_repaired, getattr(unit, '_noise_level', 'N/A'), getattr(unit, '_battery_level', 'N/A'), getattr(unit, '_age', 'N/A')]
+
+
+def unit_from_row(row):
+    unit_type, model, rma, warranty, revenue, flow_rate, repaired, noise, battery, age = row
+    if unit_type == "HomeConcentrator":
+        return HomeConcentrator(model, rma, warranty, revenue, flow_rate, repaired, noise)
+    elif unit_type == "PortableConcentrator":
+        return PortableConcentrator(model, rma, warranty, revenue, flow_rate, repaired, battery)
+    elif unit_type == "PediatricConcentrator":
+        return PediatricConcentrator(model, rma, warranty, revenue, flow_rate, repaired, age)
+    return None
@@ -0,0 +1,19 @@
+import pytest
+
+from o2_concentrator_inventory_system import Inventory
+from inventory_storage import MemoryStorage, SQLiteStorage, TableStorage
+
+
+# An empty Inventory over each storage backend; tests that take it run
+# once per backend.
+@pytest.fixture(params=["memory", "table", "sqlite"])
+def inv(request, tmp_path):
+    if request.param == "memory":
+        storage = MemoryStorage()
+    elif request.param == "table":
+        storage = TableStorage()
+    else:
+        storage = SQLiteStorage(tmp_path / "units.db")
+    inventory = Inventory(storage)
+    yield inventory
+    inventory.close()
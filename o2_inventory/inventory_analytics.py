@@ -0,0 +1,147 @@
+import argparse
+
+import numpy as np
+
+from inventory_storage import TableStorage
+from inventory_table import NA, Codebook, to_number
+
+CODE_COLUMNS = ("unit_type", "model", "warranty", "repair")
+NUMBER_COLUMNS = ("revenue", "flow_rate", "noise_level", "battery_level")
+
+
+class Snapshot:
+    # The report's columns as NumPy arrays, one element per unit in stock:
+    # unit type, model, warranty type and repair status as integer codes
+    # into the codebooks, and the numeric fields as float64 with NaN for a
+    # missing value.
+    def __init__(self, codebooks, columns):
+        self.unit_types, self.models, self.warranty_types, self.repair_statuses = codebooks
+        for name, column in columns.items():
+            setattr(self, name, column)
+
+    def __len__(self):
+        return len(self.revenue)
+
+    @classmethod
+    def from_table(cls, table):
+        # Reads the InventoryTable's packed arrays in place; only the live
+        # rows are copied out.
+        alive = np.frombuffer(table.alive, dtype=bool)
+        columns = {}
+        for name in CODE_COLUMNS + NUMBER_COLUMNS:
+            column = getattr(table, name)
+            columns[name] = np.frombuffer(column, dtype=column.typecode)[alive]
+        return cls((table.unit_types, table.models, table.warranty_types, table.repair_statuses), columns)
+
+    @classmethod
+    def from_units(cls, units):
+        # Gathers the columns from unit objects in one pass, for storage
+        # that does not keep them as arrays.
+        codebooks = (Codebook(), Codebook(), Codebook(), Codebook())
+        unit_type, model, warranty, repair = (codebook.code for codebook in codebooks)
+        rows = [
+            (
+                unit_type(unit.unit_type),
+                model(unit._model),
+                warranty(unit._warranty_type),
+                repair(unit._is_repaired),
+                unit._revenue,
+                to_number(unit._flow_rate),
+                to_number(getattr(unit, "_noise_level", NA)),
+                to_number(getattr(unit, "_battery_level", NA)),
+            )
+            for unit in units
+        ]
+        values = np.array(rows, dtype=np.float64).reshape(len(rows), 8)
+        columns = {name: values[:, i].astype(np.intp) for i, name in enumerate(CODE_COLUMNS)}
+        columns.update((name, values[:, i + 4]) for i, name in enumerate(NUMBER_COLUMNS))
+        return cls(codebooks, columns)
+
+
+def distribution(values, bucket_width):
+    # Count / mean / min / max of the non-missing values plus a fixed-width
+    # histogram.
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {"count": 0, "mean": None, "min": None, "max": None, "histogram": {}}
+    buckets, counts = np.unique(np.floor(values / bucket_width) * bucket_width, return_counts=True)
+    return {
+        "count": len(values),
+        "mean": float(values.mean()),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "histogram": dict(zip(buckets.tolist(), counts.tolist())),
+    }
+
+
+def build_snapshot(inv):
+    # The columns behind the inventory: read straight from the columnar
+    # table, or gathered from the units when they are held some other way.
+    if isinstance(inv._stock, TableStorage):
+        return Snapshot.from_table(inv._stock.table)
+    return Snapshot.from_units(inv)
+
+
+def analyze(snapshot):
+    # Everything in the end-of-day report, with NumPy over whole columns.
+    # Groups are summed with bincount over their integer codes, and codes
+    # are only turned back into names at the end.
+    n_warranties = len(snapshot.warranty_types.values)
+    pairs = snapshot.model.astype(np.intp) * n_warranties + snapshot.warranty
+    size = len(snapshot.models.values) * n_warranties
+    pair_counts = np.bincount(pairs, minlength=size)
+    pair_revenue = np.bincount(pairs, weights=snapshot.revenue, minlength=size)
+
+    not_completed = snapshot.repair_statuses.codes.get("Not completed")
+    backlog = np.bincount(snapshot.unit_type[snapshot.repair == not_completed], minlength=len(snapshot.unit_types.values))
+
+    flow = snapshot.flow_rate[~np.isnan(snapshot.flow_rate)]
+    return {
+        "units": len(snapshot),
+        "total_revenue": float(snapshot.revenue.sum()),
+        "revenue_by_model_warranty": {
+            (snapshot.models[pair // n_warranties], snapshot.warranty_types[pair % n_warranties]): float(pair_revenue[pair])
+            for pair in np.flatnonzero(pair_counts).tolist()
+        },
+        "repair_backlog_by_type": {snapshot.unit_types[code]: int(backlog[code]) for code in np.flatnonzero(backlog).tolist()},
+        "average_flow_rate": float(flow.mean()) if len(flow) else None,
+        "noise_level": distribution(snapshot.noise_level, 5.0),
+        "battery_level": distribution(snapshot.battery_level, 10.0),
+    }
+
+
+def inventory_report(inv):
+    return analyze(build_snapshot(inv))
+
+
+def format_report(report):
+    lines = [f"Units in stock: {report['units']}", f"Total revenue: ${report['total_revenue']:.2f}", "", "Revenue by model and warranty:"]
+    for (model, warranty), total in report["revenue_by_model_warranty"].items():
+        lines.append(f"  {model:<12} {warranty:<22} ${total:,.2f}")
+    lines.append("")
+    lines.append("Repair backlog:")
+    for unit_type, count in report["repair_backlog_by_type"].items():
+        lines.append(f"  {unit_type:<22} {count}")
+    if report["average_flow_rate"] is not None:
+        lines.append("")
+        lines.append(f"Average flow rate: {report['average_flow_rate']:.2f}L")
+    for name, unit in (("noise_level", "dB"), ("battery_level", "%")):
+        stats = report[name]
+        if not stats["count"]:
+            continue
+        lines.append("")
+        lines.append(f"{name.replace('_', ' ').capitalize()}: mean {stats['mean']:.1f}{unit}, min {stats['min']:g}{unit}, max {stats['max']:g}{unit}")
+        for bucket, count in stats["histogram"].items():
+            lines.append(f"  {bucket:g}{unit}+  {count}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    from o2_concentrator_inventory_system import file_path, journal_path, load_units_from_csv
+
+    parser = argparse.ArgumentParser(description="Print the end-of-day inventory report.")
+    parser.add_argument("--csv", default=file_path)
+    parser.add_argument("--journal", default=journal_path)
+    args = parser.parse_args()
+    inv = load_units_from_csv(args.csv, args.journal, storage=TableStorage())
+    print(format_report(inventory_report(inv)))
@@ -0,0 +1,282 @@
+import argparse
+import csv
+import datetime
+import json
+import os
+import time
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: one terminal per log
+    fcntl = None
+
+from concentrators import CSV_HEADER, unit_from_row, unit_to_row
+from inventory_journal import read_csv_chunks
+
+REPAIR_COLUMN = CSV_HEADER.index("Repair_status")
+
+
+def to_timestamp(value):
+    # Seconds since the epoch from a number, a datetime or an ISO date/time.
+    if value is None:
+        return time.time()
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time.max)
+    return value.timestamp()
+
+
+def format_timestamp(ts):
+    return datetime.datetime.fromtimestamp(ts).isoformat(sep=" ", timespec="seconds")
+
+
+class EventStore:
+    # Append-only audit log of every inventory change, one JSON object per
+    # line with a sequence number and a timestamp. Unlike the journal it is
+    # never truncated. Every snapshot_every events the whole inventory is
+    # written to a snapshot file and the snapshot's sequence number,
+    # timestamp and byte offset in the log go into snapshots.jsonl. To
+    # rebuild the inventory at some time, replay starts from the last
+    # snapshot taken before it and reads at most snapshot_every events.
+    #
+    # Several terminals sharing a database (--db) share the log too. Each
+    # event is appended with the log locked, after reading what the other
+    # terminals appended since, so sequence numbers stay unique and
+    # timestamps in order.
+    def __init__(self, path, snapshot_every=100_000, sync=False):
+        self.path = Path(path)
+        self.snapshot_dir = Path(f"{path}.snapshots")
+        self.snapshot_every = snapshot_every
+        self.sync = sync
+        self.inv = None
+        self._file = None
+        self._snapshots = []
+        self._snapshot_times = []
+        self._snapshots_read = 0
+
+        # Pick up the sequence number and clock where the log left off.
+        self._read_snapshots()
+        self.seq = self._snapshots[-1]["seq"] if self._snapshots else 0
+        self.last_ts = self._snapshots[-1]["ts"] if self._snapshots else 0.0
+        self._offset = self._snapshots[-1]["offset"] if self._snapshots else 0
+        self._catch_up()
+
+    def attach(self, inv):
+        # Record inv's changes from now on. A new log starts with a snapshot
+        # of the inventory as it is, so units received before the log
+        # existed still show up in replays.
+        self.inv = inv
+        inv.add_listener(self.record)
+        with self._locked():
+            if not self._snapshots:
+                self.last_ts = max(time.time(), self.last_ts)
+                self._snapshot()
+        return self
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, mode="ab")
+        return self._file
+
+    @contextmanager
+    def _locked(self):
+        # Holds the log's lock, caught up with every event and snapshot
+        # written under it so far.
+        file = self._open()
+        if fcntl is not None:
+            fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            # Terminate a line torn by a crash, as the journal does.
+            if file.seek(0, os.SEEK_END) > 0:
+                with open(self.path, mode="rb") as log:
+                    log.seek(-1, os.SEEK_END)
+                    if log.read(1) != b"\n":
+                        file.write(b"\n")
+                        file.flush()
+            self._catch_up()
+            yield file
+        finally:
+            if fcntl is not None:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    def _catch_up(self):
+        # Reads the events appended since this store last looked: those
+        # before it was opened, then other terminals'. A line still being
+        # written is left for next time.
+        try:
+            with open(self.path, mode="rb") as file:
+                file.seek(self._offset)
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        break
+                    self._offset += len(line)
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.seq = event["seq"]
+                    self.last_ts = max(event["ts"], self.last_ts)
+        except FileNotFoundError:
+            pass
+        self._read_snapshots()
+        self.since_snapshot = self.seq - self._snapshots[-1]["seq"] if self._snapshots else self.seq
+
+    def _read_snapshots(self):
+        try:
+            with open(self.snapshot_dir / "snapshots.jsonl", mode="rb") as file:
+                file.seek(self._snapshots_read)
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        break
+                    self._snapshots_read += len(line)
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._snapshots.append(entry)
+                    self._snapshot_times.append(entry["ts"])
+        except FileNotFoundError:
+            pass
+
+    def record(self, event, unit, *details):
+        # Inventory listener. Timestamps never go backwards, even if the
+        # clock does, so replay can stop at the first event past its target.
+        with self._locked() as file:
+            self.seq += 1
+            self.last_ts = max(time.time(), self.last_ts)
+            data = {"seq": self.seq, "ts": self.last_ts, "event": event}
+            if event == "receive":
+                data["unit"] = unit_to_row(unit)
+            else:
+                data["rma"] = unit._rma
+            if event == "status":
+                data["old"], data["new"] = details
+            line = json.dumps(data, separators=(",", ":")).encode() + b"\n"
+            file.write(line)
+            file.flush()
+            if self.sync:
+                os.fsync(file.fileno())
+            self._offset += len(line)
+            self.since_snapshot += 1
+            if self.since_snapshot >= self.snapshot_every:
+                self._snapshot()
+
+    def snapshot(self):
+        with self._locked():
+            self._snapshot()
+
+    def _snapshot(self):
+        # Called with the log locked.
+        self.snapshot_dir.mkdir(exist_ok=True)
+        offset = self._offset
+        name = f"{self.seq:012d}.csv"
+        tmp_name = self.snapshot_dir / f"{name}.tmp"
+        with open(tmp_name, mode="w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(CSV_HEADER)
+            writer.writerows(unit_to_row(unit) for unit in self.inv)
+        os.replace(tmp_name, self.snapshot_dir / name)
+        entry = {"seq": self.seq, "ts": self.last_ts, "offset": offset, "file": name}
+        with open(self.snapshot_dir / "snapshots.jsonl", mode="a") as file:
+            file.write(json.dumps(entry) + "\n")
+        self._read_snapshots()
+        self.since_snapshot = 0
+
+    def _read(self, offset=0):
+        try:
+            with open(self.path, mode="rb") as file:
+                file.seek(offset)
+                for line in file:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+        except FileNotFoundError:
+            return
+
+    def events(self, since=None, until=None):
+        # Events in order, optionally limited to a time range. Starts from
+        # the log offset of the last snapshot before since.
+        since = to_timestamp(since) if since is not None else None
+        until = to_timestamp(until) if until is not None else None
+        offset = 0
+        if since is not None:
+            position = bisect_left(self._snapshot_times, since)
+            if position:
+                offset = self._snapshots[position - 1]["offset"]
+        for event in self._read(offset):
+            if until is not None and event["ts"] > until:
+                break
+            if since is None or event["ts"] >= since:
+                yield event
+
+    def history(self, rma):
+        # Every event for one unit: when it was received, its status changes
+        # and when it was shipped.
+        rma = rma.upper()
+        for event in self._read():
+            if event.get("rma", "") == rma or event["event"] == "receive" and event["unit"][2] == rma:
+                yield event
+
+    def state_at(self, when=None):
+        # The inventory's rows as of a time, keyed by RMA in receive order.
+        # Before the first snapshot nothing was recorded, so it is empty.
+        until = to_timestamp(when)
+        position = bisect_right(self._snapshot_times, until)
+        if not position:
+            return {}
+        snapshot = self._snapshots[position - 1]
+        rows = {}
+        for chunk in read_csv_chunks(self.snapshot_dir / snapshot["file"]):
+            for row in chunk:
+                rows[row[2]] = row
+        for event in self._read(snapshot["offset"]):
+            if event["ts"] > until:
+                break
+            if event["event"] == "receive":
+                rows[event["unit"][2]] = event["unit"]
+            elif event["event"] == "ship":
+                rows.pop(event["rma"], None)
+            elif event["event"] == "status" and event["rma"] in rows:
+                rows[event["rma"]][REPAIR_COLUMN] = event["new"]
+        return rows
+
+    def inventory_at(self, when=None, storage=None):
+        from o2_concentrator_inventory_system import Inventory
+
+        # Units are added as recorded, without repricing or revalidating them.
+        inventory = Inventory(storage)
+        inventory._stock.add_many(unit for unit in map(unit_from_row, self.state_at(when).values()) if unit is not None)
+        inventory.refresh_totals()
+        return inventory
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+if __name__ == "__main__":
+    from o2_concentrator_inventory_system import events_path
+
+    parser = argparse.ArgumentParser(description="Look back through the inventory's audit log.")
+    parser.add_argument("--at", help="show the inventory as it was at this ISO date/time")
+    parser.add_argument("--rma", help="show every event for this unit")
+    parser.add_argument("--events", default=events_path)
+    args = parser.parse_args()
+    store = EventStore(args.events)
+    if args.rma:
+        for event in store.history(args.rma):
+            details = event.get("new", "")
+            print(f"{format_timestamp(event['ts'])}  #{event['seq']:<8} {event['event']:<8} {details}")
+    else:
+        inv = store.inventory_at(args.at)
+        print(f"Inventory at {format_timestamp(to_timestamp(args.at))}:\n")
+        print(inv.show_counts())
+        print(inv.show_revenue())
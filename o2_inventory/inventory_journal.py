@@ -0,0 +1,95 @@
+import csv
+import os
+from itertools import islice
+from pathlib import Path
+
+from concentrators import REPAIR_STATUSES, UNIT_TYPES
+
+# Number of fields each journal record carries after the operation name.
+RECORD_FIELDS = {"receive": 10, "ship": 1, "status": 2}
+# Fields that must hold one of a closed set of values, by operation and
+# position after the operation name: a receive record's unit type and
+# repair status, and a status record's new status.
+RECORD_VALUES = {"receive": {0: UNIT_TYPES, 6: REPAIR_STATUSES}, "status": {1: REPAIR_STATUSES}}
+
+
+def valid_record(row):
+    op, fields = row[0], row[1:]
+    if RECORD_FIELDS.get(op) != len(fields):
+        return False
+    return all(fields[i] in values for i, values in RECORD_VALUES.get(op, {}).items())
+
+
+class InventoryJournal:
+    # Append-only log of inventory changes made since the last snapshot.
+    # Every record is flushed as soon as it is written, so a crash loses at
+    # most the record being written. Replay only applies complete records:
+    # a last line without its line ending was torn by a crash and is
+    # skipped, as is any record with the wrong fields or values.
+    def __init__(self, path, compact_every=1000, sync=False):
+        self.path = Path(path)
+        self.compact_every = compact_every
+        self.sync = sync
+        self.entries = 0
+        self._file = None
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, mode="a+", newline="")
+            # Terminate a record torn by a crash so the next one starts on a
+            # fresh line instead of being glued onto it.
+            if self._file.tell() > 0:
+                self._file.seek(self._file.tell() - 1)
+                if self._file.read(1) != "\n":
+                    self._file.write("\r\n")
+            self._writer = csv.writer(self._file)
+        return self._file
+
+    def append(self, op, fields):
+        file = self._open()
+        self._writer.writerow([op, *fields])
+        file.flush()
+        if self.sync:
+            os.fsync(file.fileno())
+        self.entries += 1
+
+    def replay(self):
+        self.entries = 0
+        try:
+            with open(self.path, mode="r", newline="") as file:
+                for line in file:
+                    if not line.endswith("\n"):
+                        break
+                    row = next(csv.reader([line]), None)
+                    if not row or not valid_record(row):
+                        continue
+                    self.entries += 1
+                    yield row[0], row[1:]
+        except FileNotFoundError:
+            return
+
+    def needs_compaction(self):
+        return self.entries >= self.compact_every
+
+    def truncate(self):
+        self.close()
+        open(self.path, mode="w").close()
+        self.entries = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_csv_chunks(filename, chunk_size=10000):
+    # Yields the data rows of a CSV file in lists of at most chunk_size rows,
+    # so a large snapshot never has to be held in memory as a whole.
+    with open(filename, mode="r", newline="") as file:
+        reader = csv.reader(file)
+        next(reader, None)
+        while True:
+            chunk = list(islice(reader, chunk_size))
+            if not chunk:
+                break
+            yield chunk
@@ -0,0 +1,328 @@
+import argparse
+import asyncio
+import http.client
+import json
+import traceback
+from urllib.parse import parse_qs, quote, urlencode, urlsplit
+
+from concentrators import CSV_HEADER, REPAIR_STATUSES, unit_from_row, unit_to_row
+from o2_concentrator_inventory_system import (
+    compact_inventory,
+    events_path,
+    file_path,
+    journal_path,
+    load_units_from_csv,
+    open_sqlite_inventory,
+    record_to_unit,
+)
+from inventory_storage import TableStorage
+from stock_view import FILTERS, PAGE_SIZE, Page
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 409: "Conflict", 500: "Internal Server Error"}
+
+
+def unit_to_json(unit):
+    return dict(zip(CSV_HEADER, unit_to_row(unit)))
+
+
+def unit_from_json(data):
+    return unit_from_row([str(data.get(column, "N/A")) for column in CSV_HEADER])
+
+
+class InventoryServer:
+    # Owns the Inventory for every terminal and scanner. Requests are handled
+    # on one asyncio event loop and no handler awaits while it touches the
+    # inventory, so each mutation runs to completion before the next request
+    # is looked at. Changes are journaled one record at a time; the snapshot
+    # is only rewritten every compact_every changes and on shutdown.
+    def __init__(self, inv, host=DEFAULT_HOST, port=DEFAULT_PORT, snapshot=file_path):
+        self.inv = inv
+        self.host = host
+        self.port = port
+        self.snapshot = snapshot
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+        if self.inv.journal:
+            compact_inventory(self.inv, self.snapshot)
+        self.inv.close()
+
+    async def _serve_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = self.handle(method, target, body)
+                data = json.dumps(payload).encode()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def handle(self, method, target, body=b""):
+        url = urlsplit(target)
+        parts = [part for part in url.path.split("/") if part]
+        try:
+            data = json.loads(body) if body else {}
+        except json.JSONDecodeError:
+            return 400, {"error": "Request body is not valid JSON"}
+        try:
+            try:
+                status, payload = self._route(method, parts, parse_qs(url.query), data)
+            except (KeyError, TypeError, ValueError) as e:
+                return 400, {"error": str(e)}
+            if method != "GET" and self.inv.journal and self.inv.journal.needs_compaction():
+                compact_inventory(self.inv, self.snapshot)
+        except Exception as e:
+            # A bug or a storage failure (e.g. a full disk) still gets an
+            # answer rather than a dropped connection.
+            traceback.print_exc()
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+        return status, payload
+
+    def _route(self, method, parts, query, data):
+        inv = self.inv
+        if parts == ["summary"] and method == "GET":
+            return 200, {"units": len(inv), "total_revenue": inv.totals.revenue_cents / 100}
+
+        if parts == ["totals"] and method == "GET":
+            return 200, {"units": len(inv), **inv.totals.as_dict()}
+
+        if parts == ["units"]:
+            if method == "GET" and "page" in query:
+                filters = {name: query[name][0] for name in FILTERS if name in query}
+                page = inv.show_page(
+                    int(query["page"][0]),
+                    int(query.get("size", [str(PAGE_SIZE)])[0]),
+                    query.get("sort", [None])[0],
+                    query.get("order", ["asc"])[0] == "desc",
+                    **filters,
+                )
+                return 200, {"units": [unit_to_json(unit) for unit in page.units], "page": page.number, "size": page.size, "has_next": page.has_next}
+            if method == "GET":
+                offset = int(query.get("offset", ["0"])[0])
+                limit = int(query.get("limit", ["0"])[0])
+                units = []
+                for position, unit in enumerate(inv):
+                    if position < offset:
+                        continue
+                    if limit and len(units) >= limit:
+                        break
+                    units.append(unit_to_json(unit))
+                return 200, {"units": units}
+            if method == "POST":
+                unit = record_to_unit(data)
+                result = inv.receive_many([data])
+                if result.errors:
+                    return 409, {"error": result.errors[0][2]}
+                return 201, unit_to_json(unit)
+            return 405, {"error": "Method not allowed"}
+
+        if parts == ["units", "bulk"] and method == "POST":
+            result = inv.receive_many(data["units"])
+            return 200, {"received": result.succeeded, "errors": result.errors}
+
+        if parts == ["units", "ship"] and method == "POST":
+            result = inv.ship_many(data["rmas"])
+            return 200, {"shipped": result.succeeded, "errors": result.errors}
+
+        if len(parts) >= 2 and parts[0] == "units":
+            rma = parts[1].upper()
+            if len(parts) == 2 and method == "GET":
+                unit = inv.get_unit(rma)
+                return (200, unit_to_json(unit)) if unit else (404, {"error": f"Unit with RMA {rma} not found"})
+            if len(parts) == 2 and method == "DELETE":
+                if not inv.ship_many([rma]).succeeded:
+                    return 404, {"error": f"Unit with RMA {rma} not found"}
+                return 200, {"shipped": rma}
+            if len(parts) == 3 and parts[2] in ("status", "warranty") and method == "GET":
+                field = "repair_status" if parts[2] == "status" else "warranty_type"
+                value = inv._stock.get_field(rma, field)
+                return (200, {field: value}) if value is not None else (404, {"error": f"Unit with RMA {rma} not found"})
+            if len(parts) == 3 and parts[2] == "status" and method == "PUT":
+                if data["status"] not in REPAIR_STATUSES:
+                    return 400, {"error": f"Unknown repair status: {data['status']}"}
+                if not inv.update_repair_status(rma, data["status"]):
+                    return 404, {"error": f"Unit with RMA {rma} not found"}
+                return 200, {"repair_status": data["status"]}
+
+        return 404, {"error": "No such endpoint"}
+
+
+class InventoryClient:
+    # Talks to an InventoryServer over one keep-alive connection and offers
+    # the Inventory methods main() uses, so the menu can run as a thin client.
+    journal = None
+
+    def __init__(self, url=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", timeout=30):
+        parts = urlsplit(url)
+        self._host = parts.hostname
+        self._port = parts.port or 80
+        self._timeout = timeout
+        self._conn = None
+
+    def _request(self, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        for attempt in range(2):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self._host, self._port, timeout=self._timeout)
+            try:
+                self._conn.request(method, path, body=body, headers=headers)
+                response = self._conn.getresponse()
+                return response.status, json.loads(response.read() or b"null")
+            except (ConnectionError, http.client.HTTPException):
+                # The server may have dropped an idle connection; retry once.
+                self._conn.close()
+                self._conn = None
+                if attempt:
+                    raise
+
+    def _unit_path(self, rma, suffix=""):
+        return f"/units/{quote(rma, safe='')}{suffix}"
+
+    def __len__(self):
+        return self._request("GET", "/summary")[1]["units"]
+
+    def __iter__(self):
+        return (unit_from_json(data) for data in self._request("GET", "/units")[1]["units"])
+
+    def __contains__(self, rma):
+        return self._request("GET", self._unit_path(rma, "/status"))[0] == 200
+
+    def get_unit(self, rma):
+        status, data = self._request("GET", self._unit_path(rma))
+        return unit_from_json(data) if status == 200 else None
+
+    def receive_unit(self, unit):
+        status, data = self._request("POST", "/units", unit_to_json(unit))
+        if status != 201:
+            print(f"\n{data['error']}! Unit not added.\n")
+            return False
+        return True
+
+    def ship_unit(self, unit):
+        status, _ = self._request("DELETE", self._unit_path(unit._rma))
+        if status != 200:
+            print("\nUnit not found!\n")
+            return False
+        return True
+
+    def receive_many(self, records):
+        return self._request("POST", "/units/bulk", {"units": list(records)})[1]
+
+    def ship_many(self, rmas):
+        return self._request("POST", "/units/ship", {"rmas": list(rmas)})[1]
+
+    def update_repair_status(self, rma, status):
+        return self._request("PUT", self._unit_path(rma, "/status"), {"status": status})[0] == 200
+
+    def check_repair_status(self, rma):
+        return self._request("GET", self._unit_path(rma, "/status"))[1].get("repair_status")
+
+    def check_warranty_type(self, rma):
+        return self._request("GET", self._unit_path(rma, "/warranty"))[1].get("warranty_type")
+
+    def show_stock(self):
+        units = list(self)
+        if not units:
+            return "No units in inventory"
+        return "\n".join(str(unit) for unit in units)
+
+    def show_page(self, number=1, size=PAGE_SIZE, sort=None, descending=False, **filters):
+        query = {"page": number, "size": size, **{name: value for name, value in filters.items() if value}}
+        if sort:
+            query["sort"] = sort
+            query["order"] = "desc" if descending else "asc"
+        status, data = self._request("GET", f"/units?{urlencode(query)}")
+        if status != 200:
+            raise ValueError(data["error"])
+        return Page([unit_from_json(unit) for unit in data["units"]], data["page"], data["size"], data["has_next"])
+
+    def show_revenue(self):
+        return f"Total Revenue value: ${self._request('GET', '/summary')[1]['total_revenue']:.2f}"
+
+    def show_counts(self):
+        totals = self._request("GET", "/totals")[1]
+        by_status = ", ".join(f"{name}: {count}" for name, count in sorted(totals["count_by_status"].items()))
+        by_type = ", ".join(f"{name}: {count}" for name, count in sorted(totals["count_by_type"].items()))
+        return f"Units: {totals['units']} | {by_status} | {by_type}"
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the O2 inventory to the menu clients and scanners over HTTP.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--db", help="keep the inventory in this SQLite database instead of units.csv")
+    parser.add_argument("--columnar", action="store_true")
+    parser.add_argument("--compact-every", type=int, default=50_000, help="journal records between snapshot rewrites")
+    args = parser.parse_args()
+
+    if args.db:
+        inv = open_sqlite_inventory(args.db, events_file=events_path)
+    else:
+        inv = load_units_from_csv(file_path, journal_path, storage=TableStorage() if args.columnar else None, events_file=events_path)
+        inv.journal.compact_every = args.compact_every
+
+    server = InventoryServer(inv, args.host, args.port)
+    print(f"Serving {len(inv)} units on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        print("\nSaved!\n")
+
+
+if __name__ == "__main__":
+    main()
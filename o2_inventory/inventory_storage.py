@@ -0,0 +1,328 @@
+import sqlite3
+
+from concentrators import unit_from_row, unit_to_row
+from inventory_table import InventoryTable
+
+# Fields that can be used with find(); these are the ones both backends index.
+INDEXED_FIELDS = ("model", "warranty_type", "repair_status", "unit_type")
+
+# Column order matches concentrators.CSV_HEADER / unit_to_row.
+COLUMNS = "unit_type, model, rma, warranty_type, revenue, flow_rate, repair_status, noise_level, battery_level, age"
+
+# SQL for the stock view's sort keys (stock_view.SORT_KEYS). A flow rate
+# that is not a number is NULL, and sorts last like NaN does there.
+SORT_EXPRESSIONS = {
+    "rma": "rma",
+    "model": "model",
+    "revenue": "revenue",
+    "flow_rate": "CASE WHEN TRIM(flow_rate) GLOB '*[0-9]*' THEN CAST(flow_rate AS REAL) END",
+}
+
+# What SQLiteStorage's totals table keeps per unit, as (kind, name, value)
+# for the unit row r: revenue in whole cents by warranty type, and one unit
+# by repair status and by unit type.
+TOTALS = (
+    ("revenue", "{r}.warranty_type", "CAST(ROUND({r}.revenue * 100) AS INTEGER)"),
+    ("status", "{r}.repair_status", "1"),
+    ("type", "{r}.unit_type", "1"),
+)
+
+
+def _totals_sql(row, sign):
+    # Statements that add (sign 1) or take away (sign -1) one unit row's
+    # share of the totals, for the triggers on the units table.
+    return "".join(
+        f"INSERT INTO totals (kind, name, value) VALUES ('{kind}', {name.format(r=row)}, {sign} * {value.format(r=row)}) "
+        "ON CONFLICT (kind, name) DO UPDATE SET value = value + excluded.value;\n"
+        for kind, name, value in TOTALS
+    )
+
+
+class MemoryStorage:
+    # Units are keyed by RMA; dicts keep insertion order so show_stock lists
+    # units in the order they were received. The secondary indexes map a
+    # model / warranty type / repair status / unit type to the units carrying it.
+    def __init__(self):
+        self._units = {}
+        self._indexes = {field: {} for field in INDEXED_FIELDS}
+
+    def __len__(self):
+        return len(self._units)
+
+    def __iter__(self):
+        return iter(self._units.values())
+
+    def __contains__(self, rma):
+        return rma in self._units
+
+    def _keys(self, unit):
+        return zip(INDEXED_FIELDS, (unit._model, unit._warranty_type, unit._is_repaired, unit.unit_type))
+
+    def _index(self, unit):
+        for field, key in self._keys(unit):
+            self._indexes[field].setdefault(key, {})[unit._rma] = unit
+
+    def _unindex(self, unit):
+        for field, key in self._keys(unit):
+            index = self._indexes[field]
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.pop(unit._rma, None)
+                if not bucket:
+                    del index[key]
+
+    def get(self, rma):
+        return self._units.get(rma)
+
+    def get_field(self, rma, field):
+        unit = self._units.get(rma)
+        return dict(self._keys(unit))[field] if unit else None
+
+    def add(self, unit):
+        if unit._rma in self._units:
+            return False
+        self._units[unit._rma] = unit
+        self._index(unit)
+        return True
+
+    def add_many(self, units):
+        # Returns the units actually added; duplicate RMAs are skipped.
+        return [unit for unit in units if self.add(unit)]
+
+    def remove(self, rma):
+        # Returns the removed unit; raises KeyError if no unit has the RMA.
+        unit = self._units.pop(rma)
+        self._unindex(unit)
+        return unit
+
+    def set_repair_status(self, rma, status):
+        # Returns the status the unit had; raises KeyError if no unit has
+        # the RMA.
+        unit = self._units[rma]
+        old_status = unit._is_repaired
+        self._unindex(unit)
+        unit.is_repaired = status
+        self._index(unit)
+        return old_status
+
+    def find(self, field, value):
+        return list(self._indexes[field].get(value, {}).values())
+
+    def close(self):
+        pass
+
+
+class TableStorage:
+    # Backend over the columnar InventoryTable, for inventories too large to
+    # keep one object per unit. Units handed out are ConcentratorViews.
+    _COLUMNS = {"model": "model", "warranty_type": "warranty", "repair_status": "repair", "unit_type": "unit_type"}
+
+    def __init__(self, table=None):
+        self.table = table if table is not None else InventoryTable()
+        self._codebooks = {
+            "model": self.table.models,
+            "warranty_type": self.table.warranty_types,
+            "repair_status": self.table.repair_statuses,
+            "unit_type": self.table.unit_types,
+        }
+
+    def __len__(self):
+        return len(self.table)
+
+    def __iter__(self):
+        return iter(self.table)
+
+    def __contains__(self, rma):
+        return rma in self.table
+
+    def get(self, rma):
+        return self.table.get(rma)
+
+    def get_field(self, rma, field):
+        row = self.table.row_of(rma)
+        if row is None:
+            return None
+        return self._codebooks[field][getattr(self.table, self._COLUMNS[field])[row]]
+
+    def add(self, unit):
+        return self.table.append(unit)
+
+    def add_many(self, units):
+        return [unit for unit in units if self.table.append(unit)]
+
+    def remove(self, rma):
+        unit = self.table.remove(rma)
+        if unit is None:
+            raise KeyError(rma)
+        return unit
+
+    def set_repair_status(self, rma, status):
+        old_status = self.get_field(rma, "repair_status")
+        if old_status is None:
+            raise KeyError(rma)
+        self.table.set_repair_status(rma, status)
+        return old_status
+
+    def find(self, field, value):
+        code = self._codebooks[field].codes.get(value)
+        if code is None:
+            return []
+        column = getattr(self.table, self._COLUMNS[field])
+        return [self.table.get(self.table.rma[row]) for row in self.table.live_rows() if column[row] == code]
+
+    def close(self):
+        pass
+
+
+class SQLiteStorage:
+    # Keeps units in an SQLite database so several terminals can read the
+    # inventory at once. WAL mode lets readers carry on while one writer
+    # commits. Units handed out are copies built from their row, so changes
+    # must go through set_repair_status rather than the unit's attributes.
+    def __init__(self, path=":memory:"):
+        self._conn = sqlite3.connect(str(path), timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS units (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                unit_type TEXT NOT NULL,
+                model TEXT NOT NULL,
+                rma TEXT NOT NULL UNIQUE,
+                warranty_type TEXT NOT NULL,
+                revenue REAL NOT NULL,
+                flow_rate TEXT,
+                repair_status TEXT NOT NULL,
+                noise_level TEXT,
+                battery_level TEXT,
+                age TEXT
+            );
+            CREATE INDEX IF NOT EXISTS units_model ON units (model);
+            CREATE INDEX IF NOT EXISTS units_warranty_type ON units (warranty_type);
+            CREATE INDEX IF NOT EXISTS units_repair_status ON units (repair_status);
+            CREATE INDEX IF NOT EXISTS units_unit_type ON units (unit_type);
+            """
+        )
+        self._create_totals()
+
+    def _create_totals(self):
+        # Revenue and counts are kept in a small totals table by triggers on
+        # units, so every terminal reads the same figures in O(1) whoever
+        # changed the units. A database from before the table existed is
+        # summed into it once, under a write lock so two terminals opening
+        # it at once do not both do it.
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            exists = self._conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'totals'").fetchone()
+            if exists:
+                return
+            self._conn.execute(
+                "CREATE TABLE totals (kind TEXT NOT NULL, name TEXT NOT NULL, value INTEGER NOT NULL, PRIMARY KEY (kind, name))"
+            )
+            self._conn.execute(f"CREATE TRIGGER units_totals_insert AFTER INSERT ON units BEGIN\n{_totals_sql('NEW', 1)}END")
+            self._conn.execute(f"CREATE TRIGGER units_totals_delete AFTER DELETE ON units BEGIN\n{_totals_sql('OLD', -1)}END")
+            self._conn.execute(
+                "CREATE TRIGGER units_totals_update AFTER UPDATE OF warranty_type, revenue, repair_status, unit_type ON units "
+                f"BEGIN\n{_totals_sql('OLD', -1)}{_totals_sql('NEW', 1)}END"
+            )
+            for kind, name, value in TOTALS:
+                name, value = name.format(r="units"), value.format(r="units")
+                self._conn.execute(f"INSERT INTO totals SELECT '{kind}', {name}, SUM({value}) FROM units GROUP BY {name}")
+
+    def __len__(self):
+        # The unit counts by type add up to the number of units.
+        return self._conn.execute("SELECT COALESCE(SUM(value), 0) FROM totals WHERE kind = 'type'").fetchone()[0]
+
+    def __iter__(self):
+        cursor = self._conn.execute(f"SELECT {COLUMNS} FROM units ORDER BY seq")
+        for row in cursor:
+            yield self._row_to_unit(row)
+
+    def __contains__(self, rma):
+        return self._conn.execute("SELECT 1 FROM units WHERE rma = ?", (rma,)).fetchone() is not None
+
+    def _row_to_unit(self, row):
+        return unit_from_row([str(value) if value is not None else "N/A" for value in row]) if row else None
+
+    def get(self, rma):
+        row = self._conn.execute(f"SELECT {COLUMNS} FROM units WHERE rma = ?", (rma,)).fetchone()
+        return self._row_to_unit(row)
+
+    def get_field(self, rma, field):
+        if field not in INDEXED_FIELDS:
+            raise ValueError(f"Unknown field: {field}")
+        row = self._conn.execute(f"SELECT {field} FROM units WHERE rma = ?", (rma,)).fetchone()
+        return row[0] if row else None
+
+    def add(self, unit):
+        try:
+            self._conn.execute(f"INSERT INTO units ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", unit_to_row(unit))
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def add_many(self, units):
+        # One transaction for the whole batch. Returns the units actually
+        # inserted: a duplicate RMA, including one another terminal has
+        # just added, is skipped by the database.
+        insert = f"INSERT OR IGNORE INTO units ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+        with self._conn:
+            self._conn.execute("BEGIN")
+            return [unit for unit in units if self._conn.execute(insert, unit_to_row(unit)).rowcount == 1]
+
+    def remove(self, rma):
+        # The row is read and deleted in one write transaction, so when two
+        # terminals ship the same RMA only one of them gets the unit back.
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            unit = self.get(rma)
+            if self._conn.execute("DELETE FROM units WHERE rma = ?", (rma,)).rowcount != 1:
+                raise KeyError(rma)
+        return unit
+
+    def set_repair_status(self, rma, status):
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            old_status = self.get_field(rma, "repair_status")
+            cursor = self._conn.execute("UPDATE units SET repair_status = ? WHERE rma = ?", (status, rma))
+            if cursor.rowcount != 1:
+                raise KeyError(rma)
+        return old_status
+
+    def find(self, field, value):
+        if field not in INDEXED_FIELDS:
+            raise ValueError(f"Unknown field: {field}")
+        cursor = self._conn.execute(f"SELECT {COLUMNS} FROM units WHERE {field} = ? ORDER BY seq", (value,))
+        return [self._row_to_unit(row) for row in cursor]
+
+    def sorted_units(self, field, descending=False, limit=None, **filters):
+        # Units matching filters ({indexed field: value}), ordered by a sort
+        # key and then RMA by the database, so units other terminals have
+        # received or shipped are listed (or not) like this terminal's own.
+        for name in filters:
+            if name not in INDEXED_FIELDS:
+                raise ValueError(f"Unknown field: {name}")
+        expression = SORT_EXPRESSIONS[field]
+        direction = "DESC" if descending else "ASC"
+        where = " AND ".join(f"{name} = ?" for name in filters) or "1"
+        query = (
+            f"SELECT {COLUMNS} FROM units WHERE {where} "
+            f"ORDER BY ({expression}) IS NULL {direction}, {expression} {direction}, rma {direction}"
+        )
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        return [self._row_to_unit(row) for row in self._conn.execute(query, list(filters.values()))]
+
+    def aggregate_totals(self):
+        # (revenue in cents by warranty type, units by repair status, units
+        # by type), read from the trigger-maintained totals table. Other
+        # terminals change the same units, so these are read fresh rather
+        # than counted in-process.
+        totals = {kind: {} for kind, _, _ in TOTALS}
+        for kind, name, value in self._conn.execute("SELECT kind, name, value FROM totals WHERE value != 0"):
+            totals[kind][name] = value
+        return totals["revenue"], totals["status"], totals["type"]
+
+    def close(self):
+        self._conn.close()
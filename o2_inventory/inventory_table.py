@@ -0,0 +1,248 @@
+import math
+from array import array
+from itertools import compress
+
+from concentrators import (
+    REPAIR_STATUSES,
+    UNIT_TYPES,
+    WARRANTY_TYPES,
+    HomeConcentrator,
+    PediatricConcentrator,
+    PortableConcentrator,
+)
+
+UNIT_CLASSES = (HomeConcentrator, PortableConcentrator, PediatricConcentrator)
+EXTRA_FIELDS = ("_noise_level", "_battery_level", "_age")
+NUMERIC_COLUMNS = ("revenue", "flow_rate", "noise_level", "battery_level", "age")
+NA = float("nan")
+
+
+def to_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return NA
+
+
+def format_number(value):
+    if math.isnan(value):
+        return "N/A"
+    return str(int(value)) if value.is_integer() else str(value)
+
+
+class Codebook:
+    # Maps a small set of repeated strings (models, warranty types, ...) to
+    # integer codes. Values outside the initial set get new codes on demand.
+    def __init__(self, values=()):
+        self.values = list(values)
+        self.codes = {value: code for code, value in enumerate(self.values)}
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __getitem__(self, code):
+        return self.values[code]
+
+
+class InventoryTable:
+    # Column-per-field storage for a large inventory: strings that repeat are
+    # stored as small integer codes and the numeric fields as packed doubles,
+    # so a unit costs a few dozen bytes instead of a full Python object.
+    # Shipped rows are tombstoned to keep the receive order; compact() drops
+    # them once they outnumber the live rows, renumbering the rest.
+    # ConcentratorViews look their row up by RMA, so they survive that.
+    def __init__(self):
+        self.unit_types = Codebook(UNIT_TYPES)
+        self.models = Codebook()
+        self.warranty_types = Codebook(WARRANTY_TYPES)
+        self.repair_statuses = Codebook(REPAIR_STATUSES)
+
+        self.unit_type = array("B")
+        self.model = array("H")
+        self.warranty = array("B")
+        self.repair = array("B")
+        self.rma = []
+        self.revenue = array("d")
+        self.flow_rate = array("d")
+        self.noise_level = array("d")
+        self.battery_level = array("d")
+        self.age = array("d")
+
+        self.alive = bytearray()
+        self._rows = {}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, rma):
+        return rma in self._rows
+
+    def __iter__(self):
+        # _rows is in receive order. Units shipped while iterating are
+        # skipped, even if the table is compacted meanwhile.
+        return (ConcentratorView(self, rma) for rma in list(self._rows) if rma in self._rows)
+
+    def live_rows(self):
+        return compress(range(len(self.alive)), self.alive)
+
+    def live(self, column):
+        # The live values of one column, in receive order.
+        return compress(getattr(self, column), self.alive)
+
+    def row_of(self, rma):
+        return self._rows.get(rma)
+
+    def append(self, unit):
+        if unit._rma in self._rows:
+            return False
+        self._rows[unit._rma] = len(self.alive)
+        self.unit_type.append(self.unit_types.code(unit.unit_type))
+        self.model.append(self.models.code(unit._model))
+        self.warranty.append(self.warranty_types.code(unit._warranty_type))
+        self.repair.append(self.repair_statuses.code(unit._is_repaired))
+        self.rma.append(unit._rma)
+        self.revenue.append(unit._revenue)
+        self.flow_rate.append(to_number(unit._flow_rate))
+        self.noise_level.append(to_number(getattr(unit, "_noise_level", NA)))
+        self.battery_level.append(to_number(getattr(unit, "_battery_level", NA)))
+        self.age.append(to_number(getattr(unit, "_age", NA)))
+        self.alive.append(1)
+        return True
+
+    def extend(self, units):
+        added = 0
+        for unit in units:
+            added += self.append(unit)
+        return added
+
+    def get(self, rma):
+        return ConcentratorView(self, rma) if rma in self._rows else None
+
+    def remove(self, rma):
+        row = self._rows.pop(rma, None)
+        if row is None:
+            return None
+        unit = self.to_unit(row)
+        self.alive[row] = 0
+        if len(self._rows) * 2 < len(self.alive):
+            self.compact()
+        return unit
+
+    def set_repair_status(self, rma, status):
+        row = self._rows.get(rma)
+        if row is None:
+            return False
+        self.repair[row] = self.repair_statuses.code(status)
+        return True
+
+    def to_unit(self, row):
+        # Materialize a standalone unit object, e.g. for a shipped row.
+        view = ConcentratorView(self, self.rma[row], row)
+        extra = getattr(view, EXTRA_FIELDS[self.unit_type[row]])
+        return UNIT_CLASSES[self.unit_type[row]](
+            view._model, view._rma, view._warranty_type, view._revenue, view._flow_rate, view._is_repaired, extra
+        )
+
+    def compact(self):
+        keep = self.alive
+        for name in ("unit_type", "model", "warranty", "repair") + NUMERIC_COLUMNS:
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, compress(column, keep)))
+        self.rma = list(compress(self.rma, keep))
+        self.alive = bytearray(b"\x01" * len(self.rma))
+        self._rows = {rma: row for row, rma in enumerate(self.rma)}
+
+
+class ConcentratorView:
+    # A lightweight stand-in for a Concentrator that reads its fields from
+    # one row of an InventoryTable. It answers to the same attributes as the
+    # unit classes, so get_info(), unit_to_row() etc. work unchanged. A view
+    # holds the unit's RMA and finds its row on every access, so it stays
+    # valid when the table is compacted; reading a shipped unit's view
+    # raises KeyError. A view made with a fixed row (to_unit) reads that
+    # row as it is, tombstoned or not.
+    __slots__ = ("_table", "_rma", "_fixed_row")
+
+    def __init__(self, table, rma, row=None):
+        self._table = table
+        self._rma = rma
+        self._fixed_row = row
+
+    @property
+    def _row(self):
+        if self._fixed_row is not None:
+            return self._fixed_row
+        return self._table._rows[self._rma]
+
+    def _extra(self, cls, column):
+        if UNIT_CLASSES[self._table.unit_type[self._row]] is not cls:
+            raise AttributeError(column)
+        return getattr(self._table, column)[self._row]
+
+    @property
+    def unit_type(self):
+        return self._table.unit_types[self._table.unit_type[self._row]]
+
+    @property
+    def _model(self):
+        return self._table.models[self._table.model[self._row]]
+
+    @property
+    def _warranty_type(self):
+        return self._table.warranty_types[self._table.warranty[self._row]]
+
+    @property
+    def _revenue(self):
+        return self._table.revenue[self._row]
+
+    @property
+    def _flow_rate(self):
+        return self._table.flow_rate[self._row]
+
+    @property
+    def _is_repaired(self):
+        return self._table.repair_statuses[self._table.repair[self._row]]
+
+    @property
+    def _noise_level(self):
+        return self._extra(HomeConcentrator, "noise_level")
+
+    @property
+    def _battery_level(self):
+        return format_number(self._extra(PortableConcentrator, "battery_level"))
+
+    @property
+    def _age(self):
+        return format_number(self._extra(PediatricConcentrator, "age"))
+
+    @property
+    def warranty_type(self):
+        return self._warranty_type
+
+    @property
+    def warranty_code(self):
+        return self._table.warranty[self._row]
+
+    @property
+    def is_repaired(self):
+        return self._is_repaired
+
+    @is_repaired.setter
+    def is_repaired(self, value):
+        self._table.repair[self._row] = self._table.repair_statuses.code(value)
+
+    def get_info(self):
+        info = f"Model: {self._model} - RMA: {self._rma} | Warranty Type: {self._warranty_type} | Revenue: ${self._revenue} | Flow Rate: {self._flow_rate}L | Repaired: {self._is_repaired}"
+        cls = UNIT_CLASSES[self._table.unit_type[self._row]]
+        if cls is HomeConcentrator:
+            return info + f" | Noise level: {self._noise_level} dB"
+        elif cls is PortableConcentrator:
+            return info + f" | Battery level: {self._battery_level}%"
+        return info + f" | Age: {self._age}"
+
+    def __str__(self):
+        return self.get_info()
@@ -1,87 +1,299 @@
+import os
 import sys
 import csv
+import argparse
+import json
+from collections import Counter
 from pathlib import Path
 
-file_path = Path(__file__).parent / "units.csv"
+from concentrators import (
+    CSV_HEADER,
+    Concentrator,
+    HomeConcentrator,
+    PediatricConcentrator,
+    PortableConcentrator,
+    WARRANTY_NAMES,
+    unit_from_row,
+    unit_to_row,
+)
+from inventory_events import EventStore
+from inventory_journal import InventoryJournal, read_csv_chunks
+from inventory_storage import MemoryStorage, SQLiteStorage, TableStorage
+from pricing import DEFAULT_PRICING
+from stock_view import PAGE_SIZE, StockView
 
-class Concentrator:
-    def __init__(self, model, rma, warranty_type, revenue, flow_rate, is_repaired):
-        self._model = model
-        self._rma = rma
-        self._warranty_type = warranty_type
-        self._revenue = float(revenue)
-        self._flow_rate = flow_rate
-        self._is_repaired = is_repaired
+file_path = Path(__file__).parent / "units.csv"
+journal_path = Path(__file__).parent / "units.journal"
+events_path = Path(__file__).parent / "units.events"
 
-    @property
-    def warranty_type(self):
-        return self._warranty_type
-    
-    @property
-    def is_repaired(self):
-        return self._is_repaired
 
-    @is_repaired.setter
-    def is_repaired(self, value):
-        self._is_repaired = value
+class BulkResult:
+    def __init__(self):
+        self.succeeded = 0
+        self.errors = []
 
-    def get_info(self):
-        return f"Model: {self._model} - RMA: {self._rma} | Warranty Type: {self._warranty_type} | Revenue: ${self._revenue} | Flow Rate: {self._flow_rate}L | Repaired: {self._is_repaired}"
+    def add_error(self, line_number, rma, message):
+        self.errors.append((line_number, rma, message))
 
     def __str__(self):
-        return self.get_info()
+        lines = [f"{self.succeeded} unit(s) processed, {len(self.errors)} error(s)"]
+        for line_number, rma, message in self.errors:
+            lines.append(f"  line {line_number}: {rma or '-'}: {message}")
+        return "\n".join(lines)
 
 
-class HomeConcentrator(Concentrator):
-    def __init__(self, model, rma, warranty_type, revenue, flow_rate, is_repaired, noise_level):
-        super().__init__(model, rma, warranty_type, revenue, flow_rate, is_repaired)
-        self._noise_level = float(noise_level)
-
-    def get_info(self):
-        return super().get_info() + f" | Noise level: {self._noise_level} dB"
+class RunningTotals:
+    # Revenue and unit counts kept up to date as units come and go, so the
+    # revenue and count reports never have to walk the whole inventory.
+    # Revenue is summed in whole cents to stay exact however many units are
+    # added and removed.
+    def __init__(self):
+        self.revenue_cents = 0
+        self.revenue_cents_by_warranty = Counter()
+        self.count_by_status = Counter()
+        self.count_by_type = Counter()
+
+    @classmethod
+    def from_units(cls, units):
+        totals = cls()
+        for unit in units:
+            totals.add(unit)
+        return totals
+
+    @classmethod
+    def from_aggregates(cls, revenue_cents_by_warranty, count_by_status, count_by_type):
+        totals = cls()
+        totals.revenue_cents_by_warranty.update(revenue_cents_by_warranty)
+        totals.revenue_cents = sum(revenue_cents_by_warranty.values())
+        totals.count_by_status.update(count_by_status)
+        totals.count_by_type.update(count_by_type)
+        return totals
+
+    def add(self, unit, sign=1):
+        cents = round(unit._revenue * 100)
+        self.revenue_cents += sign * cents
+        self.revenue_cents_by_warranty[unit._warranty_type] += sign * cents
+        self.count_by_status[unit._is_repaired] += sign
+        self.count_by_type[unit.unit_type] += sign
+
+    def remove(self, unit):
+        self.add(unit, -1)
+
+    def change_status(self, old_status, new_status):
+        self.count_by_status[old_status] -= 1
+        self.count_by_status[new_status] += 1
+
+    def as_dict(self):
+        return {
+            "total_revenue": self.revenue_cents / 100,
+            "revenue_by_warranty": {name: cents / 100 for name, cents in self.revenue_cents_by_warranty.items() if cents},
+            "count_by_status": {name: count for name, count in self.count_by_status.items() if count},
+            "count_by_type": {name: count for name, count in self.count_by_type.items() if count},
+        }
 
 
-class PortableConcentrator(Concentrator):
-    def __init__(self, model, rma, warranty_type, revenue, flow_rate, is_repaired, battery_level):
-        super().__init__(model, rma, warranty_type, revenue, flow_rate, is_repaired)
-        self._battery_level = battery_level
+class Inventory:
+    # Inventory keeps the business rules; where units live is up to the
+    # storage backend (MemoryStorage by default, or SQLiteStorage).
+    # In-process backends keep running totals, which only follow changes
+    # made through this Inventory; call refresh_totals() after changing the
+    # storage behind its back. A backend shared between terminals
+    # (SQLiteStorage) has its totals aggregated on every read instead.
+    def __init__(self, storage=None, journal=None):
+        self._stock = storage if storage is not None else MemoryStorage()
+        self.journal = journal
+        self.events = None
+        self._listeners = []
+        self._view = None
+        self.refresh_totals()
+
+    def add_listener(self, callback):
+        # callback(event, unit, *details) is called after every change:
+        # ("receive", unit), ("ship", unit) or ("status", unit, old, new).
+        self._listeners.append(callback)
+
+    def _notify(self, event, unit, *details):
+        for callback in self._listeners:
+            callback(event, unit, *details)
+
+    def stock_view(self):
+        if self._view is None:
+            self._view = StockView(self)
+        return self._view
+
+    def show_page(self, number=1, size=PAGE_SIZE, sort=None, descending=False, **filters):
+        return self.stock_view().page(number, size, sort, descending, **filters)
 
-    def get_info(self):
-        return super().get_info() + f" | Battery level: {self._battery_level}%"
+    @property
+    def totals(self):
+        if self._running is None:
+            return RunningTotals.from_aggregates(*self._stock.aggregate_totals())
+        return self._running
+
+    def refresh_totals(self):
+        if hasattr(self._stock, "aggregate_totals"):
+            self._running = None
+        else:
+            self._running = RunningTotals.from_units(self._stock)
 
+    def check_totals(self):
+        # Compares the running totals with a full recompute. Returns the
+        # figures that disagree as {name: (running, recomputed)}.
+        running = self.totals.as_dict()
+        recomputed = RunningTotals.from_units(self._stock).as_dict()
+        return {name: (running[name], recomputed[name]) for name in running if running[name] != recomputed[name]}
 
-class PediatricConcentrator(Concentrator):
-    def __init__(self, model, rma, warranty_type, revenue, flow_rate, is_repaired, age):
-        super().__init__(model, rma, warranty_type, revenue, flow_rate, is_repaired)
-        self._age = age
+    def __len__(self):
+        return len(self._stock)
 
-    def get_info(self):
-        return super().get_info() + f" | Age: {self._age}"
+    def __iter__(self):
+        return iter(self._stock)
 
+    def __contains__(self, rma):
+        return rma in self._stock
 
-class Inventory:
-    def __init__(self):
-        self._stock = []
+    def get_unit(self, rma):
+        return self._stock.get(rma)
 
     def receive_unit(self, unit):
-        if any(u._rma == unit._rma for u in self._stock):
+        if not self._stock.add(unit):
             print(f"\nRMA {unit._rma} already exists! Unit not added.\n")
-        else:
-            self._stock.append(unit)
+            return False
+        if self._running is not None:
+            self._running.add(unit)
+        if self.journal:
+            self.journal.append("receive", unit_to_row(unit))
+        self._notify("receive", unit)
+        return True
 
     def ship_unit(self, unit):
-        if unit in self._stock:
-            self._stock.remove(unit)
-        else:
+        try:
+            shipped = self._stock.remove(unit._rma)
+        except KeyError:
             print("\nUnit not found!\n")
+            return False
+        if self._running is not None:
+            self._running.remove(shipped)
+        if self.journal:
+            self.journal.append("ship", [unit._rma])
+        self._notify("ship", shipped)
+        return True
+
+    def receive_many(self, records):
+        # records is a CSV/JSONL path or an iterable of record dicts (see
+        # record_to_unit) or of units. Bad rows and duplicate RMAs are
+        # reported in the result instead of stopping the batch.
+        if isinstance(records, (str, Path)):
+            records = read_records(records)
+        else:
+            records = enumerate(records, start=1)
+        result = BulkResult()
+        batch = []
+        seen = set()
+        for line_number, record in records:
+            if isinstance(record, Concentrator):
+                unit = record
+            else:
+                try:
+                    if "_error" in record:
+                        raise ValueError(record["_error"])
+                    unit = record_to_unit(record)
+                except ValueError as e:
+                    result.add_error(line_number, record.get("RMA", record.get("rma", "")), str(e))
+                    continue
+            if unit._rma in seen or unit._rma in self._stock:
+                result.add_error(line_number, unit._rma, f"RMA {unit._rma} already exists")
+                continue
+            seen.add(unit._rma)
+            batch.append((line_number, unit))
+        # Only the units the backend actually took are counted, journaled
+        # and announced; with a shared database another terminal may have
+        # received the same RMA since the check above.
+        added = self._stock.add_many(unit for _, unit in batch)
+        taken = {id(unit) for unit in added}
+        for line_number, unit in batch:
+            if id(unit) not in taken:
+                result.add_error(line_number, unit._rma, f"RMA {unit._rma} already exists")
+        result.succeeded = len(added)
+        for unit in added:
+            if self._running is not None:
+                self._running.add(unit)
+            if self.journal:
+                self.journal.append("receive", unit_to_row(unit))
+            self._notify("receive", unit)
+        return result
+
+    def ship_many(self, rmas):
+        # rmas is a CSV/JSONL path, or an iterable of RMAs, units or record
+        # dicts with an RMA field.
+        if isinstance(rmas, (str, Path)):
+            rmas = read_records(rmas)
+        else:
+            rmas = enumerate(rmas, start=1)
+        result = BulkResult()
+        for line_number, record in rmas:
+            if isinstance(record, dict):
+                if "_error" in record:
+                    result.add_error(line_number, "", record["_error"])
+                    continue
+                record = record.get("RMA", record.get("rma")) or ""
+            elif hasattr(record, "_rma"):
+                record = record._rma
+            rma = str(record).strip().upper()
+            try:
+                shipped = self._stock.remove(rma)
+            except KeyError:
+                result.add_error(line_number, rma, f"Unit with RMA {rma} not found")
+                continue
+            if self._running is not None:
+                self._running.remove(shipped)
+            if self.journal:
+                self.journal.append("ship", [rma])
+            self._notify("ship", shipped)
+            result.succeeded += 1
+        return result
+
+    def update_repair_status(self, rma, status):
+        # Go through here rather than setting unit.is_repaired directly so the
+        # repair status index and the running totals stay in sync.
+        try:
+            old_status = self._stock.set_repair_status(rma, status)
+        except KeyError:
+            return False
+        if self._running is not None:
+            self._running.change_status(old_status, status)
+        if self.journal:
+            self.journal.append("status", [rma, status])
+        if self._listeners:
+            self._notify("status", self._stock.get(rma), old_status, status)
+        return True
 
     def check_repair_status(self, rma):
-        unit = next((u for u in self._stock if u._rma == rma), None)
-        return unit._is_repaired if unit else None
+        return self._stock.get_field(rma, "repair_status")
     
     def check_warranty_type(self, rma):
-        unit = next((u for u in self._stock if u._rma == rma), None)
-        return unit._warranty_type if unit else None
+        return self._stock.get_field(rma, "warranty_type")
+
+    def units_by_model(self, model):
+        return self._stock.find("model", model)
+
+    def units_by_warranty(self, warranty_type):
+        return self._stock.find("warranty_type", warranty_type)
+
+    def units_by_status(self, status):
+        return self._stock.find("repair_status", status)
+
+    def record_events(self, store):
+        # Keep an audit trail of every change in an EventStore.
+        self.events = store.attach(self)
+        return self.events
+
+    def close(self):
+        if self.journal:
+            self.journal.close()
+        if self.events:
+            self.events.close()
+        self._stock.close()
 
     def show_stock(self):
         if not self._stock:
@@ -90,12 +302,28 @@ class Inventory:
             return "\n".join([str(unit) for unit in self._stock])
 
     def show_revenue(self):
-        return f"Total Revenue value: ${sum(unit._revenue for unit in self._stock):.2f}"
-
-
-def main():
-    inv = load_units_from_csv()
+        return f"Total Revenue value: ${self.totals.revenue_cents / 100:.2f}"
+
+    def show_counts(self):
+        totals = self.totals.as_dict()
+        by_status = ", ".join(f"{name}: {count}" for name, count in sorted(totals["count_by_status"].items()))
+        by_type = ", ".join(f"{name}: {count}" for name, count in sorted(totals["count_by_type"].items()))
+        return f"Units: {len(self)} | {by_status} | {by_type}"
+
+
+def main(db_path=None, columnar=False, server_url=None):
+    if server_url:
+        from inventory_server import InventoryClient
+        inv = InventoryClient(server_url)
+    elif db_path:
+        inv = open_sqlite_inventory(db_path, events_file=events_path)
+    else:
+        storage = TableStorage() if columnar else None
+        inv = load_units_from_csv(file_path, journal_path, storage=storage, events_file=events_path)
     while True:
+        if inv.journal and inv.journal.needs_compaction():
+            compact_inventory(inv)
+
         selection = input(
             "Enter selection: \n1.Receive unit\n2.Ship unit\n3.Check repair status\n4.Check warranty type\n5.View inventory\n6.Show revenue\n7.Change repair status\n8.Exit\n"
         )
@@ -107,7 +335,7 @@ def main():
             shipping(inv)
 
         elif selection == "3":
-            if not inv._stock:
+            if not inv:
                 print("No units in inventory")
                 continue
             rma = input("Enter RMA to check repair status: ").strip().upper()
@@ -118,7 +346,7 @@ def main():
                 print("\nUnit not found!\n")
 
         elif selection == "4":
-            if not inv._stock:
+            if not inv:
                 print("No units in inventory")
                 continue
             rma = input("Enter RMA to check warranty type: ").strip().upper()
@@ -126,26 +354,26 @@ def main():
             print(f"Warranty type: {w_type}")
 
         elif selection == "5":
-            print(f"\n{inv.show_stock()}\n")
+            print(f"\n{inv.show_counts()}\n")
+            browse_stock(inv)
 
         elif selection == "6":
             print(f"\n{inv.show_revenue()}\n")
 
         elif selection == "7":
-            if not inv._stock:
+            if not inv:
                 print("No units in inventory")
                 continue
             rma = input("Enter RMA of unit to update repair status: ").strip().upper()
-            unit = next((u for u in inv._stock if u._rma == rma), None)
-            if unit:
+            if rma in inv:
                 while True:
                     new_status = input("Enter new status (y for completed / n for not completed): ").lower()
                     if new_status == "y":
-                        unit.is_repaired = "Completed"
+                        inv.update_repair_status(rma, "Completed")
                         print(f"Repair status updated to Completed for RMA {rma}")
                         break
                     elif new_status == "n":
-                        unit.is_repaired = "Not completed"
+                        inv.update_repair_status(rma, "Not completed")
                         print(f"Repair status updated to Not completed for RMA {rma}")
                         break
                     else:
@@ -154,7 +382,9 @@ def main():
                 print("Unit not found.")
 
         elif selection == "8":
-            save_units_to_csv(inv._stock)
+            if inv.journal:
+                compact_inventory(inv)
+            inv.close()
             print("\nSaved!\n")
             sys.exit(
                 "-------------------------------------------------------\nThank you for using my O2 Inventory management system!\n-------------------------------------------------------"
@@ -203,46 +433,134 @@ def receiving(inv):
             print("Invalid Input")
 
 
+REPAIR_ANSWERS = {"y": "Completed", "n": "Not completed"}
+UNIT_TYPE_ALIASES = {"home": "HomeConcentrator", "portable": "PortableConcentrator", "pediatric": "PediatricConcentrator"}
+
+# Column names accepted in bulk files, mapped to the field they fill. The
+# units.csv headers are accepted too, so an exported inventory can be fed back in.
+BULK_FIELDS = {
+    "concentrator_type": "unit_type", "type": "unit_type",
+    "model": "model",
+    "rma": "rma",
+    "warranty_type": "warranty", "warranty": "warranty",
+    "flow_rate": "flow_rate",
+    "repair_status": "repaired", "repaired": "repaired",
+    "noise_level": "noise_level",
+    "battery_level": "battery_level",
+    "age": "age",
+}
+
+
+def validate_warranty(model, warranty_code):
+    if warranty_code not in WARRANTY_NAMES:
+        raise ValueError("Invalid input")
+    if model == "P2" and warranty_code in ["m", "q"]:
+        raise ValueError("Invalid warranty type for P2")
+    return WARRANTY_NAMES[warranty_code]
+
+
+def validate_flow_rate(unit_type, flow_rate):
+    if flow_rate < 0:
+        raise ValueError("Cannot have negative flow rate.")
+    if unit_type == "PediatricConcentrator" and flow_rate > 2:
+        raise ValueError("Flow rate for Pediatric units cannot exceed 2 liters.")
+    return flow_rate
+
+
+def record_to_unit(record):
+    # Builds a unit from one bulk-file record, applying the same rules as
+    # receive(). Raises ValueError describing the first problem found.
+    fields = {}
+    for key, value in record.items():
+        field = BULK_FIELDS.get(str(key).strip().lower())
+        if field and value is not None and str(value).strip() not in ("", "N/A"):
+            fields[field] = str(value).strip()
+
+    for field in ("unit_type", "model", "rma", "warranty", "flow_rate", "repaired"):
+        if field not in fields:
+            raise ValueError(f"Missing {field}")
+
+    unit_type = UNIT_TYPE_ALIASES.get(fields["unit_type"].lower(), fields["unit_type"])
+    if unit_type not in UNIT_TYPE_ALIASES.values():
+        raise ValueError(f"Unknown concentrator type: {fields['unit_type']}")
+    model = fields["model"].upper()
+    rma = fields["rma"].upper()
+
+    warranty = fields["warranty"].lower()
+    warranty_code = next((code for code, name in WARRANTY_NAMES.items() if name.lower() == warranty), warranty)
+    if warranty_code not in WARRANTY_NAMES:
+        raise ValueError(f"Unknown warranty type: {fields['warranty']}")
+    warranty_type = validate_warranty(model, warranty_code)
+
+    try:
+        flow_rate = float(fields["flow_rate"])
+    except ValueError:
+        raise ValueError(f"Flow rate is not a number: {fields['flow_rate']}")
+    validate_flow_rate(unit_type, flow_rate)
+
+    repaired = fields["repaired"].lower()
+    is_repaired = REPAIR_ANSWERS.get(repaired) or next((status for status in REPAIR_ANSWERS.values() if status.lower() == repaired), None)
+    if is_repaired is None:
+        raise ValueError(f"Unknown repair status: {fields['repaired']}")
+
+    revenue = calculate_revenue(model, warranty_code)
+    if unit_type == "HomeConcentrator":
+        try:
+            noise_level = float(fields.get("noise_level", ""))
+        except ValueError:
+            raise ValueError("Home units need a numeric noise level")
+        return HomeConcentrator(model, rma, warranty_type, revenue, flow_rate, is_repaired, noise_level)
+    elif unit_type == "PortableConcentrator":
+        return PortableConcentrator(model, rma, warranty_type, revenue, flow_rate, is_repaired, fields.get("battery_level", "N/A"))
+    return PediatricConcentrator(model, rma, warranty_type, revenue, flow_rate, is_repaired, fields.get("age", "N/A"))
+
+
+def read_records(path):
+    # Yields (line number, record dict) from a CSV file with a header row or
+    # a JSONL file with one object per line.
+    path = Path(path)
+    with open(path, mode="r", newline="") as file:
+        if path.suffix.lower() in (".jsonl", ".ndjson", ".json"):
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_number, {"_error": f"Invalid JSON: {e.msg}"}
+                    continue
+                yield line_number, record if isinstance(record, dict) else {"rma": record}
+        else:
+            reader = csv.DictReader(file)
+            for record in reader:
+                yield reader.line_num, record
+
+
 def receive(unit_type):
     model = input("Enter Model type: ").upper()
     rma = input("Enter RMA: ").strip().upper()
     
     while True:
         warranty_code = input("Enter warranty type Manufature Warranty(m), Flat rate(f), QM Warranty(q): ").lower()
-        if model == "P2":
-            if warranty_code in ["m", "q"]:
-                print("Invalid warranty type for P2")
-                continue
-
-        if warranty_code == "m":
-            warranty_type = "Manufacture Warranty"
-            break
-
-        elif warranty_code == "f":
-            warranty_type = "Flat rate"
-            break
-
-        elif warranty_code == "q":
-            warranty_type = "QM Warranty"
+        try:
+            warranty_type = validate_warranty(model, warranty_code)
             break
-
-        else:
-            print("Invalid input")
+        except ValueError as e:
+            print(e)
             
     revenue = calculate_revenue(model, warranty_code)
     
     while True:
         try:
             flow_rate = float(input("Enter Flow Rate in liters: "))
-            if flow_rate < 0:
-                print("Cannot have negative flow rate. Please re-enter.")
-                continue
-            if unit_type == "PediatricConcentrator" and flow_rate > 2:
-                print("Flow rate for Pediatric units cannot exceed 2 liters. Please re-enter.")
-                continue
-            break
         except ValueError:
             print("Invalid input. Please enter a numeric value for flow rate.")
+            continue
+        try:
+            validate_flow_rate(unit_type, flow_rate)
+            break
+        except ValueError as e:
+            print(f"{e} Please re-enter.")
     while True:
         is_repaired = input("Is the unit repaired(y/n): ").lower()
         if is_repaired == "y":
@@ -259,18 +577,42 @@ def receive(unit_type):
     return model, rma, warranty_type, revenue, flow_rate, is_repaired
 
 
+def browse_stock(inv):
+    number = 1
+    while True:
+        page = inv.show_page(number)
+        print(f"{page.render()}\n")
+        choice = input("n for next page, p for previous page, anything else to go back: ").strip().lower()
+        if choice == "n" and page.has_next:
+            number += 1
+        elif choice == "p" and number > 1:
+            number -= 1
+        elif choice not in ("n", "p"):
+            break
+
+
 def shipping(inv):
+    number = 1
     while True:
-        if not inv._stock:
+        if not inv:
             print("\nNo units available to ship.\n")
             break
-        print("\nCurrent Inventory: \n")
-        print(f"\n{inv.show_stock()}\n")
-        rma = input("\nEnter RMA of unit to ship or c to cancel: \n").strip().upper()
+        # Show one page of repaired units rather than the whole inventory;
+        # any RMA can still be entered.
+        page = inv.show_page(number, status="Completed")
+        print(f"\nUnits ready to ship: \n\n{page.render()}\n")
+        rma = input("\nEnter RMA of unit to ship, n/p for next/previous page, or c to cancel: \n").strip().upper()
 
         if rma.lower() == "c":
             break
-        unit = next((u for u in inv._stock if u._rma == rma), None)
+        if rma.lower() == "n":
+            if page.has_next:
+                number += 1
+            continue
+        if rma.lower() == "p":
+            number = max(1, number - 1)
+            continue
+        unit = inv.get_unit(rma)
 
         if unit:
             inv.ship_unit(unit)
@@ -282,57 +624,81 @@ def shipping(inv):
 
 
 def calculate_revenue(model, warranty):
-    model = model.upper()
-    warranty = warranty.lower()
-    if warranty == "m":
-        if model in ["525DD", "525DDP", "EVERFLOW", "EVERFLOW Q"]:
-            return 45.00
-        elif model == "1025DD":
-            return 75.00
-        
-    elif warranty == "f":
-        if model in ["525DD", "525DDP", "EVERFLOW", "EVERFLOW Q", "P2"]:
-            return 299.98
-        elif model == "1025DD":
-            return 375.98
-        
-    elif warranty == "q":
-        return 0.00
-    
-    return 0.00
+    return DEFAULT_PRICING.price(model, warranty)
+
+
+def calculate_revenues(pairs):
+    # Prices a whole batch of (model, warranty code) pairs at once.
+    return DEFAULT_PRICING.price_many(pairs)
         
 
 def save_units_to_csv(units, filename=file_path):
-    with open(filename, mode='w', newline='') as file:
+    # Write to a temporary file first so a crash mid-save never leaves a
+    # half-written snapshot behind.
+    tmp_name = f"{filename}.tmp"
+    with open(tmp_name, mode='w', newline='') as file:
         writer = csv.writer(file)
-        writer.writerow(["Concentrator_type", "Model", "RMA", "Warranty_type", "Revenue", "Flow_rate", "Repair_status", "Noise_level", "Battery_level", "Age"])
-        for unit in units:
-            writer.writerow([type(unit).__name__, unit._model, unit._rma, unit._warranty_type, unit._revenue, unit._flow_rate, unit._is_repaired, getattr(unit, '_noise_level', 'N/A'), getattr(unit, '_battery_level', 'N/A'), getattr(unit, '_age', 'N/A')])
+        writer.writerow(CSV_HEADER)
+        writer.writerows(unit_to_row(unit) for unit in units)
+    os.replace(tmp_name, filename)
 
-            
-def load_units_from_csv(filename=file_path):
-    inventory = Inventory()
-    try:
-        with open(filename, mode='r') as file:
-            reader = csv.reader(file)
-            next(reader, None) 
-            for row in reader:
-                unit_type, model, rma, warranty, revenue, flow_rate, repaired, noise, battery, age = row
-                flow_rate = flow_rate
-                if unit_type == "HomeConcentrator":
-                    unit = HomeConcentrator(model, rma, warranty, revenue, flow_rate, repaired, noise)
-                elif unit_type == "PortableConcentrator":
-                    unit = PortableConcentrator(model, rma, warranty, revenue, flow_rate, repaired, battery)
-                elif unit_type == "PediatricConcentrator":
-                    unit = PediatricConcentrator(model, rma, warranty, revenue, flow_rate, repaired, age)
-                else:
-                    continue
+
+def compact_inventory(inv, filename=file_path):
+    # Fold the journal into a fresh snapshot and start a new, empty journal.
+    save_units_to_csv(inv, filename)
+    if inv.journal:
+        inv.journal.truncate()
+
+
+def replay_journal(inventory, journal):
+    for op, fields in journal.replay():
+        if op == "receive":
+            unit = unit_from_row(fields)
+            if unit and unit._rma not in inventory:
                 inventory.receive_unit(unit)
+        elif op == "ship":
+            unit = inventory.get_unit(fields[0])
+            if unit:
+                inventory.ship_unit(unit)
+        elif op == "status":
+            inventory.update_repair_status(fields[0], fields[1])
+
+
+def load_units_from_csv(filename=file_path, journal_file=None, chunk_size=10000, storage=None, events_file=None):
+    inventory = Inventory(storage)
+    try:
+        # Each chunk goes to the backend in one add_many batch.
+        for chunk in read_csv_chunks(filename, chunk_size):
+            inventory.receive_many(unit for unit in map(unit_from_row, chunk) if unit is not None)
     except FileNotFoundError:
         print("No previous inventory found.")
+    if journal_file is not None:
+        # Replay before attaching the journal so replayed changes are not
+        # written back into it.
+        journal = InventoryJournal(journal_file)
+        replay_journal(inventory, journal)
+        inventory.journal = journal
+    if events_file is not None:
+        inventory.record_events(EventStore(events_file))
     return inventory
 
 
+def open_sqlite_inventory(db_path, filename=file_path, events_file=None):
+    inventory = Inventory(SQLiteStorage(db_path))
+    # The first time a database is used, seed it from the CSV snapshot.
+    if not inventory and Path(filename).exists():
+        for chunk in read_csv_chunks(filename):
+            inventory._stock.add_many(unit for unit in map(unit_from_row, chunk) if unit is not None)
+        inventory.refresh_totals()
+    if events_file is not None:
+        inventory.record_events(EventStore(events_file))
+    return inventory
+
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="O2 concentrator inventory management system")
+    parser.add_argument("--db", help="keep the inventory in this SQLite database instead of units.csv")
+    parser.add_argument("--columnar", action="store_true", help="hold the inventory in compact columns (for very large inventories)")
+    parser.add_argument("--server", help="use the inventory served by inventory_server.py at this URL, e.g. http://127.0.0.1:8765")
+    args = parser.parse_args()
+    main(args.db, args.columnar, args.server)
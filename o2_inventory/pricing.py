@@ -0,0 +1,105 @@
+import argparse
+import csv
+import datetime
+from bisect import bisect_right
+from functools import lru_cache
+from pathlib import Path
+
+from concentrators import WARRANTY_LETTERS
+
+rules_path = Path(__file__).parent / "pricing_rules.csv"
+
+# Rules without an effective date apply from the beginning of time.
+BEGINNING = datetime.date.min
+
+
+def parse_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(value)
+
+
+class PricingEngine:
+    # Prices come from rule rows of (model, warranty letter, price,
+    # effective_from). For each (model, warranty) the rules are compiled into
+    # a date-sorted list, and today's prices into a plain dict so pricing a
+    # new unit is one lookup. Prices on other dates are found by bisecting
+    # the rule list and memoized in an LRU cache. Anything without a rule
+    # costs $0.00, which covers QM warranty and unknown models.
+    def __init__(self, rules=(), cache_size=4096):
+        self._history = {}
+        for model, warranty, price, effective_from in rules:
+            key = (model.upper(), warranty.lower())
+            self._history.setdefault(key, []).append((parse_date(effective_from) if effective_from else BEGINNING, float(price)))
+        self._dates = {}
+        for key, history in self._history.items():
+            history.sort()
+            self._dates[key] = [effective_from for effective_from, _ in history]
+        self._current = {}
+        self._current_date = None
+        self.price_on = lru_cache(maxsize=cache_size)(self._price_on)
+
+    @classmethod
+    def from_csv(cls, filename=rules_path):
+        with open(filename, mode="r", newline="") as file:
+            reader = csv.DictReader(file)
+            return cls(
+                (row["model"], row["warranty"], row["price"], row.get("effective_from") or "")
+                for row in reader
+            )
+
+    def _price_on(self, model, warranty, on):
+        key = (model, warranty)
+        dates = self._dates.get(key)
+        if not dates:
+            return 0.00
+        position = bisect_right(dates, on)
+        return self._history[key][position - 1][1] if position else 0.00
+
+    def _current_prices(self):
+        today = datetime.date.today()
+        if today != self._current_date:
+            self._current = {key: self._price_on(*key, today) for key in self._history}
+            self._current_date = today
+        return self._current
+
+    def price(self, model, warranty, on=None):
+        key = (model.upper(), warranty.lower())
+        if on is None:
+            return self._current_prices().get(key, 0.00)
+        return self.price_on(*key, parse_date(on))
+
+    def price_many(self, pairs, on=None):
+        # Prices a batch of (model, warranty letter) pairs, all on one date.
+        if on is None:
+            get = self._current_prices().get
+            return [get((model.upper(), warranty.lower()), 0.00) for model, warranty in pairs]
+        on = parse_date(on)
+        return [self.price_on(model.upper(), warranty.lower(), on) for model, warranty in pairs]
+
+    def reprice(self, items):
+        # Prices a batch of (model, warranty letter, date) items, e.g. to
+        # recompute historical revenue with the prices in force at the time.
+        return [self.price_on(model.upper(), warranty.lower(), parse_date(on)) for model, warranty, on in items]
+
+    def revenue_as_of(self, units, on):
+        # What a set of units would have earned at the prices in force on a date.
+        on = parse_date(on)
+        return sum(self.price_on(unit._model.upper(), WARRANTY_LETTERS.get(unit._warranty_type, ""), on) for unit in units)
+
+
+DEFAULT_PRICING = PricingEngine.from_csv()
+
+
+if __name__ == "__main__":
+    from o2_concentrator_inventory_system import file_path, journal_path, load_units_from_csv
+
+    parser = argparse.ArgumentParser(description="Recompute inventory revenue with the prices in force on a date.")
+    parser.add_argument("date", help="YYYY-MM-DD")
+    parser.add_argument("--rules", default=rules_path)
+    args = parser.parse_args()
+    engine = PricingEngine.from_csv(args.rules)
+    inv = load_units_from_csv(file_path, journal_path)
+    print(f"Revenue at {args.date} prices: ${engine.revenue_as_of(inv, args.date):.2f}")
@@ -0,0 +1,132 @@
+import heapq
+from bisect import bisect_left, insort
+from itertools import islice
+
+from inventory_table import to_number
+
+PAGE_SIZE = 20
+
+# Filters map to the storage index they are looked up in and the unit
+# attribute used to check the remaining filters.
+FILTERS = {
+    "model": ("model", lambda unit: unit._model),
+    "warranty": ("warranty_type", lambda unit: unit._warranty_type),
+    "status": ("repair_status", lambda unit: unit._is_repaired),
+    "unit_type": ("unit_type", lambda unit: unit.unit_type),
+}
+
+SORT_KEYS = {
+    "rma": lambda unit: unit._rma,
+    "model": lambda unit: unit._model,
+    "revenue": lambda unit: unit._revenue,
+    "flow_rate": lambda unit: to_number(unit._flow_rate),
+}
+
+
+def sort_key(field, unit):
+    value = SORT_KEYS[field](unit)
+    # NaN does not sort; put units without a number last.
+    if value != value:
+        value = float("inf")
+    return (value, unit._rma)
+
+
+class Page:
+    def __init__(self, units, number, size, has_next):
+        self.units = units
+        self.number = number
+        self.size = size
+        self.has_next = has_next
+
+    def render(self):
+        if not self.units:
+            return "No units found" if self.number == 1 else f"No units on page {self.number}"
+        lines = [str(unit) for unit in self.units]
+        first = (self.number - 1) * self.size + 1
+        footer = f"Page {self.number} (units {first}-{first + len(self.units) - 1})"
+        if self.has_next:
+            footer += " - more on the next page"
+        lines.append(footer)
+        return "\n".join(lines)
+
+
+class StockView:
+    # Pages through an inventory without rendering all of it. Filters use the
+    # storage indexes, starting from the smallest matching bucket. Sorting a
+    # filtered set picks just the units needed for the page with a heap;
+    # sorting the whole inventory walks a per-field sorted index that is
+    # built on first use and then kept current through the Inventory's
+    # change listeners. Storage shared with other terminals (SQLiteStorage)
+    # is sorted by the database instead, since their changes never reach
+    # the listeners.
+    def __init__(self, inv):
+        self.inv = inv
+        self._sorted = {}
+        inv.add_listener(self._on_change)
+
+    def _on_change(self, event, unit, *details):
+        for field, index in self._sorted.items():
+            key = sort_key(field, unit)
+            if event == "receive":
+                insort(index, key)
+            elif event == "ship":
+                position = bisect_left(index, key)
+                if position < len(index) and index[position] == key:
+                    del index[position]
+
+    def _sorted_index(self, field):
+        if field not in self._sorted:
+            self._sorted[field] = sorted(sort_key(field, unit) for unit in self.inv)
+        return self._sorted[field]
+
+    def units(self, sort=None, descending=False, limit=None, **filters):
+        # Lazily yields the units matching the filters, in receive order or
+        # sorted by one of SORT_KEYS. limit bounds how many a sort has to pick.
+        filters = {name: value for name, value in filters.items() if value}
+        for name in filters:
+            if name not in FILTERS:
+                raise ValueError(f"Unknown filter: {name}")
+        if sort is not None and sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort field: {sort}")
+
+        sorted_units = getattr(self.inv._stock, "sorted_units", None)
+        if sort is not None and sorted_units is not None:
+            yield from sorted_units(sort, descending, limit, **{FILTERS[name][0]: value for name, value in filters.items()})
+            return
+
+        if filters:
+            buckets = sorted(
+                (self.inv._stock.find(FILTERS[name][0], value) for name, value in filters.items()),
+                key=len,
+            )
+            candidates = (
+                unit for unit in buckets[0]
+                if all(FILTERS[name][1](unit) == value for name, value in filters.items())
+            )
+            if sort is None:
+                yield from candidates
+                return
+            key = lambda unit: sort_key(sort, unit)
+            if limit is None:
+                yield from sorted(candidates, key=key, reverse=descending)
+            else:
+                pick = heapq.nlargest if descending else heapq.nsmallest
+                yield from pick(limit, candidates, key=key)
+            return
+
+        if sort is None:
+            yield from self.inv
+            return
+        index = self._sorted_index(sort)
+        for _, rma in (reversed(index) if descending else index):
+            # A unit shipped without this Inventory hearing of it is gone.
+            unit = self.inv.get_unit(rma)
+            if unit is not None:
+                yield unit
+
+    def page(self, number=1, size=PAGE_SIZE, sort=None, descending=False, **filters):
+        number = max(1, number)
+        start = (number - 1) * size
+        units = self.units(sort, descending, limit=start + size + 1, **filters)
+        window = list(islice(units, start, start + size + 1))
+        return Page(window[:size], number, size, len(window) > size)
@@ -0,0 +1,23 @@
+from benchmark_stress import compare, run_suite
+
+
+def test_suite_records_every_operation(tmp_path):
+    results = run_suite(sizes=[50], lookups=10, workdir=tmp_path)
+    ops = {(r["backend"], r["op"]) for r in results["results"]}
+    for backend in ("memory", "table", "sqlite"):
+        for op in ("receive_unit", "ship_unit", "check_repair_status", "show_revenue", "save_units_to_csv", "load_units_from_csv"):
+            assert (backend, op) in ops
+    assert all(r["units"] == 50 for r in results["results"])
+
+
+def test_compare_flags_slowdowns():
+    baseline = {"results": [
+        {"backend": "memory", "units": 10, "op": "receive_unit", "ops_per_sec": 1000.0},
+        {"backend": "memory", "units": 10, "op": "ship_unit", "ops_per_sec": 1000.0},
+    ]}
+    results = {"results": [
+        {"backend": "memory", "units": 10, "op": "receive_unit", "ops_per_sec": 850.0},
+        {"backend": "memory", "units": 10, "op": "ship_unit", "ops_per_sec": 700.0},
+        {"backend": "memory", "units": 100, "op": "ship_unit", "ops_per_sec": 1.0},
+    ]}
+    assert compare(results, baseline, 0.2) == [("memory", 10, "ship_unit", 1000.0, 700.0)]
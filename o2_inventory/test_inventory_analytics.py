@@ -0,0 +1,57 @@
+from o2_concentrator_inventory_system import (
+    HomeConcentrator,
+    Inventory,
+    PediatricConcentrator,
+    PortableConcentrator,
+    calculate_revenue,
+    calculate_revenues,
+)
+from inventory_analytics import inventory_report
+from inventory_storage import SQLiteStorage, TableStorage
+
+
+def test_calculate_revenues_matches_single_lookups():
+    pairs = [("525DD", "m"), ("1025dd", "F"), ("P2", "f"), ("P2", "m"), ("EVERFLOW", "q"), ("unknown", "z")]
+    assert calculate_revenues(pairs) == [calculate_revenue(model, warranty) for model, warranty in pairs]
+
+
+def sample_inventory(storage=None):
+    inv = Inventory(storage)
+    inv.receive_unit(HomeConcentrator("525DD", "RMA1", "Flat rate", 299.98, 5.0, "Not completed", 42.0))
+    inv.receive_unit(HomeConcentrator("525DD", "RMA2", "Flat rate", 299.98, 3.0, "Completed", 48.0))
+    inv.receive_unit(PortableConcentrator("P2", "RMA3", "Flat rate", 298.98, 1.0, "Not completed", "85"))
+    inv.receive_unit(PediatricConcentrator("525DDP", "RMA4", "QM Warranty", 0.0, 1.0, "Not completed", 6))
+    return inv
+
+
+def test_inventory_report():
+    report = inventory_report(sample_inventory())
+    assert report["units"] == 4
+    assert round(report["total_revenue"], 2) == 898.94
+    assert report["revenue_by_model_warranty"][("525DD", "Flat rate")] == 599.96
+    assert report["repair_backlog_by_type"] == {"HomeConcentrator": 1, "PortableConcentrator": 1, "PediatricConcentrator": 1}
+    assert report["average_flow_rate"] == 2.5
+    assert report["noise_level"]["mean"] == 45.0
+    assert report["noise_level"]["histogram"] == {40.0: 1, 45.0: 1}
+    assert report["battery_level"]["max"] == 85.0
+
+
+def test_report_is_the_same_for_every_backend():
+    expected = inventory_report(sample_inventory())
+    for storage in (TableStorage(), SQLiteStorage()):
+        assert inventory_report(sample_inventory(storage)) == expected
+
+    # Shipped rows still in the table (tombstoned) are left out.
+    inv = sample_inventory(TableStorage())
+    inv.receive_unit(HomeConcentrator("1025DD", "RMA5", "Manufacture Warranty", 75.0, 9.0, "Not completed", 60.0))
+    inv.ship_unit(inv.get_unit("RMA5"))
+    assert len(inv._stock.table.alive) == 5
+    assert inventory_report(inv) == expected
+
+
+def test_empty_inventory_report():
+    report = inventory_report(Inventory(TableStorage()))
+    assert report["units"] == 0 and report["total_revenue"] == 0
+    assert report["revenue_by_model_warranty"] == {} and report["repair_backlog_by_type"] == {}
+    assert report["average_flow_rate"] is None and report["noise_level"]["count"] == 0
+    assert inventory_report(Inventory())["units"] == 0
@@ -0,0 +1,87 @@
+import itertools
+
+import pytest
+
+import inventory_events
+from o2_concentrator_inventory_system import HomeConcentrator, PortableConcentrator, load_units_from_csv, open_sqlite_inventory
+from inventory_events import EventStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Every event happens one second after the last. The log is started at
+    # t=999 and the first event is at t=1000.
+    ticks = itertools.count(999)
+    monkeypatch.setattr(inventory_events.time, "time", lambda: float(next(ticks)))
+
+
+def home(rma, status="Not completed"):
+    return HomeConcentrator("1025DD", rma, "Flat rate", 375.98, 10.0, status, 45.0)
+
+
+def test_point_in_time(tmp_path, clock):
+    inv = load_units_from_csv(tmp_path / "units.csv", events_file=tmp_path / "units.events")
+    inv.events.snapshot_every = 3
+    inv.receive_unit(home("RMA1"))                                  # t=1000
+    inv.receive_unit(PortableConcentrator("P2", "RMA2", "Flat rate", 298.98, 1.0, "Not completed", 80))
+    inv.update_repair_status("RMA1", "Completed")                   # t=1002, snapshot
+    inv.ship_unit(inv.get_unit("RMA2"))                             # t=1003
+    inv.receive_many([{"type": "home", "model": "525DD", "rma": "RMA3", "warranty": "m", "flow_rate": 5, "repaired": "n", "noise_level": 40}])
+    inv.close()
+
+    store = EventStore(tmp_path / "units.events")
+    assert store.seq == 5
+    assert store.since_snapshot == 2
+    assert list(store.state_at(998)) == []
+    assert list(store.state_at(999)) == []
+    assert list(store.state_at(1001)) == ["RMA1", "RMA2"]
+    assert store.state_at(1001)["RMA1"][6] == "Not completed"
+    assert store.state_at(1002)["RMA1"][6] == "Completed"
+    assert list(store.state_at(1003)) == ["RMA1"]
+    assert list(store.state_at()) == ["RMA1", "RMA3"]
+
+    past = store.inventory_at(1001)
+    assert past.show_revenue() == "Total Revenue value: $674.96"
+    assert [event["event"] for event in store.history("rma2")] == ["receive", "ship"]
+    assert [event["seq"] for event in store.events(since=1002, until=1003)] == [3, 4]
+
+
+def test_reopened_log_continues(tmp_path, clock):
+    inv = load_units_from_csv(tmp_path / "units.csv", tmp_path / "units.journal", events_file=tmp_path / "units.events")
+    inv.receive_unit(home("RMA1"))
+    inv.close()
+    # A torn last line is skipped and the next event starts a fresh line.
+    with open(tmp_path / "units.events", "ab") as file:
+        file.write(b'{"seq":2,"ts"')
+
+    inv = load_units_from_csv(tmp_path / "units.csv", tmp_path / "units.journal", events_file=tmp_path / "units.events")
+    inv.receive_unit(home("RMA2"))
+    inv.close()
+    store = EventStore(tmp_path / "units.events")
+    assert [event["seq"] for event in store.events()] == [1, 2]
+    assert list(store.state_at()) == ["RMA1", "RMA2"]
+    # Units already in stock when the log is started are in its first snapshot.
+    assert len(store._snapshots) == 1
+
+
+def test_terminals_sharing_a_log(tmp_path, clock):
+    # Two terminals on one database append to one log; each event carries
+    # on from the other terminal's last.
+    first = open_sqlite_inventory(tmp_path / "units.db", tmp_path / "units.csv", events_file=tmp_path / "units.events")
+    second = open_sqlite_inventory(tmp_path / "units.db", tmp_path / "units.csv", events_file=tmp_path / "units.events")
+    first.receive_unit(home("RMA1"))
+    second.receive_unit(home("RMA2"))
+    first.update_repair_status("RMA2", "Completed")
+    second.ship_unit(second.get_unit("RMA1"))
+    first.receive_unit(home("RMA3"))
+    first.close()
+    second.close()
+
+    store = EventStore(tmp_path / "units.events")
+    events = list(store.events())
+    assert [event["seq"] for event in events] == [1, 2, 3, 4, 5]
+    assert [event["ts"] for event in events] == sorted(event["ts"] for event in events)
+    assert len(store._snapshots) == 1
+    assert list(store.state_at()) == ["RMA2", "RMA3"]
+    assert store.state_at()["RMA2"][6] == "Completed"
+    assert list(store.state_at(events[2]["ts"])) == ["RMA1", "RMA2"]
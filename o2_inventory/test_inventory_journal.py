@@ -0,0 +1,90 @@
+from o2_concentrator_inventory_system import (
+    HomeConcentrator,
+    PortableConcentrator,
+    compact_inventory,
+    load_units_from_csv,
+    save_units_to_csv,
+)
+from inventory_storage import MemoryStorage
+
+
+def test_journal_replays_after_crash(tmp_path):
+    snapshot = tmp_path / "units.csv"
+    journal = tmp_path / "units.journal"
+    save_units_to_csv([HomeConcentrator("525DD", "RMA1", "Flat rate", 299.98, 5.0, "Not completed", 40.0)], snapshot)
+
+    inv = load_units_from_csv(snapshot, journal)
+    inv.receive_unit(PortableConcentrator("P2", "RMA2", "Flat rate", 298.98, 1.0, "Not completed", 80))
+    inv.update_repair_status("RMA1", "Completed")
+    inv.ship_unit(inv.get_unit("RMA2"))
+    inv.receive_unit(PortableConcentrator("P2", "RMA3", "Flat rate", 298.98, 1.0, "Completed", 90))
+    inv.journal.close()
+
+    # Simulate a crash part way through writing the next record.
+    with open(journal, "a") as file:
+        file.write("receive,HomeConcentrator,525DD")
+
+    reloaded = load_units_from_csv(snapshot, journal)
+    assert [u._rma for u in reloaded] == ["RMA1", "RMA3"]
+    assert reloaded.check_repair_status("RMA1") == "Completed"
+    assert reloaded.journal.entries == 4
+
+    reloaded.update_repair_status("RMA3", "Not completed")
+    reloaded.journal.close()
+    assert load_units_from_csv(snapshot, journal).check_repair_status("RMA3") == "Not completed"
+
+
+def test_torn_record_with_full_field_count_is_skipped(tmp_path):
+    snapshot = tmp_path / "units.csv"
+    journal = tmp_path / "units.journal"
+    save_units_to_csv([HomeConcentrator("525DD", "RMA1", "Flat rate", 299.98, 5.0, "Not completed", 40.0)], snapshot)
+    journal.write_text("status,RMA1,Compl")
+
+    reloaded = load_units_from_csv(snapshot, journal)
+    assert reloaded.check_repair_status("RMA1") == "Not completed"
+    assert reloaded.journal.entries == 0
+
+    # Once the next record has been written after it, the torn one is
+    # complete but its value is still rejected.
+    reloaded.update_repair_status("RMA1", "Completed")
+    reloaded.journal.close()
+    again = load_units_from_csv(snapshot, journal)
+    assert again.check_repair_status("RMA1") == "Completed"
+    assert again.journal.entries == 1
+
+
+def test_compaction_folds_journal_into_snapshot(tmp_path):
+    snapshot = tmp_path / "units.csv"
+    journal = tmp_path / "units.journal"
+
+    inv = load_units_from_csv(snapshot, journal)
+    for i in range(25):
+        inv.receive_unit(HomeConcentrator("525DD", f"RMA{i}", "Flat rate", 299.98, 5.0, "Completed", 40.0))
+    compact_inventory(inv, snapshot)
+    assert journal.read_text() == ""
+
+    reloaded = load_units_from_csv(snapshot, journal, chunk_size=10)
+    assert len(reloaded) == 25
+    assert reloaded.journal.entries == 0
+
+
+def test_snapshot_is_loaded_in_batches(tmp_path):
+    class CountingStorage(MemoryStorage):
+        def __init__(self):
+            super().__init__()
+            self.batches = []
+
+        def add(self, unit):
+            raise AssertionError("units are loaded with add_many")
+
+        def add_many(self, units):
+            units = list(units)
+            self.batches.append(len(units))
+            return [unit for unit in units if MemoryStorage.add(self, unit)]
+
+    snapshot = tmp_path / "units.csv"
+    save_units_to_csv([HomeConcentrator("525DD", f"RMA{i}", "Flat rate", 299.98, 5.0, "Completed", 40.0) for i in range(25)], snapshot)
+    inv = load_units_from_csv(snapshot, chunk_size=10, storage=CountingStorage())
+    assert inv._stock.batches == [10, 10, 5]
+    assert len(inv) == 25
+    assert inv.show_revenue() == "Total Revenue value: $7499.50"
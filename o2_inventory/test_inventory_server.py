@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from o2_concentrator_inventory_system import HomeConcentrator, PortableConcentrator, load_units_from_csv
+from inventory_server import InventoryClient, InventoryServer
+
+
+@pytest.fixture
+def server(tmp_path):
+    inv = load_units_from_csv(tmp_path / "units.csv", tmp_path / "units.journal")
+    server = InventoryServer(inv, port=0, snapshot=tmp_path / "units.csv")
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(server.start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield server
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    server.close()
+    loop.close()
+
+
+def test_client_round_trip(server, tmp_path):
+    client = InventoryClient(f"http://127.0.0.1:{server.port}")
+    assert len(client) == 0
+    assert client.receive_unit(HomeConcentrator("1025DD", "RMA1", "Flat rate", 375.98, 10.0, "Not completed", 45.0))
+    assert not client.receive_unit(HomeConcentrator("1025DD", "RMA1", "Flat rate", 375.98, 10.0, "Not completed", 45.0))
+    assert "RMA1" in client
+    assert client.check_warranty_type("RMA1") == "Flat rate"
+    assert client.update_repair_status("RMA1", "Completed")
+    assert client.check_repair_status("RMA1") == "Completed"
+    assert client.show_revenue() == "Total Revenue value: $375.98"
+    assert client.get_unit("RMA1").get_info() == server.inv.get_unit("RMA1").get_info()
+    assert client.ship_unit(client.get_unit("RMA1"))
+    assert client.get_unit("RMA1") is None
+    client.close()
+
+    # Every change went to the journal rather than a snapshot rewrite.
+    assert (tmp_path / "units.journal").read_text().count("\n") == 3
+
+
+def test_concurrent_scanners(server):
+    def scanner(worker):
+        client = InventoryClient(f"http://127.0.0.1:{server.port}")
+        for i in range(50):
+            client.receive_unit(PortableConcentrator("P2", f"RMA{worker}-{i}", "Flat rate", 298.98, 1.0, "Not completed", 90))
+        client.close()
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(scanner, range(8)))
+    assert len(server.inv) == 400
+    assert server.inv.journal.entries == 400
+
+
+def test_bad_requests(server):
+    assert server.handle("PUT", "/units/RMA1/status", b'{"status": "Lost"}')[0] == 400
+    assert server.handle("POST", "/units", b'{"type": "home"}') == (400, {"error": "Missing model"})
+    assert server.handle("GET", "/nope")[0] == 404
+
+
+def test_unexpected_error_is_a_500(server, monkeypatch):
+    def fail(rma):
+        raise OSError("disk I/O error")
+
+    monkeypatch.setattr(server.inv, "get_unit", fail)
+    client = InventoryClient(f"http://127.0.0.1:{server.port}")
+    assert client._request("GET", "/units/RMA1") == (500, {"error": "OSError: disk I/O error"})
+    # The connection stays usable afterwards.
+    assert len(client) == 0
+    client.close()
+
+
+def test_paged_units(server):
+    client = InventoryClient(f"http://127.0.0.1:{server.port}")
+    for i in range(5):
+        client.receive_unit(PortableConcentrator("P2", f"RMA{i}", "Flat rate", 298.98, 1.0 + i, "Completed" if i % 2 else "Not completed", 90))
+    page = client.show_page(1, size=2, sort="flow_rate", descending=True, status="Completed")
+    assert [unit._rma for unit in page.units] == ["RMA3", "RMA1"]
+    assert not page.has_next
+    assert client.show_page(2, size=2).has_next
+    with pytest.raises(ValueError):
+        client.show_page(sort="colour")
+    client.close()
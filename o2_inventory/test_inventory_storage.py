@@ -0,0 +1,124 @@
+import pytest
+
+from o2_concentrator_inventory_system import (
+    HomeConcentrator,
+    Inventory,
+    PediatricConcentrator,
+    PortableConcentrator,
+    open_sqlite_inventory,
+    save_units_to_csv,
+)
+from inventory_journal import InventoryJournal
+from inventory_storage import SQLiteStorage
+
+
+def test_backends_agree(inv):
+    inv.receive_unit(HomeConcentrator("1025DD", "RMA1", "Flat rate", 375.98, 10.0, "Not completed", 45.0))
+    inv.receive_unit(PortableConcentrator("P2", "RMA2", "Flat rate", 298.98, 1.0, "Completed", 80))
+    inv.receive_unit(PediatricConcentrator("525DDP", "RMA3", "QM Warranty", 0.0, 1.5, "Not completed", 6))
+    assert not inv.receive_unit(PortableConcentrator("P2", "RMA2", "Flat rate", 298.98, 1.0, "Completed", 80))
+
+    assert len(inv) == 3
+    assert inv.show_revenue() == "Total Revenue value: $674.96"
+    assert inv.check_warranty_type("RMA3") == "QM Warranty"
+    assert [u._rma for u in inv.units_by_status("Not completed")] == ["RMA1", "RMA3"]
+
+    inv.update_repair_status("RMA1", "Completed")
+    assert inv.check_repair_status("RMA1") == "Completed"
+    assert sorted(u._rma for u in inv.units_by_status("Completed")) == ["RMA1", "RMA2"]
+
+    assert inv.ship_unit(inv.get_unit("RMA2"))
+    assert inv.check_repair_status("RMA2") is None
+    assert [u._rma for u in inv] == ["RMA1", "RMA3"]
+    assert inv.check_totals() == {}
+    assert str(inv.get_unit("RMA3")) == "Model: 525DDP - RMA: RMA3 | Warranty Type: QM Warranty | Revenue: $0.0 | Flow Rate: 1.5L | Repaired: Not completed | Age: 6"
+
+
+def test_sqlite_seeded_from_csv(tmp_path):
+    snapshot = tmp_path / "units.csv"
+    save_units_to_csv([HomeConcentrator("525DD", "RMA1", "Flat rate", 299.98, 5.0, "Completed", 40.0)], snapshot)
+    inv = open_sqlite_inventory(tmp_path / "units.db", snapshot)
+    assert inv.check_repair_status("RMA1") == "Completed"
+    assert inv.show_revenue() == "Total Revenue value: $299.98"
+    inv.close()
+
+    # A second terminal opening the same database sees the same units.
+    other = open_sqlite_inventory(tmp_path / "units.db", snapshot)
+    assert len(other) == 1
+    other.close()
+
+
+def test_sqlite_ship_is_atomic_across_terminals(tmp_path):
+    first = Inventory(SQLiteStorage(tmp_path / "units.db"))
+    second = Inventory(SQLiteStorage(tmp_path / "units.db"))
+    first.receive_unit(HomeConcentrator("525DD", "RMA1", "Flat rate", 299.98, 5.0, "Not completed", 40.0))
+
+    # Both terminals have the unit on screen; only the first ship goes through.
+    unit = second.get_unit("RMA1")
+    assert first.ship_unit(first.get_unit("RMA1"))
+    assert not second.ship_unit(unit)
+    assert not second.update_repair_status("RMA1", "Completed")
+    assert second.ship_many(["RMA1"]).succeeded == 0
+    first.close()
+    second.close()
+
+
+def test_sqlite_totals_are_shared_between_terminals(tmp_path):
+    first = Inventory(SQLiteStorage(tmp_path / "units.db"))
+    second = Inventory(SQLiteStorage(tmp_path / "units.db"))
+    first.receive_unit(HomeConcentrator("525DD", "RMA1", "Flat rate", 299.98, 5.0, "Not completed", 40.0))
+    first.receive_unit(PortableConcentrator("P2", "RMA2", "Flat rate", 298.98, 1.0, "Completed", 80))
+
+    assert second.show_revenue() == "Total Revenue value: $598.96"
+    assert second.show_counts() == "Units: 2 | Completed: 1, Not completed: 1 | HomeConcentrator: 1, PortableConcentrator: 1"
+    assert second.check_totals() == {}
+
+    second.ship_unit(second.get_unit("RMA1"))
+    assert first.show_revenue() == "Total Revenue value: $298.98"
+    assert first.check_totals() == {}
+    first.close()
+    second.close()
+
+
+def test_sqlite_receive_many_skips_units_another_terminal_added(tmp_path):
+    first = Inventory(SQLiteStorage(tmp_path / "units.db"), journal=InventoryJournal(tmp_path / "units.journal"))
+    second = Inventory(SQLiteStorage(tmp_path / "units.db"))
+    received = []
+    first.add_listener(lambda event, unit, *details: received.append(unit._rma))
+
+    def records():
+        yield {"type": "home", "model": "525DD", "rma": "RMA1", "warranty": "f", "flow_rate": "5", "repaired": "n", "noise_level": "40"}
+        yield {"type": "portable", "model": "P2", "rma": "RMA2", "warranty": "f", "flow_rate": "1", "repaired": "y", "battery_level": "80"}
+        # The second terminal receives RMA2 after the first has checked it
+        # but before its batch is written.
+        second.receive_unit(PortableConcentrator("P2", "RMA2", "Flat rate", 298.98, 1.0, "Not completed", 50))
+
+    result = first.receive_many(records())
+    assert result.succeeded == 1
+    assert result.errors == [(2, "RMA2", "RMA RMA2 already exists")]
+    assert received == ["RMA1"]
+    assert first.journal.entries == 1
+    assert first.check_repair_status("RMA2") == "Not completed"
+    assert first.show_revenue() == "Total Revenue value: $598.96"
+    first.close()
+    second.close()
+
+
+def test_sqlite_totals_table_follows_every_change(tmp_path):
+    path = tmp_path / "units.db"
+    storage = SQLiteStorage(path)
+    inv = Inventory(storage)
+    inv.receive_many([HomeConcentrator("525DD", f"RMA{i}", "Flat rate", 299.98, 5.0, "Not completed", 40.0) for i in range(3)])
+    inv.update_repair_status("RMA0", "Completed")
+    inv.ship_unit(inv.get_unit("RMA1"))
+    assert inv.check_totals() == {}
+    assert inv.totals.as_dict()["count_by_status"] == {"Completed": 1, "Not completed": 1}
+
+    # A database written before the totals table existed is summed into it
+    # when it is next opened.
+    storage._conn.executescript("DROP TRIGGER units_totals_insert; DROP TRIGGER units_totals_delete; DROP TRIGGER units_totals_update; DROP TABLE totals;")
+    inv.close()
+    reopened = Inventory(SQLiteStorage(path))
+    assert reopened.show_revenue() == "Total Revenue value: $599.96"
+    assert reopened.check_totals() == {}
+    reopened.close()
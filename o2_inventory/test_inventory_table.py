@@ -0,0 +1,66 @@
+import pytest
+
+from concentrators import HomeConcentrator, PediatricConcentrator, PortableConcentrator, unit_to_row
+from inventory_storage import TableStorage
+from inventory_table import InventoryTable
+from o2_concentrator_inventory_system import Inventory
+
+
+def sample_units():
+    return [
+        HomeConcentrator("1025DD", "RMA1", "Flat rate", 375.98, 10.0, "Not completed", 45.0),
+        PortableConcentrator("P2", "RMA2", "Flat rate", 298.98, "1.0", "Completed", "89"),
+        PediatricConcentrator("525DDP", "RMA3", "QM Warranty", 0.0, 1.5, "Not completed", 6),
+    ]
+
+
+def test_units_use_slots():
+    for unit in sample_units():
+        assert not hasattr(unit, "__dict__")
+
+
+def test_views_match_units():
+    table = InventoryTable()
+    units = sample_units()
+    table.extend(units)
+    for unit, view in zip(units, table):
+        assert view.get_info() == unit.get_info()
+        assert list(map(str, unit_to_row(table.to_unit(view._row)))) == list(map(str, unit_to_row(unit)))
+
+
+def test_ship_and_compact_keep_receive_order():
+    table = InventoryTable()
+    table.extend(sample_units())
+    table.get("RMA3").is_repaired = "Completed"
+    assert table.remove("RMA1")._rma == "RMA1"
+    assert table.remove("RMA2").get_info().endswith("Battery level: 89%")
+    assert len(table.alive) == 1
+    assert [view._rma for view in table] == ["RMA3"]
+    assert table.get("RMA3").is_repaired == "Completed"
+    assert table.remove("RMA1") is None
+
+
+def test_views_survive_compaction():
+    table = InventoryTable()
+    table.extend(HomeConcentrator("1025DD", f"RMA{i}", "Flat rate", 375.98, float(i), "Completed", 45.0) for i in range(6))
+    views = list(table)
+    for i in range(4):
+        table.remove(f"RMA{i}")
+    assert len(table.alive) == 2
+    assert [(view._rma, view._flow_rate) for view in views[4:]] == [("RMA4", 4.0), ("RMA5", 5.0)]
+    with pytest.raises(KeyError):
+        views[0].get_info()
+
+
+def test_ship_views_across_compaction():
+    inv = Inventory(TableStorage())
+    inv.receive_many(
+        HomeConcentrator("1025DD", f"RMA{i}", "Flat rate", 375.98, 1.0, "Not completed" if i % 4 == 0 else "Completed", 45.0)
+        for i in range(12)
+    )
+    # Shipping the first few of these compacts the table under the rest.
+    ready = inv.units_by_status("Completed")
+    result = inv.ship_many(ready)
+    assert result.succeeded == 9 and not result.errors
+    assert [unit._rma for unit in inv] == ["RMA0", "RMA4", "RMA8"]
+    assert inv.check_totals() == {}
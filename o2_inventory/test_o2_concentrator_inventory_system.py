@@ -21,4 +21,91 @@ def test_receiving():
     inv = Inventory()
     unit = PediatricConcentrator("P2", "RMA555", "QM Warranty", 0.0, 1.5, "Not completed", 6)
     inv.receive_unit(unit)
-    assert inv._stock[0]._rma == "RMA555"
\ No newline at end of file
+    assert inv.get_unit("RMA555")._rma == "RMA555"
+
+def test_duplicate_rma():
+    inv = Inventory()
+    inv.receive_unit(HomeConcentrator("525DD", "RMA1", "Flat rate", 299.98, 5.0, "Completed", 40.0))
+    assert not inv.receive_unit(HomeConcentrator("1025DD", "RMA1", "Flat rate", 375.98, 10.0, "Completed", 45.0))
+    assert len(inv) == 1
+    assert inv.get_unit("RMA1")._model == "525DD"
+
+def test_secondary_indexes():
+    inv = Inventory()
+    home = HomeConcentrator("525DD", "RMA1", "Flat rate", 299.98, 5.0, "Not completed", 40.0)
+    child = PediatricConcentrator("P2", "RMA2", "Flat rate", 298.98, 1.5, "Not completed", 6)
+    inv.receive_unit(home)
+    inv.receive_unit(child)
+    assert inv.units_by_warranty("Flat rate") == [home, child]
+    assert inv.units_by_model("P2") == [child]
+    inv.update_repair_status("RMA1", "Completed")
+    assert inv.check_repair_status("RMA1") == "Completed"
+    assert inv.units_by_status("Completed") == [home]
+    assert inv.units_by_status("Not completed") == [child]
+    inv.ship_unit(child)
+    assert inv.units_by_model("P2") == []
+    assert [u._rma for u in inv] == ["RMA1"]
+
+
+def test_receive_many_validates_rows():
+    inv = Inventory()
+    inv.receive_unit(HomeConcentrator("525DD", "RMA1", "Flat rate", 299.98, 5.0, "Completed", 40.0))
+    result = inv.receive_many([
+        {"type": "home", "model": "1025dd", "rma": "rma2", "warranty": "f", "flow_rate": "10", "repaired": "n", "noise_level": "45"},
+        {"type": "portable", "model": "P2", "rma": "RMA3", "warranty": "m", "flow_rate": "1", "repaired": "n", "battery_level": "80"},
+        {"type": "pediatric", "model": "525DDP", "rma": "RMA4", "warranty": "q", "flow_rate": "2.5", "repaired": "y", "age": "4"},
+        {"type": "pediatric", "model": "525DDP", "rma": "RMA5", "warranty": "q", "flow_rate": "-1", "repaired": "y", "age": "4"},
+        {"type": "home", "model": "525DD", "rma": "RMA1", "warranty": "m", "flow_rate": "5", "repaired": "y", "noise_level": "40"},
+        {"type": "home", "model": "525DD", "rma": "RMA2", "warranty": "m", "flow_rate": "5", "repaired": "y", "noise_level": "40"},
+    ])
+    assert result.succeeded == 1
+    assert [(line, message) for line, _, message in result.errors] == [
+        (2, "Invalid warranty type for P2"),
+        (3, "Flow rate for Pediatric units cannot exceed 2 liters."),
+        (4, "Cannot have negative flow rate."),
+        (5, "RMA RMA1 already exists"),
+        (6, "RMA RMA2 already exists"),
+    ]
+    assert inv.get_unit("RMA2")._revenue == 375.98
+
+def test_bulk_files(tmp_path):
+    receiving_file = tmp_path / "truck.jsonl"
+    receiving_file.write_text(
+        '{"Concentrator_type": "PortableConcentrator", "Model": "P2", "RMA": "RMA7", "Warranty_type": "Flat rate", "Flow_rate": 1, "Repair_status": "Completed", "Battery_level": 90}\n'
+        "not json\n"
+    )
+    inv = Inventory()
+    result = inv.receive_many(receiving_file)
+    assert result.succeeded == 1
+    assert result.errors[0][0] == 2
+    assert inv.get_unit("RMA7")._revenue == 298.98
+
+    shipping_file = tmp_path / "shipped.csv"
+    shipping_file.write_text("RMA\nrma7\nRMA8\n")
+    result = inv.ship_many(shipping_file)
+    assert result.succeeded == 1
+    assert result.errors == [(3, "RMA8", "Unit with RMA RMA8 not found")]
+    assert len(inv) == 0
+
+def test_running_totals():
+    inv = Inventory()
+    home = HomeConcentrator("525DD", "RMA1", "Flat rate", 299.98, 5.0, "Not completed", 40.0)
+    inv.receive_unit(home)
+    inv.receive_unit(PediatricConcentrator("P2", "RMA2", "Flat rate", 298.98, 1.5, "Not completed", 6))
+    inv.receive_many([{"type": "home", "model": "525DD", "rma": "RMA3", "warranty": "m", "flow_rate": "5", "repaired": "y", "noise_level": "40"}])
+    inv.update_repair_status("RMA1", "Completed")
+    inv.ship_many(["RMA2"])
+    inv.receive_unit(home)
+
+    assert inv.show_revenue() == "Total Revenue value: $344.98"
+    assert inv.totals.as_dict() == {
+        "total_revenue": 344.98,
+        "revenue_by_warranty": {"Flat rate": 299.98, "Manufacture Warranty": 45.0},
+        "count_by_status": {"Completed": 2},
+        "count_by_type": {"HomeConcentrator": 2},
+    }
+    assert inv.check_totals() == {}
+
+    # Changing a unit behind the Inventory's back is caught by the check.
+    home.is_repaired = "Not completed"
+    assert set(inv.check_totals()) == {"count_by_status"}
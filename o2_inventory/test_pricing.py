@@ -0,0 +1,31 @@
+import datetime
+
+from o2_concentrator_inventory_system import HomeConcentrator, PortableConcentrator
+from pricing import DEFAULT_PRICING, PricingEngine
+
+
+def test_default_rules_match_current_prices():
+    assert DEFAULT_PRICING.price_many([("525DD", "m"), ("1025DD", "f"), ("P2", "f"), ("P2", "m"), ("ANY", "q")]) == [45.00, 375.98, 298.98, 0.00, 0.00]
+
+
+def test_effective_dates():
+    engine = PricingEngine([
+        ("525DD", "f", "279.98", ""),
+        ("525DD", "f", "299.98", "2024-01-01"),
+        ("525DD", "f", "319.98", "2099-01-01"),
+        ("P2", "f", "298.98", "2025-06-01"),
+    ])
+    assert engine.price("525dd", "F") == 299.98
+    assert engine.price("525DD", "f", on="2023-12-31") == 279.98
+    assert engine.price("525DD", "f", on=datetime.date(2024, 1, 1)) == 299.98
+    assert engine.price("P2", "f", on="2025-05-31") == 0.00
+    assert engine.reprice([("525DD", "f", "2020-01-01"), ("P2", "f", "2030-01-01"), ("525DD", "f", "2100-01-01")]) == [279.98, 298.98, 319.98]
+
+    units = [
+        HomeConcentrator("525DD", "RMA1", "Flat rate", 299.98, 5.0, "Completed", 40.0),
+        PortableConcentrator("P2", "RMA2", "Flat rate", 298.98, 1.0, "Completed", 80),
+    ]
+    assert engine.revenue_as_of(units, "2023-06-01") == 279.98
+    hits = engine.price_on.cache_info().hits
+    assert engine.revenue_as_of(units, "2023-06-01") == 279.98
+    assert engine.price_on.cache_info().hits == hits + 2
@@ -0,0 +1,81 @@
+import pytest
+
+from o2_concentrator_inventory_system import (
+    HomeConcentrator,
+    Inventory,
+    PediatricConcentrator,
+    PortableConcentrator,
+)
+from inventory_storage import SQLiteStorage
+
+
+# conftest's empty Inventory on each backend, stocked with 27 units.
+@pytest.fixture
+def inv(inv):
+    stock(inv)
+    return inv
+
+
+def stock(inventory):
+    for n in range(25):
+        status = "Completed" if n % 2 else "Not completed"
+        inventory.receive_unit(HomeConcentrator("1025DD", f"RMA{n:02}", "Flat rate", 375.98, 10.0 - n / 10, status, 45.0))
+    inventory.receive_unit(PortableConcentrator("P2", "RMAP", "Flat rate", 298.98, 1.0, "Completed", 80))
+    inventory.receive_unit(PediatricConcentrator("525DDP", "RMAK", "QM Warranty", 0.0, 1.5, "Not completed", 6))
+
+
+def rmas(page):
+    return [unit._rma for unit in page.units]
+
+
+def test_pages(inv):
+    first = inv.show_page(1, size=10)
+    assert rmas(first) == [f"RMA{n:02}" for n in range(10)]
+    assert first.has_next
+    last = inv.show_page(3, size=10)
+    assert rmas(last) == ["RMA20", "RMA21", "RMA22", "RMA23", "RMA24", "RMAP", "RMAK"]
+    assert not last.has_next
+    assert inv.show_page(4, size=10).render() == "No units on page 4"
+
+
+def test_filters(inv):
+    assert rmas(inv.show_page(model="P2")) == ["RMAP"]
+    assert rmas(inv.show_page(unit_type="PediatricConcentrator")) == ["RMAK"]
+    completed = inv.show_page(size=50, status="Completed", warranty="Flat rate")
+    assert len(completed.units) == 13
+    assert all(unit._is_repaired == "Completed" for unit in completed.units)
+    with pytest.raises(ValueError):
+        inv.show_page(colour="red")
+
+
+def test_sorting(inv):
+    assert rmas(inv.show_page(size=3, sort="flow_rate")) == ["RMAP", "RMAK", "RMA24"]
+    assert rmas(inv.show_page(size=2, sort="revenue", descending=True, model="1025DD")) == ["RMA24", "RMA23"]
+    assert rmas(inv.show_page(2, size=2, sort="rma", status="Not completed")) == ["RMA04", "RMA06"]
+
+
+def test_sorted_index_follows_changes(inv):
+    assert rmas(inv.show_page(size=2, sort="flow_rate")) == ["RMAP", "RMAK"]
+    inv.ship_unit(inv.get_unit("RMAP"))
+    inv.receive_unit(PortableConcentrator("P2", "RMAQ", "Flat rate", 298.98, 0.5, "Completed", 80))
+    assert rmas(inv.show_page(size=2, sort="flow_rate")) == ["RMAQ", "RMAK"]
+    inv.ship_many(["RMAQ"])
+    assert rmas(inv.show_page(size=2, sort="flow_rate")) == ["RMAK", "RMA24"]
+
+
+def test_sqlite_sorting_sees_other_terminals(tmp_path):
+    first = Inventory(SQLiteStorage(tmp_path / "units.db"))
+    second = Inventory(SQLiteStorage(tmp_path / "units.db"))
+    stock(first)
+    assert rmas(first.show_page(size=2, sort="flow_rate")) == ["RMAP", "RMAK"]
+
+    # The second terminal ships one unit and receives another; the first
+    # lists both changes, and nothing as "None".
+    second.ship_unit(second.get_unit("RMAP"))
+    second.receive_unit(PortableConcentrator("P2", "RMAQ", "Flat rate", 298.98, 0.5, "Completed", 80))
+    page = first.show_page(size=2, sort="flow_rate")
+    assert rmas(page) == ["RMAQ", "RMAK"]
+    assert "None" not in page.render()
+    assert rmas(first.show_page(size=2, sort="flow_rate", descending=True, model="P2")) == ["RMAQ"]
+    first.close()
+    second.close()
@@ -0,0 +1,372 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+
+import numpy as np
+import pandas as pd
+
+from market_calendar import session_date
+from price_cache import CACHE_DIR
+
+KINDS = {
+    "cross_up": "Crosses above",
+    "cross_down": "Crosses below",
+    "percent_move": "Moves by % (either way)",
+    "sma_cross": "SMA crossover",
+}
+RULE_COLUMNS = ["id", "ticker", "kind", "value", "fast", "slow", "reference", "repeat", "created_at"]
+
+
+class LevelIndex:
+    # Price levels of the rules waiting on one ticker, kept sorted as
+    # (level, rule id). Every level a move from one price to another passed
+    # through is found with two bisections, so a quote costs O(log n) plus
+    # the rules it actually triggers, however many rules there are.
+    def __init__(self):
+        self._levels = []
+
+    def __len__(self):
+        return len(self._levels)
+
+    def add(self, level, rule_id):
+        insort(self._levels, (level, rule_id))
+
+    def remove(self, level, rule_id):
+        i = bisect_left(self._levels, (level, rule_id))
+        if i < len(self._levels) and self._levels[i] == (level, rule_id):
+            del self._levels[i]
+
+    def rising(self, old, new):
+        # (level, rule id) for every old < level <= new.
+        low = bisect_right(self._levels, (old, float("inf")))
+        high = bisect_right(self._levels, (new, float("inf")))
+        return self._levels[low:high]
+
+    def falling(self, old, new):
+        # (level, rule id) for every new <= level < old.
+        low = bisect_left(self._levels, (new, float("-inf")))
+        high = bisect_left(self._levels, (old, float("-inf")))
+        return self._levels[low:high]
+
+
+class AlertStore:
+    # Alert rules and every alert they triggered, in SQLite so they outlive
+    # the page and the worker and the dashboard see the same ones.
+    def __init__(self, path=None):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path or CACHE_DIR / "alerts.sqlite", check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rules (id INTEGER PRIMARY KEY, ticker TEXT, kind TEXT, "
+                "value REAL, fast INTEGER, slow INTEGER, reference REAL, repeat INTEGER, "
+                "created_at REAL, active INTEGER DEFAULT 1)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS triggered (id INTEGER PRIMARY KEY, rule_id INTEGER, "
+                "ticker TEXT, kind TEXT, time REAL, price REAL, message TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS triggered_time ON triggered (time)")
+
+    def add_rule(self, rule):
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO rules (ticker, kind, value, fast, slow, reference, repeat, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [rule[column] for column in RULE_COLUMNS[1:]],
+            )
+        return cursor.lastrowid
+
+    def deactivate(self, rule_id):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE rules SET active = 0 WHERE id = ?", (rule_id,))
+
+    def active_rules(self):
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(RULE_COLUMNS)} FROM rules WHERE active = 1 ORDER BY id"
+            ).fetchall()
+        return [dict(zip(RULE_COLUMNS, row)) for row in rows]
+
+    def record(self, alert):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO triggered (rule_id, ticker, kind, time, price, message) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [alert[column] for column in ("rule_id", "ticker", "kind", "time", "price", "message")],
+            )
+
+    def triggered(self, since=None, limit=50):
+        # The most recent triggered alerts first, as a DataFrame.
+        with self._lock:
+            alerts = pd.read_sql_query(
+                "SELECT rule_id, ticker, kind, time, price, message FROM triggered "
+                "WHERE time >= ? ORDER BY time DESC, id DESC LIMIT ?",
+                self._conn,
+                params=(since or 0, limit),
+            )
+        alerts["time"] = pd.to_datetime(alerts["time"], unit="s")
+        return alerts
+
+    def close(self):
+        self._conn.close()
+
+
+class AlertEngine:
+    # Evaluates every active rule against each new quote. Price rules
+    # (crossing a level, or moving a percentage away from the price when
+    # the rule was made) are levels in a rising and a falling LevelIndex
+    # per ticker. SMA crossover rules keep each ticker's recent daily closes
+    # (from history(ticker), a Series of closes) with the live price as
+    # today's close, and fire when the fast SMA moves to the other side of
+    # the slow one. A rule fires once and is switched off unless it repeats.
+    # history() is called outside the engine's lock, so a slow fetch for
+    # one ticker does not hold up quotes for the others.
+    def __init__(self, store, history=None, clock=time.time):
+        self.store = store
+        self.history = history
+        self.clock = clock
+        self._rules = {}
+        self._rising = {}
+        self._falling = {}
+        self._sma_rules = {}
+        self._closes = {}
+        self._sma_sign = {}
+        self._last = {}
+        self._lock = threading.Lock()
+        for rule in store.active_rules():
+            self._index(rule)
+
+    # --- Rules ---
+
+    def _levels(self, rule):
+        # (index, level) pairs a price rule waits on.
+        if rule["kind"] == "cross_up":
+            return [(self._rising, rule["value"])]
+        if rule["kind"] == "cross_down":
+            return [(self._falling, rule["value"])]
+        if rule["kind"] == "percent_move":
+            move = rule["reference"] * rule["value"] / 100
+            return [
+                (self._rising, rule["reference"] + move),
+                (self._falling, rule["reference"] - move),
+            ]
+        return []
+
+    def _index(self, rule):
+        self._rules[rule["id"]] = rule
+        for index, level in self._levels(rule):
+            index.setdefault(rule["ticker"], LevelIndex()).add(level, rule["id"])
+        if rule["kind"] == "sma_cross":
+            pair = (rule["fast"], rule["slow"])
+            self._sma_rules.setdefault(rule["ticker"], {}).setdefault(pair, []).append(rule["id"])
+
+    def _unindex(self, rule_id):
+        rule = self._rules.pop(rule_id)
+        for index, level in self._levels(rule):
+            index[rule["ticker"]].remove(level, rule_id)
+        if rule["kind"] == "sma_cross":
+            self._sma_rules[rule["ticker"]][(rule["fast"], rule["slow"])].remove(rule_id)
+
+    def add_rule(self, ticker, kind, value=None, fast=None, slow=None, repeat=False, reference=None):
+        # Stores and starts watching a rule. Returns its id. A percent move
+        # is measured from reference, by default the last quote seen.
+        if kind not in KINDS:
+            raise ValueError(f"Unknown alert kind: {kind}")
+        if kind == "sma_cross":
+            if not fast or not slow or fast >= slow:
+                raise ValueError("An SMA crossover needs a fast window shorter than the slow one")
+        elif value is None or value <= 0:
+            raise ValueError("An alert needs a positive price or percentage")
+        fetched = self._fetch_closes(ticker) if kind == "sma_cross" else None
+        with self._lock:
+            if fetched is not None:
+                self._closes.setdefault(ticker, fetched)
+            if kind == "percent_move":
+                reference = reference or self._last.get(ticker, (None, None))[1]
+                if reference is None:
+                    raise ValueError(f"No price for {ticker} yet to measure a move from")
+            rule = {
+                "ticker": ticker,
+                "kind": kind,
+                "value": value,
+                "fast": fast,
+                "slow": slow,
+                "reference": reference,
+                "repeat": int(repeat),
+                "created_at": self.clock(),
+            }
+            rule["id"] = self.store.add_rule(rule)
+            self._index(rule)
+            if kind == "sma_cross":
+                self._sma_sign.setdefault((ticker, fast, slow), self._crossover_sign(ticker, fast, slow))
+            return rule["id"]
+
+    def remove_rule(self, rule_id):
+        with self._lock:
+            if rule_id in self._rules:
+                self._unindex(rule_id)
+        self.store.deactivate(rule_id)
+
+    def rules(self):
+        with self._lock:
+            return pd.DataFrame(list(self._rules.values()), columns=RULE_COLUMNS)
+
+    def tickers(self):
+        # Tickers with at least one active rule.
+        with self._lock:
+            return sorted({rule["ticker"] for rule in self._rules.values()})
+
+    # --- SMA crossovers ---
+
+    def _fetch_closes(self, ticker):
+        # (dates, closes) from history(), or None if they are already kept
+        # or there is no history. Called without the lock held.
+        if self.history is None or ticker in self._closes:
+            return None
+        closes = self.history(ticker).dropna()
+        return (list(closes.index), list(closes.to_numpy(dtype=float)))
+
+    def _recent_closes(self, ticker):
+        # (dates, closes) of the last days needed by ticker's SMA rules.
+        return self._closes.setdefault(ticker, ([], []))
+
+    def _crossover_sign(self, ticker, fast, slow):
+        _, closes = self._recent_closes(ticker)
+        if len(closes) < slow:
+            return 0
+        recent = np.asarray(closes[-slow:])
+        return int(np.sign(recent[-fast:].mean() - recent.mean()))
+
+    def _update_closes(self, ticker, when, price):
+        # The quote is the close of its exchange session's day; outside a
+        # session (weekends, holidays, before the open) it revises the last
+        # close rather than adding a day.
+        dates, closes = self._recent_closes(ticker)
+        day = session_date(ticker, when)
+        if dates and (day is None or dates[-1] == day):
+            closes[-1] = price
+        elif day is not None and (not dates or dates[-1] < day):
+            dates.append(day)
+            closes.append(price)
+        keep = max(slow for _, slow in self._sma_rules[ticker])
+        del dates[:-keep], closes[:-keep]
+
+    # --- Quotes ---
+
+    def _fire(self, rule_id, when, price, message):
+        rule = self._rules[rule_id]
+        alert = {
+            "rule_id": rule_id,
+            "ticker": rule["ticker"],
+            "kind": rule["kind"],
+            "time": when,
+            "price": price,
+            "message": message,
+        }
+        self.store.record(alert)
+        if not rule["repeat"]:
+            self._unindex(rule_id)
+            self.store.deactivate(rule_id)
+        return alert
+
+    def on_quote(self, ticker, when, price):
+        # Checks one quote against ticker's rules. Returns the alerts it
+        # triggered. Quotes older than the last one seen are ignored.
+        fetched = self._fetch_closes(ticker) if self._sma_rules.get(ticker) else None
+        with self._lock:
+            if fetched is not None:
+                self._closes.setdefault(ticker, fetched)
+            last = self._last.get(ticker)
+            if last is not None and when < last[0]:
+                return []
+            self._last[ticker] = (when, price)
+            fired = []
+            if last is not None and price != last[1]:
+                old = last[1]
+                if price > old:
+                    hits = self._rising.get(ticker, LevelIndex()).rising(old, price)
+                    verb = "rose above"
+                else:
+                    hits = self._falling.get(ticker, LevelIndex()).falling(old, price)
+                    verb = "fell below"
+                for level, rule_id in hits:
+                    message = f"{ticker} {verb} ${level:,.2f} (now ${price:,.2f})"
+                    fired.append(self._fire(rule_id, when, price, message))
+            if self._sma_rules.get(ticker):
+                self._update_closes(ticker, when, price)
+                for (fast, slow), rule_ids in self._sma_rules[ticker].items():
+                    if not rule_ids:
+                        continue
+                    sign = self._crossover_sign(ticker, fast, slow)
+                    previous = self._sma_sign.get((ticker, fast, slow), 0)
+                    self._sma_sign[(ticker, fast, slow)] = sign
+                    if sign and previous and sign != previous:
+                        side = "above" if sign > 0 else "below"
+                        message = f"{ticker} SMA {fast} crossed {side} SMA {slow} (now ${price:,.2f})"
+                        fired.extend(self._fire(rule_id, when, price, message) for rule_id in list(rule_ids))
+            return fired
+
+
+class AlertWorker:
+    # Polls quotes for every ticker with an active rule every interval
+    # seconds, on a background asyncio loop (like QuoteStream), and feeds
+    # them to the AlertEngine, so alerts fire whether or not anyone has
+    # the dashboard open. A ticker whose quote or rules fail (a network
+    # error, a locked database) is recorded in errors and tried again on
+    # the next poll; the others carry on.
+    def __init__(self, engine, provider, interval=30.0, clock=time.time):
+        self.engine = engine
+        self.provider = provider
+        self.interval = interval
+        self.clock = clock
+        self.polls = 0
+        self.errors = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    async def poll_once(self):
+        # Returns the alerts triggered by this round of quotes.
+        tickers = self.engine.tickers()
+        results = await asyncio.gather(
+            *(asyncio.to_thread(self.provider.quote, ticker) for ticker in tickers),
+            return_exceptions=True,
+        )
+        now = self.clock()
+        fired = []
+        for ticker, result in zip(tickers, results):
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                if result.get("currentPrice") is not None:
+                    fired.extend(
+                        self.engine.on_quote(ticker, result.get("time", now), float(result["currentPrice"]))
+                    )
+            except Exception as e:
+                self.errors[ticker] = e
+                continue
+            self.errors.pop(ticker, None)
+        self.polls += 1
+        return fired
+
+    async def run(self, polls=None):
+        count = 0
+        while not self._stop.is_set() and (polls is None or count < polls):
+            await self.poll_once()
+            count += 1
+            await asyncio.to_thread(self._stop.wait, self.interval)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=asyncio.run, args=(self.run(),), daemon=True, name="alert-worker"
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
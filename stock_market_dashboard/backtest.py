@@ -0,0 +1,230 @@
+import argparse
+import datetime
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from indicators import IndicatorEngine
+from market_calendar import bars_per_year
+
+METRICS = ["total_return", "sharpe", "max_drawdown", "trades", "exposure"]
+# Below this many pairs a grid runs in-process; starting workers and
+# shipping them the closes costs more than it saves.
+MIN_PARALLEL_PAIRS = 200
+
+
+def window_grid(fast_windows, slow_windows):
+    # Every (fast, slow) pair with fast < slow.
+    return [(fast, slow) for fast in fast_windows for slow in slow_windows if fast < slow]
+
+
+class Backtester:
+    # The dashboard's SMA crossover rule run as a strategy over every ticker
+    # at once. A signal on a bar's close is acted on from the next bar, so
+    # no bar trades on its own close: long while the fast SMA is above the
+    # slow one and flat otherwise (or short, with allow_short). Works in
+    # the IndicatorEngine's bar space, where every column is one ticker's
+    # own bars, so a pair costs a handful of array operations for all
+    # tickers together. Sharpe ratios are annualized with each ticker's own
+    # bars per year (every day for crypto) unless periods_per_year is given.
+    def __init__(self, closes, periods_per_year=None, allow_short=False, sma_cache=64):
+        self.engine = IndicatorEngine(closes)
+        self.tickers = self.engine.tickers
+        if periods_per_year is None:
+            periods_per_year = np.array([bars_per_year(ticker) for ticker in self.tickers])
+        self.periods_per_year = periods_per_year
+        self.allow_short = allow_short
+        bars = self.engine.bars[: self.engine.depth]
+        returns = np.zeros(bars.shape)
+        returns[1:] = bars[1:] / bars[:-1] - 1
+        # Zero past each ticker's last bar, so those rows add nothing.
+        self.returns = np.nan_to_num(returns)
+        self.squared_returns = self.returns * self.returns
+        # Log growth of a bar held long or short, so equity curves are a
+        # cumsum of position-selected logs rather than a log per pair.
+        self.long_log = np.log1p(self.returns)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.short_log = np.log1p(-self.returns)
+        # Bars with a return, i.e. every bar after each ticker's first.
+        self.periods = np.maximum(self.engine.lengths - 1, 0)
+        self._past_end = np.arange(len(bars))[:, None] >= self.engine.lengths
+        self._sma = {}
+        self._sma_cache = sma_cache
+
+    def _sma_bars(self, window):
+        # A grid reuses each window for many pairs; the oldest is dropped
+        # once sma_cache windows are kept.
+        if window not in self._sma:
+            if len(self._sma) >= self._sma_cache:
+                del self._sma[next(iter(self._sma))]
+            self._sma[window] = self.engine.sma_bars(window)
+        return self._sma[window]
+
+    def positions(self, fast, slow):
+        # Position held over each bar, from the previous bar's signal.
+        fast_sma, slow_sma = self._sma_bars(fast), self._sma_bars(slow)
+        held = np.zeros(fast_sma.shape)
+        held[1:] = fast_sma[:-1] > slow_sma[:-1]
+        if self.allow_short:
+            held[1:] -= fast_sma[:-1] < slow_sma[:-1]
+        # The last bar's signal would otherwise carry into the row after a
+        # ticker's history ends.
+        held[self._past_end] = 0.0
+        return held
+
+    def run(self, fast, slow):
+        # {metric: array with one value per ticker} for one window pair.
+        held = self.positions(fast, slow)
+        if self.allow_short:
+            log_growth = np.where(held > 0, self.long_log, np.where(held < 0, self.short_log, 0.0))
+        else:
+            log_growth = held * self.long_log
+        log_equity = np.cumsum(log_growth, axis=0)
+        drawdown = log_equity - np.maximum.accumulate(log_equity, axis=0)
+        periods = np.maximum(self.periods, 1)
+        mean = np.einsum("ij,ij->j", held, self.returns) / periods
+        invested = held != 0
+        variance = np.maximum(
+            np.einsum("ij,ij->j", invested, self.squared_returns) / periods - mean * mean, 0.0
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe = np.where(variance > 0, mean / np.sqrt(variance), np.nan)
+        entries = invested[1:] & (held[1:] != held[:-1])
+        return {
+            "total_return": np.expm1(log_equity[-1]) if len(log_equity) else np.zeros(len(self.tickers)),
+            "sharpe": sharpe * np.sqrt(self.periods_per_year),
+            "max_drawdown": np.expm1(drawdown.min(axis=0, initial=0.0)),
+            "trades": entries.sum(axis=0),
+            "exposure": invested.sum(axis=0) / periods,
+        }
+
+    def run_pairs(self, pairs):
+        # One row per (ticker, fast, slow).
+        frames = []
+        for fast, slow in pairs:
+            metrics = self.run(fast, slow)
+            frames.append(pd.DataFrame({"ticker": self.tickers, "fast": fast, "slow": slow, **metrics}))
+        if not frames:
+            return pd.DataFrame(columns=["ticker", "fast", "slow", *METRICS])
+        return pd.concat(frames, ignore_index=True)
+
+    def buy_and_hold(self):
+        # The benchmark for every strategy: holding each ticker throughout.
+        lengths = self.engine.lengths
+        bars = self.engine.bars
+        cols = np.arange(len(self.tickers))
+        first, last = bars[0], bars[np.maximum(lengths - 1, 0), cols]
+        return pd.Series(np.where(lengths > 0, last / first - 1, np.nan), index=self.engine.columns)
+
+    def trades(self, ticker, fast, slow):
+        # Every round trip for one ticker: entry and exit dates and closes,
+        # side and return. A position still open at the end exits on the
+        # last bar and is marked open.
+        col = self.tickers.index(ticker)
+        length = self.engine.lengths[col]
+        held = self.positions(fast, slow)[:length, col]
+        closes = self.engine.bars[:length, col]
+        dates = self.engine.index[self.engine.rows[:length, col]]
+        changes = np.flatnonzero(np.diff(held, prepend=0.0))
+        trades = []
+        for start, end in zip(changes, list(changes[1:]) + [length]):
+            side = held[start]
+            if side == 0:
+                continue
+            # Held over bars start..end-1: bought on the close before start.
+            entry, exit_ = start - 1, end - 1
+            trades.append(
+                {
+                    "Entry Date": dates[entry],
+                    "Entry Price": closes[entry],
+                    "Exit Date": dates[exit_],
+                    "Exit Price": closes[exit_],
+                    "Side": "Long" if side > 0 else "Short",
+                    "Return": side * (closes[exit_] / closes[entry] - 1),
+                    "Open": end == length,
+                }
+            )
+        return pd.DataFrame(
+            trades,
+            columns=["Entry Date", "Entry Price", "Exit Date", "Exit Price", "Side", "Return", "Open"],
+        )
+
+
+# Each pool worker builds its Backtester once and reuses it for every chunk.
+_worker = None
+
+
+def _init_worker(closes, periods_per_year, allow_short):
+    global _worker
+    _worker = Backtester(closes, periods_per_year, allow_short)
+
+
+def _run_chunk(pairs):
+    return _worker.run_pairs(pairs)
+
+
+def run_grid(closes, pairs, workers=None, periods_per_year=None, allow_short=False):
+    # Backtests every (fast, slow) pair on every ticker in closes. Big grids
+    # are split into chunks across a process pool.
+    pairs = list(pairs)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(pairs) < MIN_PARALLEL_PAIRS:
+        return Backtester(closes, periods_per_year, allow_short).run_pairs(pairs)
+    size = -(-len(pairs) // (workers * 4))
+    chunks = [pairs[i : i + size] for i in range(0, len(pairs), size)]
+    with ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(closes, periods_per_year, allow_short)
+    ) as pool:
+        return pd.concat(pool.map(_run_chunk, chunks), ignore_index=True)
+
+
+def best_pairs(results, metric="sharpe"):
+    # The best (fast, slow) pair per ticker by metric.
+    ranked = results.dropna(subset=[metric]).sort_values(metric, ascending=False)
+    return ranked.drop_duplicates("ticker").set_index("ticker").sort_index()
+
+
+def main():
+    from data_providers import make_provider
+    from market_data import MarketData
+    from price_cache import PriceCache
+    from ticker_lists import all_tickers
+
+    parser = argparse.ArgumentParser(description="Backtest the SMA crossover over a grid of window pairs on locally stored prices.")
+    parser.add_argument("--tickers", nargs="+", default=all_tickers)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--fast", type=int, nargs=3, default=[2, 50, 1], metavar=("FROM", "TO", "STEP"))
+    parser.add_argument("--slow", type=int, nargs=3, default=[10, 200, 5], metavar=("FROM", "TO", "STEP"))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--short", action="store_true", help="go short on a sell signal instead of flat")
+    parser.add_argument("--output", help="write every result to this CSV")
+    args = parser.parse_args()
+
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=365 * args.years)
+    market = MarketData(PriceCache(make_provider()))
+    closes, errors = market.panel(args.tickers, start, end)
+    for ticker, error in errors.items():
+        print(f"Error fetching {ticker}: {error}")
+    closes = closes["Close"]
+
+    pairs = window_grid(range(*args.fast), range(*args.slow))
+    began = time.perf_counter()
+    results = run_grid(closes, pairs, args.workers, allow_short=args.short)
+    elapsed = time.perf_counter() - began
+    print(
+        f"{len(pairs)} window pairs x {closes.shape[1]} tickers = {len(results)} backtests "
+        f"in {elapsed:.2f}s ({len(results) / elapsed:,.0f}/s)\n"
+    )
+    best = best_pairs(results)
+    best["buy_and_hold"] = Backtester(closes).buy_and_hold()
+    print(best.round(3).to_string())
+    if args.output:
+        results.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
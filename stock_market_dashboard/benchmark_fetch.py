@@ -0,0 +1,61 @@
+import argparse
+import datetime
+import tempfile
+import time
+from pathlib import Path
+
+from data_providers import StubProvider
+from market_data import MarketData
+from price_cache import PriceCache
+from ticker_lists import all_tickers
+
+
+def timed(name, run):
+    start = time.perf_counter()
+    errors = run()
+    elapsed = time.perf_counter() - start
+    print(f"  {name:<42} {elapsed:8.2f}s{f'  ({len(errors)} failed)' if errors else ''}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time fetching every dashboard ticker against a fake provider with network-like latency.")
+    parser.add_argument("--latency", type=float, default=0.25, help="seconds per provider request")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--flaky", type=int, default=5, help="tickers whose first request fails")
+    args = parser.parse_args()
+
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=365 * args.years)
+    failures = {ticker: 1 for ticker in all_tickers[: args.flaky]}
+    print(f"{len(all_tickers)} tickers, {args.years} years, {args.latency}s per request, {args.flaky} flaky\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def market(name, **options):
+            provider = StubProvider(args.latency, failures)
+            return MarketData(PriceCache(provider, Path(tmp) / f"{name}.sqlite"), backoff=0.05, **options)
+
+        def one_at_a_time():
+            # The old page: each ticker fetched in turn, twice when several
+            # are selected (compare chart, then the detail section).
+            provider = StubProvider(args.latency, failures)
+            errors = {}
+            for _ in range(2):
+                for ticker in all_tickers:
+                    try:
+                        provider.history(ticker, start, end)
+                    except ConnectionError as e:
+                        errors[ticker] = e
+            return errors
+
+        timed("one at a time, twice (before)", one_at_a_time)
+        pooled = market("pooled", batch=False, max_workers=args.workers)
+        timed(f"thread pool ({args.workers} workers)", lambda: pooled.download(all_tickers, start, end))
+        batched = market("batched", max_workers=args.workers)
+        timed("batched request + pooled retries", lambda: batched.download(all_tickers, start, end))
+        timed("rerun served from the cache", lambda: batched.panel(all_tickers, start, end)[1])
+
+
+if __name__ == "__main__":
+    main()
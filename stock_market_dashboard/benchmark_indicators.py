@@ -0,0 +1,89 @@
+import argparse
+import datetime
+import time
+
+import pandas as pd
+
+from data_providers import StubProvider
+from indicators import IndicatorEngine
+from market_data import build_panel
+from ticker_lists import all_tickers
+
+# (fast, slow) SMA pairs, RSI periods and Bollinger windows screened per run.
+SETTINGS = [(5, 20), (10, 30), (20, 50), (50, 200)]
+PERIODS = [7, 14, 21]
+WINDOWS = [10, 20, 50]
+
+
+def per_ticker(closes):
+    # The old approach: each ticker's indicators on its own Series.
+    table = {}
+    for ticker in closes.columns:
+        close = closes[ticker].dropna()
+        row = {}
+        for fast, slow in SETTINGS:
+            diff = close.rolling(fast).mean() - close.rolling(slow).mean()
+            row[f"SMA {fast}/{slow}"] = 1 if diff.iloc[-1] > 0 else -1 if diff.iloc[-1] < 0 else 0
+        change = close.diff()
+        for period in PERIODS:
+            gain = change.clip(lower=0).ewm(alpha=1 / period, adjust=False).mean()
+            loss = (-change).clip(lower=0).ewm(alpha=1 / period, adjust=False).mean()
+            row[f"RSI {period}"] = 100 - 100 / (1 + gain.iloc[-1] / loss.iloc[-1])
+        line = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+        row["MACD Hist"] = (line - line.ewm(span=9, adjust=False).mean()).iloc[-1]
+        for window in WINDOWS:
+            mean, std = close.rolling(window).mean(), close.rolling(window).std(ddof=0)
+            row[f"%B {window}"] = (close.iloc[-1] - mean.iloc[-1] + 2 * std.iloc[-1]) / (4 * std.iloc[-1])
+        table[ticker] = row
+    return pd.DataFrame.from_dict(table, orient="index")
+
+
+def vectorized(closes):
+    engine = IndicatorEngine(closes)
+    for fast, slow in SETTINGS:
+        engine.screen(fast, slow)
+    for period in PERIODS:
+        engine.screen(period=period)
+    for window in WINDOWS:
+        engine.screen(window=window)
+    return engine
+
+
+def timed(name, run, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {name:<42} {best * 1000:9.1f}ms")
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time screening every dashboard ticker over several indicator settings.")
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=365 * args.years)
+    provider = StubProvider()
+    closes = build_panel(
+        {ticker: provider.history(ticker, start, end) for ticker in all_tickers}, all_tickers
+    )["Close"]
+    settings = len(SETTINGS) + len(PERIODS) + len(WINDOWS)
+    print(f"{len(all_tickers)} tickers, {args.years} years ({len(closes)} rows), {settings} settings\n")
+
+    _, before = timed("per-ticker pandas (before)", lambda: per_ticker(closes), args.repeat)
+    engine, after = timed("IndicatorEngine, all tickers at once", lambda: vectorized(closes), args.repeat)
+
+    # A new bar for every ticker, then the same screen again.
+    last = closes.iloc[-1]
+    day = closes.index[-1] + datetime.timedelta(days=1)
+    timed("append one bar to every ticker", lambda: engine.append(day, last * 1.01), args.repeat)
+    timed("screen after the append", lambda: engine.screen(), args.repeat)
+    print(f"\n  speedup: {before / after:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Points a line trace is cut down to for each chart detail setting: a
+# couple per horizontal pixel of a wide chart is as much as can be seen.
+# None draws every point.
+DETAIL = {"Low": 500, "Medium": 1500, "High": 3000, "Full": None}
+# Candles narrower than a few pixels are unreadable, so the candlestick
+# and volume charts get this fraction of the line budget, as bars.
+BARS_PER_POINT = 0.25
+# Traces with more points than this are drawn with WebGL instead of SVG.
+WEBGL_THRESHOLD = 2000
+# Coarser and coarser bars tried in turn until a range fits the budget.
+RESOLUTIONS = [("D", None), ("W", "W-FRI"), ("M", "ME"), ("Q", "QE")]
+
+
+def lttb(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: indices of threshold points of (x, y)
+    # that keep the line's shape. The first and last points are kept; every
+    # bucket in between keeps the point making the largest triangle with
+    # the previous kept point and the average of the next bucket.
+    n = len(x)
+    if threshold is None or threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(int) + 1
+    edges[-1] = n - 1
+    # Average point of each bucket, plus the last point as a final "bucket".
+    counts = np.diff(edges)
+    mean_x = np.append(np.add.reduceat(x[:-1], edges[:-1]) / counts, x[-1])
+    mean_y = np.append(np.add.reduceat(y[:-1], edges[:-1]) / counts, y[-1])
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        ax, ay = x[previous], y[previous]
+        area = np.abs(
+            (ax - mean_x[bucket + 1]) * (y[start:end] - ay)
+            - (ax - x[start:end]) * (mean_y[bucket + 1] - ay)
+        )
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample(series, max_points):
+    # A Series cut down to max_points with LTTB, NaNs dropped.
+    series = series.dropna()
+    if max_points is None or len(series) <= max_points:
+        return series
+    x = series.index.asi8 if isinstance(series.index, pd.DatetimeIndex) else np.arange(len(series))
+    return series.iloc[lttb(x, series.to_numpy(), max_points)]
+
+
+def resample_ohlc(hist, rule):
+    # Daily OHLCV bars rolled up into coarser ones (e.g. "W-FRI", "ME"),
+    # each labelled with its last trading day.
+    if rule is None or hist.empty:
+        return hist
+    bars = hist.resample(rule).agg(
+        {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+    )
+    last_day = hist.index.to_series().resample(rule).max()
+    bars.index = pd.DatetimeIndex(last_day, name=hist.index.name)
+    return bars.dropna(subset=["Close"])
+
+
+def choose_resolution(hist, max_bars):
+    # The finest bar size at which hist fits in max_bars, as (name, rule).
+    if max_bars is None:
+        return RESOLUTIONS[0]
+    days = (hist.index[-1] - hist.index[0]).days + 1 if len(hist) else 0
+    for name, rule in RESOLUTIONS:
+        if rule is None and len(hist) <= max_bars:
+            return name, rule
+        per_bar = {"W": 7, "M": 30.4, "Q": 91.3}.get(name)
+        if per_bar and days / per_bar <= max_bars:
+            return name, rule
+    return RESOLUTIONS[-1]
+
+
+def bar_budget(max_points):
+    return None if max_points is None else max(int(max_points * BARS_PER_POINT), 20)
+
+
+def line_figure(frame, title, max_points, y_label="Price"):
+    # One line per column, each downsampled on its own; WebGL once the
+    # traces together are still large.
+    lines = {column: downsample(frame[column], max_points) for column in frame.columns}
+    trace = go.Scattergl if sum(map(len, lines.values())) > WEBGL_THRESHOLD else go.Scatter
+    fig = go.Figure(
+        [
+            trace(x=line.index, y=line.values, mode="lines", name=str(column))
+            for column, line in lines.items()
+        ]
+    )
+    fig.update_layout(
+        title=title, xaxis_title="Date", yaxis_title=y_label, showlegend=len(lines) > 1
+    )
+    return fig
+
+
+def candlestick_figure(hist, title, max_points):
+    name, rule = choose_resolution(hist, bar_budget(max_points))
+    bars = resample_ohlc(hist, rule)
+    label = {"D": "", "W": " (Weekly Bars)", "M": " (Monthly Bars)", "Q": " (Quarterly Bars)"}[name]
+    fig = go.Figure(
+        [
+            go.Candlestick(
+                x=bars.index,
+                open=bars["Open"],
+                high=bars["High"],
+                low=bars["Low"],
+                close=bars["Close"],
+            )
+        ]
+    )
+    fig.update_layout(title=title + label, xaxis_title="Date", yaxis_title="Price")
+    return fig
+
+
+def volume_figure(hist, title, max_points):
+    # Volume summed into the same bars as the candlestick chart.
+    name, rule = choose_resolution(hist, bar_budget(max_points))
+    bars = resample_ohlc(hist, rule)
+    label = {"D": "", "W": " (Weekly)", "M": " (Monthly)", "Q": " (Quarterly)"}[name]
+    fig = go.Figure([go.Bar(x=bars.index, y=bars["Volume"])])
+    fig.update_layout(title=title + label, xaxis_title="Date", yaxis_title="Volume")
+    return fig
+
+
+def heatmap_figure(matrix, title, zmin=-1, zmax=1):
+    # A (ticker x ticker) matrix such as correlations, diverging around 0.
+    fig = go.Figure(
+        [
+            go.Heatmap(
+                z=matrix.to_numpy(),
+                x=list(matrix.columns),
+                y=list(matrix.index),
+                zmin=zmin,
+                zmax=zmax,
+                colorscale="RdBu",
+                reversescale=True,
+            )
+        ]
+    )
+    fig.update_layout(title=title, yaxis_autorange="reversed")
+    return fig
+
+
+def frontier_figure(points, title):
+    # Portfolios as (volatility, return) points from PortfolioAnalytics.frontier:
+    # the random portfolios as a cloud coloured by Sharpe ratio, the frontier
+    # as a line and each ticker as a labelled marker.
+    cloud = points[points["kind"] == "portfolio"]
+    frontier = points[points["kind"] == "frontier"]
+    single = points[points["kind"] == "ticker"]
+    trace = go.Scattergl if len(cloud) > WEBGL_THRESHOLD else go.Scatter
+    fig = go.Figure(
+        [
+            trace(
+                x=cloud["volatility"],
+                y=cloud["return"],
+                mode="markers",
+                name="Long-Only Portfolios",
+                marker=dict(size=4, color=cloud["sharpe"], colorscale="Viridis", showscale=True),
+            ),
+            go.Scatter(
+                x=frontier["volatility"], y=frontier["return"], mode="lines", name="Efficient Frontier"
+            ),
+            go.Scatter(
+                x=single["volatility"],
+                y=single["return"],
+                mode="markers+text",
+                text=single["label"],
+                textposition="top center",
+                name="Tickers",
+            ),
+        ]
+    )
+    fig.update_layout(
+        title=title,
+        xaxis_title="Volatility (Annualized)",
+        yaxis_title="Return (Annualized)",
+        xaxis_tickformat=".0%",
+        yaxis_tickformat=".0%",
+    )
+    return fig
+
+
+def data_version(data):
+    # Changes whenever the data a figure was drawn from does: its size and
+    # its last row (a live update only ever touches the end).
+    if data.empty:
+        return (0,)
+    # Compared as bytes, so a NaN in the last row still matches itself.
+    return (len(data), data.index[-1], np.asarray(data.iloc[-1], dtype=float).tobytes())
+
+
+class FigureCache:
+    # Built figures kept by (ticker, chart, range, resolution) with the
+    # version of the data they were drawn from, least recently used first
+    # out. A rerun with the same selection reuses the figure instead of
+    # downsampling and building it again.
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version, build):
+        with self._lock:
+            cached = self._figures.get(key)
+            if cached is not None and cached[0] == version:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+        figure = build()
+        with self._lock:
+            self._figures[key] = (version, figure)
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.capacity:
+                self._figures.popitem(last=False)
+        return figure
@@ -0,0 +1,194 @@
+import datetime
+import os
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def empty_history():
+    return pd.DataFrame(
+        {column: pd.Series(dtype=float) for column in COLUMNS},
+        index=pd.DatetimeIndex([], name="Date"),
+    )
+
+
+def normalize_history(hist):
+    # Daily bars with a tz-naive midnight index and just the OHLCV columns,
+    # whatever the source returned.
+    if hist is None or hist.empty:
+        return empty_history()
+    hist = hist.reindex(columns=COLUMNS).astype(float)
+    index = pd.DatetimeIndex(hist.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    hist.index = index.normalize().rename("Date")
+    return hist[~hist.index.duplicated(keep="last")].sort_index()
+
+
+class YahooProvider:
+    # Daily bars and ticker info from Yahoo Finance. Date ranges are
+    # inclusive of both ends.
+    #
+    # Every provider has history(ticker, start, end), info(ticker) and
+    # quote(ticker), the last being just the live price fields, which is
+    # much cheaper than the full info. Providers that can fetch many tickers
+    # in one request also have history_many(tickers, start, end), returning
+    # {ticker: bars} for the tickers that came back.
+    name = "yahoo"
+
+    def history(self, ticker, start, end):
+        import yfinance as yf
+
+        hist = yf.Ticker(ticker).history(
+            start=start, end=end + datetime.timedelta(days=1)
+        )
+        return normalize_history(hist)
+
+    def history_many(self, tickers, start, end):
+        import yfinance as yf
+
+        data = yf.download(
+            list(tickers),
+            start=start,
+            end=end + datetime.timedelta(days=1),
+            group_by="ticker",
+            threads=False,
+            progress=False,
+        )
+        histories = {}
+        for ticker in tickers:
+            if isinstance(data.columns, pd.MultiIndex):
+                if ticker not in data.columns.get_level_values(0):
+                    continue
+                hist = data[ticker]
+            else:
+                hist = data
+            hist = normalize_history(hist.dropna(how="all"))
+            if not hist.empty:
+                histories[ticker] = hist
+        return histories
+
+    def info(self, ticker):
+        import yfinance as yf
+
+        return yf.Ticker(ticker).info
+
+    def quote(self, ticker):
+        import yfinance as yf
+
+        fast = yf.Ticker(ticker).fast_info
+        return {
+            "currentPrice": fast["lastPrice"],
+            "open": fast["open"],
+            "dayHigh": fast["dayHigh"],
+            "dayLow": fast["dayLow"],
+        }
+
+
+class StubProvider:
+    # Deterministic synthetic prices for tests and offline runs: a random walk
+    # per ticker, seeded from its name, with a bar every business day (every
+    # day for crypto). The same ticker and date always get the same bar, and
+    # every request is recorded in calls. latency (seconds per request) and
+    # failures ({ticker: how many requests fail first}) make it stand in
+    # for a slow, flaky network in benchmarks.
+    name = "stub"
+    origin = datetime.date(2000, 1, 3)
+
+    def __init__(self, latency=0.0, failures=None):
+        self.latency = latency
+        self.failures = dict(failures or {})
+        self.calls = []
+        self._paths = {}
+        self._lock = threading.Lock()
+
+    def _request(self, tickers):
+        time.sleep(self.latency)
+        with self._lock:
+            for ticker in tickers:
+                if self.failures.get(ticker):
+                    self.failures[ticker] -= 1
+                    raise ConnectionError(f"Simulated failure fetching {ticker}")
+
+    def _path(self, ticker, end):
+        through, path = self._paths.get(ticker, (None, None))
+        if path is None or through < end:
+            through = max(end, datetime.date.today())
+            dates = pd.date_range(self.origin, through, freq="D")
+            if not ticker.endswith("-USD"):
+                dates = dates[dates.dayofweek < 5]
+            rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+            start_price = 20 + rng.random() * 480
+            close = start_price * np.exp(np.cumsum(rng.normal(0.0003, 0.02, len(dates))))
+            open_ = close * np.exp(rng.normal(0, 0.005, len(dates)))
+            spread = np.abs(rng.normal(0, 0.01, len(dates)))
+            path = pd.DataFrame(
+                {
+                    "Open": open_,
+                    "High": np.maximum(open_, close) * (1 + spread),
+                    "Low": np.minimum(open_, close) * (1 - spread),
+                    "Close": close,
+                    "Volume": rng.integers(1_000_000, 50_000_000, len(dates)).astype(float),
+                },
+                index=dates.rename("Date"),
+            )
+            self._paths[ticker] = (through, path)
+        return path
+
+    def history(self, ticker, start, end):
+        self.calls.append((ticker, start, end))
+        self._request([ticker])
+        with self._lock:
+            path = self._path(ticker, end)
+        return path.loc[pd.Timestamp(start) : pd.Timestamp(end)].copy()
+
+    def history_many(self, tickers, start, end):
+        # One request for the whole batch; a ticker that fails is simply
+        # missing from the result, as with a real batched download.
+        self.calls.append((tuple(tickers), start, end))
+        time.sleep(self.latency)
+        histories = {}
+        for ticker in tickers:
+            with self._lock:
+                if self.failures.get(ticker):
+                    self.failures[ticker] -= 1
+                    continue
+                path = self._path(ticker, end)
+            histories[ticker] = path.loc[pd.Timestamp(start) : pd.Timestamp(end)].copy()
+        return histories
+
+    def _last_bar(self, ticker):
+        with self._lock:
+            last = self._path(ticker, datetime.date.today()).iloc[-1]
+        return {
+            "currentPrice": round(last["Close"], 2),
+            "open": round(last["Open"], 2),
+            "dayHigh": round(last["High"], 2),
+            "dayLow": round(last["Low"], 2),
+        }
+
+    def quote(self, ticker):
+        self.calls.append(("quote", ticker))
+        self._request([ticker])
+        return self._last_bar(ticker)
+
+    def info(self, ticker):
+        self.calls.append(("info", ticker))
+        self._request([ticker])
+        info = self._last_bar(ticker)
+        info["longBusinessSummary"] = f"Synthetic prices for {ticker} (offline mode)."
+        return info
+
+
+PROVIDERS = {"yahoo": YahooProvider, "stub": StubProvider}
+
+
+def make_provider(name=None):
+    # STOCK_DATA_PROVIDER=stub runs the dashboard offline.
+    name = name or os.environ.get("STOCK_DATA_PROVIDER", "yahoo")
+    return PROVIDERS[name]()
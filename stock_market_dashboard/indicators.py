@@ -0,0 +1,353 @@
+import numpy as np
+import pandas as pd
+
+
+def ema_columns(x, alpha, first=0):
+    # EMA down each column of x (adjust=False, seeded with row first):
+    # ema[t] = alpha * x[t] + (1 - alpha) * ema[t - 1]. Unrolled, a block of
+    # rows after a known value is decay**k * (prev + cumsum(alpha * x * decay**-k)),
+    # so each block is a cumsum instead of a Python step per row. Blocks are
+    # kept short enough that decay**-k stays far from overflowing.
+    out = np.full(x.shape, np.nan)
+    if x.shape[0] <= first:
+        return out
+    decay = 1.0 - alpha
+    out[first] = x[first]
+    if decay <= 0:
+        out[first:] = x[first:]
+        return out
+    block = max(1, int(50 / -np.log(decay)))
+    previous = x[first]
+    position = first + 1
+    while position < x.shape[0]:
+        chunk = x[position : position + block]
+        k = np.arange(1, chunk.shape[0] + 1)[:, None]
+        growth = decay ** -k.astype(float)
+        out[position : position + chunk.shape[0]] = (decay**k) * (
+            previous + np.cumsum(alpha * chunk * growth, axis=0)
+        )
+        previous = out[position + chunk.shape[0] - 1]
+        position += chunk.shape[0]
+    return out
+
+
+class IndicatorEngine:
+    # Technical indicators for every ticker at once. Closes are kept in "bar
+    # space": one column per ticker holding just that ticker's own bars from
+    # row 0 down, so a window of n bars means n trading days for a stock and
+    # n calendar days for a crypto coin, as with a per-ticker rolling(). The
+    # calendar row of each bar is kept alongside to map results back onto
+    # the panel's dates.
+    #
+    # Windowed indicators (SMA, Bollinger bands) come from running sums of
+    # the closes and their squares: a window is the difference of two sums,
+    # so every ticker and every bar is done in a few array operations.
+    # Recursive ones (EMA, RSI, MACD) step through the bars once with all
+    # tickers side by side and keep their arrays, so append() can extend
+    # everything by a bar in O(tickers) instead of recomputing.
+    def __init__(self, closes, capacity=None):
+        values = closes.to_numpy(dtype=float)
+        self.tickers = list(closes.columns)
+        self.columns = pd.Index(self.tickers, name=closes.columns.name)
+        self.index = pd.DatetimeIndex(closes.index)
+        valid = ~np.isnan(values)
+        self.lengths = valid.sum(axis=0)
+        # Boolean indexing and nonzero() both walk the panel row by row, so
+        # these line up bar for bar.
+        rows, cols = np.nonzero(valid)
+        capacity = max(capacity or 0, 2 * int(self.lengths.max(initial=0)), 16)
+        self.bars = np.full((capacity, len(self.tickers)), np.nan)
+        self.rows = np.full((capacity, len(self.tickers)), -1)
+        positions = np.cumsum(valid, axis=0)[valid] - 1
+        self.bars[positions, cols] = values[rows, cols]
+        self.rows[positions, cols] = rows
+        self._sums = None
+        self._ema = {}
+        self._layout = None
+
+    # --- Storage ---
+
+    def _grow(self):
+        extra = self.bars.shape[0]
+        self.bars = np.vstack([self.bars, np.full_like(self.bars[:extra], np.nan)])
+        self.rows = np.vstack([self.rows, np.full_like(self.rows[:extra], -1)])
+        if self._sums is not None:
+            self._sums = tuple(
+                np.vstack([s, np.full_like(s[:extra], np.nan)]) for s in self._sums
+            )
+        for key, values in self._ema.items():
+            self._ema[key] = np.vstack([values, np.full_like(values[:extra], np.nan)])
+
+    @property
+    def depth(self):
+        # Bars in the longest column; arrays past this row are spare capacity.
+        return int(self.lengths.max(initial=0))
+
+    def _mask(self):
+        return np.arange(self.depth)[:, None] < self.lengths[None, :]
+
+    def _bar_layout(self):
+        # Flat positions of every bar in bar space and on the calendar,
+        # reused by every to_frame() until the next append().
+        if self._layout is None:
+            positions, cols = np.nonzero(self._mask())
+            rows = self.rows[positions, cols]
+            self._layout = (
+                positions * self.bars.shape[1] + cols,
+                rows * len(self.tickers) + cols,
+            )
+        return self._layout
+
+    def to_frame(self, values):
+        # A bar-space array as a DataFrame on the calendar dates.
+        source, target = self._bar_layout()
+        out = np.full(len(self.index) * len(self.tickers), np.nan)
+        out[target] = np.ravel(values[: self.depth])[source]
+        return pd.DataFrame(
+            out.reshape(len(self.index), len(self.tickers)), index=self.index, columns=self.columns
+        )
+
+    def latest(self, values):
+        # The value at each ticker's most recent bar.
+        last = np.maximum(self.lengths - 1, 0)
+        result = values[last, np.arange(len(self.tickers))]
+        return pd.Series(np.where(self.lengths > 0, result, np.nan), index=self.columns)
+
+    # --- Windowed indicators ---
+
+    def _running_sums(self):
+        # Sums of closes and squared closes over bars [0, i), with row 0 all
+        # zeros. Closes are centred on each ticker's first bar to keep the
+        # squared sums from losing precision.
+        if self._sums is None:
+            centre = np.nan_to_num(self.bars[0])
+            x = np.nan_to_num(self.bars - centre)
+            zeros = np.zeros((1, x.shape[1]))
+            self._sums = (
+                np.vstack([zeros, np.cumsum(x, axis=0)]),
+                np.vstack([zeros, np.cumsum(x * x, axis=0)]),
+                centre,
+            )
+        return self._sums
+
+    def _window(self, window, with_squares=True):
+        # (sum, sum of squares) of the centred closes over the n bars ending
+        # at each bar, NaN where fewer than n bars exist yet.
+        total, squares, _ = self._running_sums()
+        missing = ~self._mask()
+        missing[: window - 1] = True
+
+        def windowed(sums):
+            out = np.full(missing.shape, np.nan)
+            if self.depth >= window:
+                out[window - 1 :] = sums[window : self.depth + 1] - sums[: self.depth - window + 1]
+            out[missing] = np.nan
+            return out
+
+        return windowed(total), windowed(squares) if with_squares else None
+
+    def sma_bars(self, window):
+        window_sum, _ = self._window(window, with_squares=False)
+        return window_sum / window + self._running_sums()[2]
+
+    def sma(self, window):
+        return self.to_frame(self.sma_bars(window))
+
+    def bollinger(self, window=20, width=2.0):
+        # (middle, upper, lower) bands: the SMA plus/minus width population
+        # standard deviations, as rolling(window).std(ddof=0) would give.
+        window_sum, window_squares = self._window(window)
+        mean = window_sum / window
+        std = np.sqrt(np.maximum(window_squares / window - mean * mean, 0.0))
+        middle = mean + self._running_sums()[2]
+        return (
+            self.to_frame(middle),
+            self.to_frame(middle + width * std),
+            self.to_frame(middle - width * std),
+        )
+
+    def crossover_bars(self, fast=10, slow=30):
+        # The dashboard's SMA crossover: signal 1 while the fast SMA is above
+        # the slow one, -1 while below, 0 otherwise; trade is the change in
+        # signal, so 2 marks a buy and -2 a sell.
+        diff = self.sma_bars(fast) - self.sma_bars(slow)
+        signal = np.where(diff > 0, 1.0, np.where(diff < 0, -1.0, 0.0))
+        signal[~self._mask()] = np.nan
+        trade = np.full_like(signal, np.nan)
+        trade[1:] = signal[1:] - signal[:-1]
+        return signal, trade
+
+    def crossover(self, fast=10, slow=30):
+        signal, trade = self.crossover_bars(fast, slow)
+        return self.to_frame(signal), self.to_frame(trade)
+
+    # --- Recursive indicators ---
+
+    def _source(self, source, positions, cols):
+        # The input series an EMA runs over, at the given bars.
+        close = self.bars[positions, cols]
+        if source == "close":
+            return close
+        if source in ("gain", "loss"):
+            previous = np.where(positions > 0, self.bars[np.maximum(positions - 1, 0), cols], np.nan)
+            change = close - previous
+            return np.maximum(change, 0.0) if source == "gain" else np.maximum(-change, 0.0)
+        _, fast, slow = source
+        return self.ema_bars(fast)[positions, cols] - self.ema_bars(slow)[positions, cols]
+
+    def _source_all(self, source):
+        # The same at every bar, with plain slices.
+        close = self.bars[: self.depth]
+        if source == "close":
+            return close
+        if source in ("gain", "loss"):
+            change = np.full(close.shape, np.nan)
+            change[1:] = close[1:] - close[:-1]
+            return np.maximum(change, 0.0) if source == "gain" else np.maximum(-change, 0.0)
+        _, fast, slow = source
+        return self.ema_bars(fast)[: self.depth] - self.ema_bars(slow)[: self.depth]
+
+    def _ema_step(self, values, source, alpha, positions, cols):
+        x = self._source(source, positions, cols)
+        previous = np.where(positions > 0, values[np.maximum(positions - 1, 0), cols], np.nan)
+        values[positions, cols] = np.where(np.isnan(previous), x, alpha * x + (1 - alpha) * previous)
+
+    def _ema_of(self, source, alpha):
+        # EMA of a source series for every ticker, kept for append().
+        key = (source, alpha)
+        if key not in self._ema:
+            x = self._source_all(source)
+            # Gains and losses start at the second bar.
+            first = 1 if source in ("gain", "loss") else 0
+            values = np.full(self.bars.shape, np.nan)
+            values[: self.depth] = ema_columns(x, alpha, first)
+            self._ema[key] = values
+        return self._ema[key]
+
+    def ema_bars(self, span):
+        return self._ema_of("close", 2.0 / (span + 1))
+
+    def ema(self, span):
+        return self.to_frame(self.ema_bars(span))
+
+    @staticmethod
+    def _rsi(gain, loss):
+        # Wilder's RSI: smoothed average gain over average loss.
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(loss == 0, 100.0, 100.0 - 100.0 / (1.0 + gain / loss))
+
+    def rsi_bars(self, period=14):
+        gain = self._ema_of("gain", 1.0 / period)[: self.depth]
+        loss = self._ema_of("loss", 1.0 / period)[: self.depth]
+        return self._rsi(gain, loss)
+
+    def rsi(self, period=14):
+        return self.to_frame(self.rsi_bars(period))
+
+    def macd_bars(self, fast=12, slow=26, signal=9):
+        depth = self.depth
+        line = self.ema_bars(fast)[:depth] - self.ema_bars(slow)[:depth]
+        signal_line = self._ema_of(("macd", fast, slow), 2.0 / (signal + 1))[:depth]
+        return line, signal_line, line - signal_line
+
+    def macd(self, fast=12, slow=26, signal=9):
+        # (MACD line, signal line, histogram).
+        return tuple(self.to_frame(values) for values in self.macd_bars(fast, slow, signal))
+
+    def _last_window(self, window):
+        # (mean, population std) of the centred closes over each ticker's
+        # last n bars: two rows of the running sums per ticker.
+        total, squares, _ = self._running_sums()
+        cols = np.arange(len(self.tickers))
+        start = self.lengths - window
+        ok = start >= 0
+        start = np.maximum(start, 0)
+        mean = np.where(ok, (total[self.lengths, cols] - total[start, cols]) / window, np.nan)
+        mean_squares = (squares[self.lengths, cols] - squares[start, cols]) / window
+        return mean, np.sqrt(np.maximum(mean_squares - mean * mean, 0.0))
+
+    def screen(self, fast=10, slow=30, period=14, window=20, width=2.0):
+        # The latest reading of each indicator, one row per ticker. Windowed
+        # ones are read straight off the running sums at each ticker's last
+        # bar rather than computed over the whole history.
+        centre = self._running_sums()[2]
+        close = self.latest(self.bars)
+        fast_mean, _ = self._last_window(fast)
+        slow_mean, _ = self._last_window(slow)
+        diff = fast_mean - slow_mean
+        mean, std = self._last_window(window)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            percent_b = (close - centre - mean + width * std) / (2 * width * std)
+        return pd.DataFrame(
+            {
+                "Close": close,
+                f"RSI {period}": self._rsi(
+                    self.latest(self._ema_of("gain", 1.0 / period)),
+                    self.latest(self._ema_of("loss", 1.0 / period)),
+                ),
+                "MACD Hist": self.latest(self.ema_bars(12))
+                - self.latest(self.ema_bars(26))
+                - self.latest(self._ema_of(("macd", 12, 26), 2.0 / 10)),
+                "Bollinger %B": percent_b,
+                f"SMA {fast}/{slow}": np.where(
+                    self.lengths > 0, np.sign(np.nan_to_num(diff)), np.nan
+                ),
+            }
+        )
+
+    # --- Incremental updates ---
+
+    def append(self, date, closes):
+        # Adds one bar: closes maps ticker to its close on date (tickers
+        # without a bar that day are left out or NaN). Running sums and every
+        # EMA computed so far are extended by one step.
+        date = pd.Timestamp(date)
+        if len(self.index) and date < self.index[-1]:
+            raise ValueError("Bars must be appended in date order")
+        if not len(self.index) or date > self.index[-1]:
+            self.index = self.index.append(pd.DatetimeIndex([date], name=self.index.name))
+        row = len(self.index) - 1
+        closes = pd.Series(closes, dtype=float).reindex(self.tickers)
+        cols = np.flatnonzero(closes.notna().to_numpy())
+        if not len(cols):
+            return
+        positions = self.lengths[cols].copy()
+        # A second bar on the same date replaces the first.
+        same_day = (positions > 0) & (self.rows[np.maximum(positions - 1, 0), cols] == row)
+        positions[same_day] -= 1
+        if positions.max() >= self.bars.shape[0]:
+            self._grow()
+        self._write(positions, cols, closes.to_numpy()[cols], row)
+
+    def update_last(self, closes):
+        # Replaces the close of each given ticker's most recent bar, keeping
+        # its date, e.g. with a quote taken outside a trading session.
+        closes = pd.Series(closes, dtype=float).reindex(self.tickers)
+        cols = np.flatnonzero(closes.notna().to_numpy() & (self.lengths > 0))
+        if not len(cols):
+            return
+        positions = self.lengths[cols] - 1
+        self._write(positions, cols, closes.to_numpy()[cols], self.rows[positions, cols])
+
+    def last_date(self, ticker):
+        # The date of ticker's most recent bar, or None before its first.
+        col = self.tickers.index(ticker)
+        if not self.lengths[col]:
+            return None
+        return self.index[self.rows[self.lengths[col] - 1, col]]
+
+    def _write(self, positions, cols, closes, rows):
+        # Sets the bars at positions and extends the running sums and every
+        # EMA computed so far through them.
+        self.bars[positions, cols] = closes
+        self.rows[positions, cols] = rows
+        self.lengths[cols] = positions + 1
+        self._layout = None
+
+        if self._sums is not None:
+            total, squares, centre = self._sums
+            x = self.bars[positions, cols] - centre[cols]
+            total[positions + 1, cols] = total[positions, cols] + x
+            squares[positions + 1, cols] = squares[positions, cols] + x * x
+        for (source, alpha), values in self._ema.items():
+            self._ema_step(values, source, alpha, positions, cols)
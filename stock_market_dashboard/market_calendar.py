@@ -0,0 +1,95 @@
+import datetime
+import time
+from functools import lru_cache
+
+import pandas as pd
+from pandas.tseries.holiday import (
+    AbstractHolidayCalendar,
+    GoodFriday,
+    Holiday,
+    USLaborDay,
+    USMartinLutherKingJr,
+    USMemorialDay,
+    USPresidentsDay,
+    USThanksgivingDay,
+    nearest_workday,
+    sunday_to_monday,
+)
+
+# Every stock in ticker_lists trades on a US exchange; crypto coins (the
+# "-USD" tickers) trade around the clock and their daily bars are UTC days.
+EXCHANGE_TZ = "America/New_York"
+MARKET_OPEN = datetime.time(9, 30)
+# Daily bars a year: exchange sessions, or every day for crypto.
+TRADING_DAYS = 252
+CRYPTO_DAYS = 365
+
+
+class USExchangeCalendar(AbstractHolidayCalendar):
+    # Days the NYSE and Nasdaq are closed all day. New Year's Day on a
+    # Saturday is not made up on the Friday before.
+    rules = [
+        Holiday("New Year's Day", month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday("Juneteenth", month=6, day=19, start_date="2022-01-01", observance=nearest_workday),
+        Holiday("Independence Day", month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday("Christmas", month=12, day=25, observance=nearest_workday),
+    ]
+
+
+def is_crypto(ticker):
+    return ticker.endswith("-USD")
+
+
+def bars_per_year(ticker):
+    return CRYPTO_DAYS if is_crypto(ticker) else TRADING_DAYS
+
+
+@lru_cache(maxsize=None)
+def _holidays(year):
+    days = USExchangeCalendar().holidays(f"{year}-01-01", f"{year}-12-31")
+    return frozenset(day.date() for day in days)
+
+
+def is_trading_day(ticker, day):
+    if is_crypto(ticker):
+        return True
+    return day.weekday() < 5 and day not in _holidays(day.year)
+
+
+def had_session(ticker, start, end, when=None):
+    # Whether a session on some day in [start, end] had opened by when
+    # (epoch seconds, default now), so the provider could have a bar for it.
+    # False for a weekend, a holiday, or today before the open.
+    moment = pd.Timestamp(time.time() if when is None else when, unit="s", tz="UTC")
+    if is_crypto(ticker):
+        last = moment.date()
+    else:
+        local = moment.tz_convert(EXCHANGE_TZ)
+        last = local.date() if local.time() >= MARKET_OPEN else local.date() - datetime.timedelta(days=1)
+    day = start
+    while day <= min(end, last):
+        if is_trading_day(ticker, day):
+            return True
+        day += datetime.timedelta(days=1)
+    return False
+
+
+def session_date(ticker, when):
+    # The date of the daily bar a quote at when (epoch seconds) belongs to,
+    # as a midnight Timestamp like the history's index: the exchange's
+    # local date from the open on a trading day, or the UTC date for
+    # crypto. None outside a session (weekends, holidays, before the open),
+    # when the quote is still the last session's price.
+    moment = pd.Timestamp(when, unit="s", tz="UTC")
+    if is_crypto(ticker):
+        return moment.tz_localize(None).normalize()
+    local = moment.tz_convert(EXCHANGE_TZ)
+    if local.time() < MARKET_OPEN or not is_trading_day(ticker, local.date()):
+        return None
+    return pd.Timestamp(local.date())
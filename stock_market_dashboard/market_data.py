@@ -0,0 +1,100 @@
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from data_providers import COLUMNS
+
+
+def with_retry(fetch, retries=3, backoff=0.5):
+    # Calls fetch(), retrying failures with exponential backoff plus jitter
+    # (backoff, 2 * backoff, ...). The last failure is re-raised.
+    for attempt in range(retries + 1):
+        try:
+            return fetch()
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2**attempt * (0.5 + random.random()))
+
+
+def build_panel(histories, tickers):
+    # One DataFrame for all tickers: the union of their dates as the index
+    # and (field, ticker) columns, so panel["Close"] has a column per ticker.
+    frames = {ticker: histories[ticker] for ticker in tickers if ticker in histories}
+    if not frames:
+        return pd.DataFrame(
+            columns=pd.MultiIndex.from_product([COLUMNS, []], names=["Field", "Ticker"]),
+            index=pd.DatetimeIndex([], name="Date"),
+        )
+    panel = pd.concat(frames, axis=1, names=["Ticker", "Field"], sort=True).swaplevel(axis=1)
+    return panel.reindex(
+        columns=pd.MultiIndex.from_product([COLUMNS, list(frames)], names=["Field", "Ticker"])
+    )
+
+
+def ticker_history(panel, ticker):
+    # One ticker's bars back out of a panel, without the dates only other
+    # tickers traded on.
+    if ticker not in panel.columns.get_level_values("Ticker"):
+        return pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([], name="Date"))
+    return panel.xs(ticker, axis=1, level="Ticker")[COLUMNS].dropna(how="all")
+
+
+class MarketData:
+    # Fetches every selected ticker at once and serves them as one aligned
+    # panel from the PriceCache. Tickers missing the same span go to the
+    # provider as one batched request when it supports history_many;
+    # anything a batch didn't return is fetched one ticker at a time on a
+    # bounded thread pool, each with retries and backoff.
+    def __init__(self, cache, max_workers=8, retries=3, backoff=0.5, batch=True):
+        self.cache = cache
+        self.provider = cache.provider
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.batch = batch
+
+    def _fetch_one(self, ticker, start, end):
+        hist = with_retry(
+            lambda: self.provider.history(ticker, start, end), self.retries, self.backoff
+        )
+        self.cache.store(ticker, hist, start, end)
+
+    def download(self, tickers, start, end):
+        # Fills the cache for every ticker over [start, end]. Returns
+        # {ticker: error} for the ones that could not be fetched.
+        by_span = defaultdict(list)
+        for ticker, spans in self.cache.plan(tickers, start, end).items():
+            for span in spans:
+                by_span[span].append(ticker)
+
+        jobs = []
+        for (span_start, span_end), span_tickers in by_span.items():
+            if self.batch and len(span_tickers) > 1 and hasattr(self.provider, "history_many"):
+                try:
+                    histories = self.provider.history_many(span_tickers, span_start, span_end)
+                except Exception:
+                    histories = {}
+                for ticker, hist in histories.items():
+                    self.cache.store(ticker, hist, span_start, span_end)
+                span_tickers = [ticker for ticker in span_tickers if ticker not in histories]
+            jobs.extend((ticker, span_start, span_end) for ticker in span_tickers)
+
+        errors = {}
+        if jobs:
+            with ThreadPoolExecutor(min(self.max_workers, len(jobs))) as pool:
+                futures = {job: pool.submit(self._fetch_one, *job) for job in jobs}
+            for (ticker, _, _), future in futures.items():
+                if future.exception() is not None:
+                    errors[ticker] = future.exception()
+        return errors
+
+    def panel(self, tickers, start, end):
+        # (panel, errors) for the tickers over [start, end], in the order given.
+        errors = self.download(tickers, start, end)
+        histories = {ticker: self.cache.stored(ticker, start, end) for ticker in tickers}
+        histories = {ticker: hist for ticker, hist in histories.items() if not hist.empty}
+        return build_panel(histories, tickers), errors
@@ -0,0 +1,141 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+MINUTE = 60
+DAY = 24 * 60 * MINUTE
+
+# Where each field comes from and how long a fetched value stays fresh.
+# Live prices come from the provider's cheap quote() call and expire in
+# seconds; everything else comes from the full info() and keeps for days.
+FIELDS = {
+    "currentPrice": ("quote", 15),
+    "open": ("quote", 15),
+    "dayHigh": ("quote", 15),
+    "dayLow": ("quote", 15),
+    "longBusinessSummary": ("info", 3 * DAY),
+}
+DEFAULT_FIELD = ("info", DAY)
+PAGE_FIELDS = tuple(FIELDS)
+
+# Stored for a field its source was asked for and did not return, so it
+# keeps for the field's TTL like a value instead of refetching the source.
+ABSENT = object()
+
+
+class MetadataCache:
+    # Ticker info kept per field with its own TTL. get() never waits on the
+    # network: it returns whatever is stored, fresh or not, and hands stale
+    # or missing fields to a background pool that refetches them. refresh()
+    # does the same for a whole list of tickers up front, so all selected
+    # tickers update together while the page renders. The counters say how
+    # many field lookups were fresh (hits), served stale, or not there yet
+    # (misses). A field the provider does not have is stored as ABSENT.
+    def __init__(self, provider, fields=FIELDS, max_workers=4, clock=time.monotonic):
+        self.provider = provider
+        self.fields = fields
+        self.clock = clock
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+        self.fetches = 0
+        self.errors = 0
+        self._values = {}
+        self._wanted = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="metadata")
+
+    def _source(self, field):
+        return self.fields.get(field, DEFAULT_FIELD)
+
+    def _expired_sources(self, ticker, fields, count=False):
+        # The sources (quote/info) with a field that is missing or past its
+        # TTL. Called with the lock held.
+        now = self.clock()
+        stored = self._values.get(ticker, {})
+        self._wanted.setdefault(ticker, set()).update(fields)
+        expired = set()
+        for field in fields:
+            source, ttl = self._source(field)
+            if field not in stored:
+                expired.add(source)
+                if count:
+                    self.misses += 1
+            elif now - stored[field][1] > ttl:
+                expired.add(source)
+                if count:
+                    self.stale += 1
+            elif count:
+                self.hits += 1
+        return expired
+
+    def _schedule(self, ticker, sources):
+        # Called with the lock held; at most one fetch per (ticker, source)
+        # is in flight, and a second request gets the same future.
+        futures = []
+        for source in sources:
+            key = (ticker, source)
+            if key not in self._pending:
+                self._pending[key] = self._pool.submit(self._fetch, ticker, source)
+            futures.append(self._pending[key])
+        return futures
+
+    def _fetch(self, ticker, source):
+        try:
+            values = getattr(self.provider, source)(ticker)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+                self._pending.pop((ticker, source), None)
+            return
+        now = self.clock()
+        with self._lock:
+            self.fetches += 1
+            stored = self._values.setdefault(ticker, {})
+            for field, value in values.items():
+                # A quote only refreshes the fields it is responsible for;
+                # an info refresh may update everything.
+                if source == "info" or self._source(field)[0] == source:
+                    stored[field] = (value, now)
+            for field in self._wanted.get(ticker, ()):
+                if field not in values and self._source(field)[0] == source:
+                    stored[field] = (ABSENT, now)
+            self._pending.pop((ticker, source), None)
+
+    def get(self, ticker, fields=PAGE_FIELDS):
+        # {field: value} of what is stored for ticker right now.
+        with self._lock:
+            expired = self._expired_sources(ticker, fields, count=True)
+            self._schedule(ticker, expired)
+            stored = self._values.get(ticker, {})
+            return {field: stored[field][0] for field in fields if stored.get(field, (ABSENT,))[0] is not ABSENT}
+
+    def refresh(self, tickers, fields=PAGE_FIELDS):
+        # Starts background fetches for every ticker with anything expired.
+        # Returns the futures (including ones already in flight), for
+        # callers that do want to wait.
+        futures = []
+        with self._lock:
+            for ticker in tickers:
+                futures.extend(self._schedule(ticker, self._expired_sources(ticker, fields)))
+        return futures
+
+    def pending(self, ticker):
+        with self._lock:
+            return any(key[0] == ticker for key in self._pending)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.stale + self.misses
+            return {
+                "hits": self.hits,
+                "stale": self.stale,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "fetches": self.fetches,
+                "errors": self.errors,
+            }
+
+    def close(self):
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,287 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from price_cache import to_date
+
+TRADING_DAYS = 252
+# Ticker sets whose loaded price matrices are kept for re-slicing.
+PRICE_SETS = 8
+
+
+def pairwise_moments(returns):
+    # Pairwise-complete (count, covariance, correlation) of the columns of
+    # a returns matrix with NaNs for missing days, as DataFrame.cov() and
+    # .corr() give, but from four matrix products instead of a loop over
+    # pairs: every sum over "days both tickers have a return" is a product
+    # with the validity mask.
+    valid = ~np.isnan(returns)
+    mask = valid.astype(float)
+    x = np.where(valid, returns, 0.0)
+    count = mask.T @ mask
+    sum_x = x.T @ mask
+    sum_xx = (x * x).T @ mask
+    sum_xy = x.T @ x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariance = (sum_xy - sum_x * sum_x.T / count) / (count - 1)
+        var_x = (sum_xx - sum_x * sum_x / count) / (count - 1)
+        correlation = covariance / np.sqrt(var_x * var_x.T)
+    enough = count > 1
+    return count, np.where(enough, covariance, np.nan), np.where(enough, correlation, np.nan)
+
+
+def _regularized(covariance, ridge):
+    # A little of the average variance added to the diagonal keeps
+    # near-singular matrices (more tickers than days) solvable.
+    n = len(covariance)
+    return covariance + ridge * np.trace(covariance) / n * np.eye(n)
+
+
+def frontier_weights(mean, covariance, targets, ridge=1e-8):
+    # Minimum-variance weights (fully invested, shorting allowed) for each
+    # target return, one row per target, in closed form from the inverse
+    # covariance.
+    covariance = _regularized(covariance, ridge)
+    inv_ones = np.linalg.solve(covariance, np.ones(len(mean)))
+    inv_mean = np.linalg.solve(covariance, mean)
+    a, b, c = inv_ones.sum(), inv_mean.sum(), mean @ inv_mean
+    targets = np.asarray(targets, dtype=float)[:, None]
+    return ((c - b * targets) * inv_ones + (a * targets - b) * inv_mean) / (a * c - b * b)
+
+
+def min_variance_weights(covariance, ridge=1e-8):
+    inv_ones = np.linalg.solve(_regularized(covariance, ridge), np.ones(len(covariance)))
+    return inv_ones / inv_ones.sum()
+
+
+def max_sharpe_weights(mean, covariance, ridge=1e-8):
+    # The tangency portfolio for a zero risk-free rate, or None when there
+    # is none: if the weights' sum is negative, scaling them to be fully
+    # invested flips their sign and gives the lowest Sharpe ratio instead.
+    inv_mean = np.linalg.solve(_regularized(covariance, ridge), mean)
+    if inv_mean.sum() <= 0:
+        return None
+    return inv_mean / inv_mean.sum()
+
+
+class PortfolioAnalytics:
+    # Cross-ticker statistics on one aligned matrix of daily returns read
+    # from the local PriceCache. Prices for a set of tickers are loaded
+    # once over a span and only sliced when the date window moves inside
+    # it, and every result is memoized by (statistic, tickers, window,
+    # parameters), so sliding the dates or switching tabs reuses work.
+    # Both are kept for ttl seconds; after that the cache is brought up to
+    # date and prices are only reread if its version changed.
+    #
+    # Returns are taken on weekdays: crypto prices are forward-filled from
+    # the weekday close, so a weekend move shows up in Monday's return
+    # instead of as zero-return days for every stock.
+    def __init__(self, market, periods_per_year=TRADING_DAYS, memo_size=64, ttl=900, clock=time.monotonic):
+        self.market = market
+        self.periods_per_year = periods_per_year
+        self.memo_size = memo_size
+        self.ttl = ttl
+        self.clock = clock
+        self.loads = 0
+        self._prices = OrderedDict()
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+
+    # --- Data ---
+
+    def _load(self, tickers, start, end):
+        # Weekday closes for tickers, loaded over at least [start, end].
+        # Entries are (start, end, closes, checked at, cache version).
+        key = tuple(tickers)
+        loaded = self._prices.get(key)
+        now = self.clock()
+        if loaded is not None and loaded[0] <= start and loaded[1] >= end:
+            if now - loaded[3] <= self.ttl:
+                return loaded[2]
+            start, end = loaded[0], loaded[1]
+        elif loaded is not None:
+            start, end = min(start, loaded[0]), max(end, loaded[1])
+        self.market.download(list(tickers), start, end)
+        version = self.market.cache.version
+        if loaded is not None and (loaded[0], loaded[1], loaded[4]) == (start, end, version):
+            closes = loaded[2]
+        else:
+            closes = self.market.cache.closes(list(tickers), start, end)
+            days = pd.bdate_range(start, end, name="Date")
+            closes = closes.reindex(closes.index.union(days)).ffill().reindex(days)
+            self.loads += 1
+        self._prices[key] = (start, end, closes, now, version)
+        self._prices.move_to_end(key)
+        while len(self._prices) > PRICE_SETS:
+            self._prices.popitem(last=False)
+        return closes
+
+    def _memoized(self, compute, name, tickers, start, end, *params):
+        key = (name, tuple(tickers), to_date(start), to_date(end), *params)
+        with self._lock:
+            if key in self._memo and self.clock() - self._memo[key][1] <= self.ttl:
+                self._memo.move_to_end(key)
+                return self._memo[key][0]
+        computed_at = self.clock()
+        value = compute()
+        with self._lock:
+            self._memo[key] = (value, computed_at)
+            self._memo.move_to_end(key)
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return value
+
+    def returns(self, tickers, start, end):
+        # Daily simple returns, one column per ticker, NaN before a ticker
+        # has prices.
+        start, end = to_date(start), to_date(end)
+
+        def compute():
+            closes = self._load(tickers, start, end).loc[pd.Timestamp(start) : pd.Timestamp(end)]
+            return closes.pct_change(fill_method=None).iloc[1:]
+
+        return self._memoized(compute, "returns", tickers, start, end)
+
+    # --- Statistics ---
+
+    def covariance(self, tickers, start, end):
+        # Annualized pairwise covariance matrix.
+        def compute():
+            _, covariance, _ = pairwise_moments(self.returns(tickers, start, end).to_numpy())
+            return pd.DataFrame(covariance * self.periods_per_year, index=tickers, columns=tickers)
+
+        return self._memoized(compute, "covariance", tickers, start, end)
+
+    def correlation(self, tickers, start, end):
+        def compute():
+            _, _, correlation = pairwise_moments(self.returns(tickers, start, end).to_numpy())
+            return pd.DataFrame(correlation, index=tickers, columns=tickers)
+
+        return self._memoized(compute, "correlation", tickers, start, end)
+
+    def rolling_correlation(self, tickers, start, end, window=60, step=5):
+        # (dates, array of correlation matrices) over the trailing window
+        # days, every step days up to the last one. Each matrix is one
+        # product of the window's (days x tickers) slice with itself.
+        def compute():
+            returns = self.returns(tickers, start, end)
+            values = returns.to_numpy()
+            ends = np.arange(len(values), window - 1, -step)[::-1]
+            matrices = np.empty((len(ends), len(tickers), len(tickers)))
+            for i, end_row in enumerate(ends):
+                matrices[i] = pairwise_moments(values[end_row - window : end_row])[2]
+            return returns.index[ends - 1], matrices
+
+        return self._memoized(compute, "rolling_correlation", tickers, start, end, window, step)
+
+    @staticmethod
+    def _with_benchmark(tickers, benchmark):
+        # The benchmark joins the set at the end, so when it is already one
+        # of the tickers the same loaded prices are reused.
+        return list(tickers) if benchmark in tickers else [*tickers, benchmark]
+
+    def beta(self, tickers, benchmark, start, end):
+        # Each ticker's beta to the benchmark: cov(ticker, benchmark) /
+        # var(benchmark) over the days both have returns.
+        def compute():
+            columns = self._with_benchmark(tickers, benchmark)
+            _, covariance, _ = pairwise_moments(self.returns(columns, start, end).to_numpy())
+            market = columns.index(benchmark)
+            betas = covariance[:, market] / covariance[market, market]
+            return pd.Series(betas, index=columns).reindex(tickers)
+
+        return self._memoized(compute, "beta", tickers, start, end, benchmark)
+
+    def rolling_beta(self, tickers, benchmark, start, end, window=60):
+        # Beta to the benchmark over the trailing window days, for every
+        # day at once from running sums of the returns and their products
+        # with the benchmark's.
+        def compute():
+            columns = self._with_benchmark(tickers, benchmark)
+            returns = self.returns(columns, start, end)
+            values = returns.to_numpy()
+            market = values[:, [columns.index(benchmark)]]
+            valid = ~np.isnan(values) & ~np.isnan(market)
+            x = np.where(valid, values, 0.0)
+            m = np.where(valid, market, 0.0)
+
+            def trailing(a):
+                total = np.vstack([np.zeros((1, a.shape[1])), np.cumsum(a, axis=0)])
+                out = np.full(a.shape, np.nan)
+                out[window - 1 :] = total[window:] - total[:-window]
+                return out
+
+            n = trailing(valid.astype(float))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                sum_x, sum_m = trailing(x), trailing(m)
+                covariance = trailing(x * m) - sum_x * sum_m / n
+                variance = trailing(m * m) - sum_m * sum_m / n
+                betas = np.where(n > 1, covariance / variance, np.nan)
+            return pd.DataFrame(betas, index=returns.index, columns=columns)[tickers]
+
+        return self._memoized(compute, "rolling_beta", tickers, start, end, benchmark, window)
+
+    def _annualized_moments(self, tickers, start, end):
+        # Mean and covariance over the days every ticker has a return, as a
+        # portfolio needs all of its legs priced.
+        returns = self.returns(tickers, start, end).dropna()
+        mean = returns.mean().to_numpy() * self.periods_per_year
+        return mean, returns.cov().to_numpy() * self.periods_per_year
+
+    def frontier(self, tickers, start, end, points=50, samples=2000, seed=0):
+        # Points to plot as annualized (return, volatility, sharpe): the
+        # closed-form efficient frontier with shorting allowed from the
+        # minimum-variance portfolio up (kind "frontier"), random long-only
+        # portfolios (kind "portfolio") and each ticker on its own (kind
+        # "ticker"). Sharpe assumes a zero risk-free rate.
+        def compute():
+            mean, covariance = self._annualized_moments(tickers, start, end)
+            n = len(tickers)
+            weights = {"ticker": np.eye(n)}
+            if n > 1:
+                low = min_variance_weights(covariance) @ mean
+                targets = np.linspace(low, low + 1.5 * (mean.max() - low), points)
+                weights["frontier"] = frontier_weights(mean, covariance, targets)
+                weights["portfolio"] = np.random.default_rng(seed).dirichlet(np.ones(n), samples)
+            frames = []
+            for kind in ["frontier", "portfolio", "ticker"]:
+                if kind not in weights:
+                    continue
+                expected = weights[kind] @ mean
+                volatility = np.sqrt(
+                    np.einsum("ij,jk,ik->i", weights[kind], covariance, weights[kind])
+                )
+                frames.append(
+                    pd.DataFrame(
+                        {
+                            "kind": kind,
+                            "label": list(tickers) if kind == "ticker" else "",
+                            "return": expected,
+                            "volatility": volatility,
+                            "sharpe": expected / volatility,
+                        }
+                    )
+                )
+            return pd.concat(frames, ignore_index=True)
+
+        return self._memoized(compute, "frontier", tickers, start, end, points, samples, seed)
+
+    def weights(self, tickers, start, end):
+        # Minimum-variance and maximum-Sharpe weights, one column each. With
+        # no maximum-Sharpe portfolio (no positive expected return to reach)
+        # the second column repeats the minimum-variance weights and says so.
+        def compute():
+            mean, covariance = self._annualized_moments(tickers, start, end)
+            minimum = min_variance_weights(covariance)
+            label, sharpe = "Max Sharpe", max_sharpe_weights(mean, covariance)
+            if sharpe is None:
+                label, sharpe = "Max Sharpe (n/a: Min Variance)", minimum
+            return pd.DataFrame(
+                {"Min Variance": minimum, label: sharpe},
+                index=pd.Index(tickers, name="Ticker"),
+            )
+
+        return self._memoized(compute, "weights", tickers, start, end)
@@ -0,0 +1,196 @@
+import datetime
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from data_providers import COLUMNS, normalize_history
+from market_calendar import had_session
+
+CACHE_DIR = Path(__file__).parent
+ONE_DAY = datetime.timedelta(days=1)
+# Tickers per query when reading many at once (SQLite caps bound parameters).
+SQL_BATCH = 500
+
+
+def to_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return pd.Timestamp(value).date()
+
+
+def merge_spans(spans):
+    # Joins overlapping or adjacent (start, end, fetched_at) spans. A merged
+    # span keeps the fetch time of whichever span reaches furthest.
+    merged = []
+    for start, end, fetched_at in sorted(spans):
+        if merged and start <= merged[-1][1] + ONE_DAY:
+            last_start, last_end, last_fetched = merged[-1]
+            if end > last_end or (end == last_end and fetched_at > last_fetched):
+                merged[-1] = (last_start, end, fetched_at)
+        else:
+            merged.append((start, end, fetched_at))
+    return merged
+
+
+class PriceCache:
+    # Daily OHLCV bars stored in SQLite by (ticker, date), plus the date
+    # spans already fetched for each ticker. A request only goes to the
+    # provider for the parts of its range no earlier request covered, and
+    # the answer is always read back from the local table. Spans reaching
+    # today are only trusted for live_ttl seconds, since today's bar is
+    # still changing; after that the last day is fetched again. Each
+    # provider gets its own file so stub prices never mix with real ones.
+    # version counts the writes, so readers can tell when to reread.
+    def __init__(self, provider, path=None, live_ttl=900):
+        if path is None:
+            path = CACHE_DIR / f"prices_{provider.name}.sqlite"
+        self.provider = provider
+        self.live_ttl = live_ttl
+        self.version = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS bars (ticker TEXT, date TEXT, open REAL, high REAL, "
+                "low REAL, close REAL, volume REAL, PRIMARY KEY (ticker, date)) WITHOUT ROWID"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS spans (ticker TEXT, start TEXT, end TEXT, fetched_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS spans_ticker ON spans (ticker)")
+
+    def _spans(self, ticker):
+        rows = self._conn.execute(
+            "SELECT start, end, fetched_at FROM spans WHERE ticker = ?", (ticker,)
+        )
+        return [(to_date(start), to_date(end), fetched_at) for start, end, fetched_at in rows]
+
+    def missing_spans(self, ticker, start, end):
+        start, end = to_date(start), to_date(end)
+        today = datetime.date.today()
+        stale_before = time.time() - self.live_ttl
+        missing = []
+        cursor = start
+        for span_start, span_end, fetched_at in merge_spans(self._spans(ticker)):
+            if span_end >= today and fetched_at < stale_before:
+                span_end = today - ONE_DAY
+            if span_end < cursor or span_start > end:
+                continue
+            if span_start > cursor:
+                missing.append((cursor, span_start - ONE_DAY))
+            cursor = max(cursor, span_end + ONE_DAY)
+            if cursor > end:
+                break
+        if cursor <= end:
+            missing.append((cursor, end))
+        return missing
+
+    def plan(self, tickers, start, end):
+        # The spans each ticker is missing over [start, end]; tickers that
+        # are fully stored are left out. Spans without a session (weekends,
+        # holidays, today before the open) have no bars to fetch: they are
+        # marked covered up to today and left out too.
+        plan = {}
+        today = datetime.date.today()
+        with self._lock:
+            for ticker in tickers:
+                spans = []
+                for span in self.missing_spans(ticker, start, end):
+                    if had_session(ticker, *span):
+                        spans.append(span)
+                    elif span[0] <= today:
+                        self._write(ticker, [], span[0], min(span[1], today))
+                if spans:
+                    plan[ticker] = spans
+        return plan
+
+    def store(self, ticker, hist, start, end):
+        # Merges fetched bars for [start, end] into the table and marks the
+        # span as covered, even on days without a bar (weekends, holidays).
+        # An empty answer only covers a span without a session or one that
+        # ends before the ticker's first stored bar; otherwise it is more
+        # likely a failed fetch (the provider returns no rows rather than
+        # raising) and is tried again.
+        hist = normalize_history(hist)
+        rows = [
+            (ticker, date.strftime("%Y-%m-%d"), *values)
+            for date, values in zip(hist.index, hist[COLUMNS].itertuples(index=False))
+        ]
+        start, end = to_date(start), to_date(end)
+        with self._lock:
+            if not rows and had_session(ticker, start, end):
+                first = self._conn.execute(
+                    "SELECT MIN(date) FROM bars WHERE ticker = ?", (ticker,)
+                ).fetchone()[0]
+                if first is None or end >= to_date(first):
+                    return
+            elif not rows:
+                end = min(end, datetime.date.today())
+                if start > end:
+                    return
+            self._write(ticker, rows, start, end)
+
+    def _write(self, ticker, rows, start, end):
+        # Stores rows and marks [start, end] covered. Called with the lock held.
+        spans = merge_spans(self._spans(ticker) + [(to_date(start), to_date(end), time.time())])
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.execute("DELETE FROM spans WHERE ticker = ?", (ticker,))
+            self._conn.executemany(
+                "INSERT INTO spans VALUES (?, ?, ?, ?)",
+                [(ticker, s.isoformat(), e.isoformat(), f) for s, e, f in spans],
+            )
+        self.version += 1
+
+    def fetch_missing(self, ticker, start, end):
+        # Brings the stored bars for ticker up to date over [start, end].
+        # Returns the spans that had to be fetched.
+        missing = self.plan([ticker], start, end).get(ticker, [])
+        for span_start, span_end in missing:
+            self.store(ticker, self.provider.history(ticker, span_start, span_end), span_start, span_end)
+        return missing
+
+    def stored(self, ticker, start, end):
+        with self._lock:
+            hist = pd.read_sql_query(
+                "SELECT date, open, high, low, close, volume FROM bars "
+                "WHERE ticker = ? AND date BETWEEN ? AND ? ORDER BY date",
+                self._conn,
+                params=(ticker, to_date(start).isoformat(), to_date(end).isoformat()),
+            )
+        hist.columns = ["Date", *COLUMNS]
+        return hist.set_index(pd.DatetimeIndex(hist.pop("Date"), name="Date"))
+
+    def closes(self, tickers, start, end):
+        # Stored closes for many tickers as one (date x ticker) frame, read
+        # in a few queries rather than one per ticker.
+        frames = [pd.DataFrame(columns=["date", "ticker", "close"])]
+        with self._lock:
+            for i in range(0, len(tickers), SQL_BATCH):
+                batch = list(tickers[i : i + SQL_BATCH])
+                frames.append(
+                    pd.read_sql_query(
+                        "SELECT date, ticker, close FROM bars WHERE ticker IN "
+                        f"({', '.join('?' * len(batch))}) AND date BETWEEN ? AND ?",
+                        self._conn,
+                        params=(*batch, to_date(start).isoformat(), to_date(end).isoformat()),
+                    )
+                )
+        rows = pd.concat(frames, ignore_index=True)
+        closes = rows.pivot(index="date", columns="ticker", values="close")
+        closes.index = pd.DatetimeIndex(closes.index, name="Date")
+        return closes.reindex(columns=pd.Index(list(tickers), name="Ticker")).sort_index().astype(float)
+
+    def history(self, ticker, start, end):
+        self.fetch_missing(ticker, start, end)
+        return self.stored(ticker, start, end)
+
+    def close(self):
+        self._conn.close()
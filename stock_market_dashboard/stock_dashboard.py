@@ -1,9 +1,112 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import datetime
+import os
+import time
+
+from alerts import KINDS, AlertEngine, AlertStore, AlertWorker
+from backtest import Backtester, best_pairs, run_grid, window_grid
+from chart_rendering import (
+    DETAIL,
+    FigureCache,
+    candlestick_figure,
+    data_version,
+    frontier_figure,
+    heatmap_figure,
+    line_figure,
+    volume_figure,
+)
+from data_providers import make_provider
+from indicators import IndicatorEngine
+from market_data import MarketData, ticker_history
+from metadata_cache import MetadataCache
+from portfolio import PortfolioAnalytics
+from price_cache import PriceCache
+from streaming import QuoteStream, ReplayProvider
+from ticker_lists import all_tickers
+
+
+@st.cache_resource
+def get_market_data():
+    # One cache (and provider) shared by every rerun and session.
+    return MarketData(PriceCache(make_provider()))
+
+
+@st.cache_resource
+def get_metadata_cache():
+    return MetadataCache(get_market_data().provider)
+
+
+# Seconds between live quote polls in streaming mode.
+POLL_SECONDS = 5
+# Seconds between the alert worker's quote polls.
+ALERT_POLL_SECONDS = 30
+# Benchmark for beta, and trailing days for rolling beta and correlation.
+BENCHMARK = "SPY"
+ROLLING_WINDOW = 60
+# (fast, slow) SMA windows the backtest section tries for every ticker.
+BACKTEST_GRID = tuple(window_grid(range(5, 55, 5), range(20, 210, 10)))
+
+
+@st.cache_data(show_spinner="Backtesting...")
+def backtest_grid(closes, pairs):
+    return run_grid(closes, pairs)
+
+
+@st.cache_resource
+def get_portfolio_analytics():
+    return PortfolioAnalytics(get_market_data())
+
+
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache()
+
+
+def alert_history(ticker):
+    # Recent daily closes for SMA crossover alerts.
+    end = datetime.date.today()
+    return get_market_data().cache.history(ticker, end - datetime.timedelta(days=400), end)["Close"]
+
+
+@st.cache_resource
+def get_alert_engine():
+    # Lives as long as the server: the worker keeps checking quotes for
+    # every ticker with an alert rule whether or not a page is open.
+    engine = AlertEngine(AlertStore(), history=alert_history)
+    AlertWorker(engine, get_market_data().provider, interval=ALERT_POLL_SECONDS).start()
+    return engine
+
+
+def get_quote_stream(closes, key):
+    # One stream per session, replaced (and the old one stopped) when the
+    # tickers or dates change. STOCK_REPLAY_FILE plays back recorded ticks
+    # instead of polling the data provider.
+    current = st.session_state.get("quote_stream")
+    if current is not None and current[0] == key:
+        return current[1]
+    stop_quote_stream()
+    replay_file = os.environ.get("STOCK_REPLAY_FILE")
+    provider = ReplayProvider.from_csv(replay_file) if replay_file else market.provider
+    stream = QuoteStream(provider, closes, interval=POLL_SECONDS)
+    # Live ticks are checked against the alert rules as they arrive.
+    stream.listeners.append(alerts.on_quote)
+    stream.start()
+    st.session_state["quote_stream"] = (key, stream)
+    return stream
+
+
+def stop_quote_stream():
+    current = st.session_state.pop("quote_stream", None)
+    if current is not None:
+        current[1].stop()
+
+
+market = get_market_data()
+metadata = get_metadata_cache()
+figures = get_figure_cache()
+portfolio = get_portfolio_analytics()
+alerts = get_alert_engine()
 
 
 # --- DARK MODE TOGGLE ---
@@ -25,76 +128,6 @@ st.title("📈 Stock Market Dashboard")
 
 
 # --- Ticker Selection (Multiselect) ---
-# Top 50 US stocks by market cap (as of 2025, static list) + popular cryptocurrencies
-top_50_tickers = [
-    "AAPL",
-    "MSFT",
-    "GOOGL",
-    "AMZN",
-    "NVDA",
-    "META",
-    "BRK-B",
-    "TSLA",
-    "LLY",
-    "V",
-    "JPM",
-    "UNH",
-    "WMT",
-    "MA",
-    "XOM",
-    "AVGO",
-    "PG",
-    "JNJ",
-    "HD",
-    "MRK",
-    "COST",
-    "ABBV",
-    "ADBE",
-    "PEP",
-    "CVX",
-    "KO",
-    "BAC",
-    "MCD",
-    "TMO",
-    "PFE",
-    "ORCL",
-    "DIS",
-    "CSCO",
-    "ABT",
-    "ACN",
-    "DHR",
-    "LIN",
-    "VZ",
-    "NKE",
-    "WFC",
-    "INTC",
-    "TXN",
-    "MS",
-    "AMGN",
-    "NEE",
-    "PM",
-    "UNP",
-    "BMY",
-    "QCOM",
-    "IBM",
-]
-crypto_tickers = [
-    "BTC-USD",
-    "ETH-USD",
-    "SOL-USD",
-    "BNB-USD",
-    "XRP-USD",
-    "ADA-USD",
-    "DOGE-USD",
-    "AVAX-USD",
-    "DOT-USD",
-    "LINK-USD",
-    "MATIC-USD",
-    "TRX-USD",
-    "LTC-USD",
-    "BCH-USD",
-]
-all_tickers = top_50_tickers + crypto_tickers
 tickers = st.sidebar.multiselect(
     "Select Stock/Crypto Ticker(s)", options=all_tickers, default=["AAPL"]
 )
@@ -109,67 +142,165 @@ start_date = st.sidebar.date_input("Start Date", value=pd.to_datetime("2024-01-0
 end_date = st.sidebar.date_input("End Date", value=pd.to_datetime("today"))
 if start_date > end_date:
     st.sidebar.error("Start date must be before end date.")
+detail = st.sidebar.select_slider(
+    "Chart Detail",
+    options=list(DETAIL),
+    value="Medium",
+    help="Long ranges are downsampled (lines) or drawn as weekly/monthly bars (candles)",
+)
+max_points = DETAIL[detail]
+live = st.sidebar.checkbox(
+    "📡 Live Streaming", help=f"Poll quotes every {POLL_SECONDS}s and update indicators and alerts"
+)
+
+# --- Price Data (all selected tickers at once) ---
+panel, fetch_errors = market.panel(tickers, start_date, end_date)
+# Refresh ticker info for every selected ticker in the background while the
+# page renders.
+metadata.refresh(tickers)
+# Indicators for every selected ticker at once, shared by the screen and the
+# per-ticker sections below.
+indicators = IndicatorEngine(panel["Close"])
+signal, trade = indicators.crossover(10, 30)
+backtester = Backtester(panel["Close"])
+
+# --- Triggered Alerts (last 24 hours) ---
+for _, alert in alerts.store.triggered(since=time.time() - 24 * 3600, limit=5).iterrows():
+    st.warning(f"ALERT: {alert['message']} at {alert['time']:%Y-%m-%d %H:%M:%S}")
+
+# --- Live Quotes (Streaming Mode) ---
+if live:
+    stream = get_quote_stream(panel["Close"], (tuple(tickers), start_date, end_date))
+
+    # Only this section reruns on every poll; the charts below are left alone.
+    @st.fragment(run_every=POLL_SECONDS)
+    def live_quotes():
+        st.subheader("Live Quotes")
+        snapshot = stream.snapshot()
+        snapshot["SMA 10/30"] = snapshot["SMA 10/30"].map({1: "Buy", -1: "Sell", 0: "Hold"})
+        st.dataframe(snapshot.round({column: 2 for column in snapshot.select_dtypes("number")}))
+        for ticker, error in stream.errors.items():
+            st.caption(f"Quote for {ticker} failed: {error}")
+
+    live_quotes()
+else:
+    stop_quote_stream()
 
 # --- Compare Multiple Stocks (Overlay Chart) ---
 if len(tickers) > 1:
     st.subheader("Compare Selected Stocks (Close Price)")
     normalize = st.checkbox("Normalize (Show % Change from Start)", value=False)
-    ticker_closes = []
-    ticker_names = []
-    for ticker in tickers:
-        try:
-            stock = yf.Ticker(ticker)
-            hist = stock.history(start=start_date, end=end_date)
-            close = (
-                hist["Close"] if (not hist.empty and "Close" in hist.columns) else None
-            )
-            if close is not None and close.notna().sum() > 1:
-                # Convert index to naive datetime (remove tz)
-                close.index = (
-                    close.index.tz_localize(None)
-                    if close.index.tz is not None
-                    else close.index
-                )
-                if normalize:
-                    first_valid = close[close.first_valid_index()]
-                    if first_valid != 0:
-                        close = (close / first_valid) * 100
-                    # else: leave as is
-                ticker_closes.append(close)
-                ticker_names.append(ticker)
-        except Exception as e:
-            st.write(f"Error fetching {ticker}: {e}")
-            continue
-    if ticker_closes:
-        # Build a common date range covering all days in the selected range
-        common_dates = pd.date_range(start=start_date, end=end_date, freq="D")
-        aligned = [c.reindex(common_dates) for c in ticker_closes]
-        compare_df = pd.concat(aligned, axis=1)
-        compare_df.columns = ticker_names
-        compare_df = compare_df.dropna(how="all")
+    for ticker, error in fetch_errors.items():
+        st.write(f"Error fetching {ticker}: {error}")
+    closes = panel["Close"]
+    compare_df = pd.DataFrame(index=closes.index)
+    for ticker in closes.columns:
+        close = closes[ticker]
+        if close.notna().sum() > 1:
+            if normalize:
+                first_valid = close[close.first_valid_index()]
+                if first_valid != 0:
+                    close = (close / first_valid) * 100
+                # else: leave as is
+            compare_df[ticker] = close
     # Drop all-NaN rows
     compare_df = compare_df.dropna(how="all")
     if not compare_df.empty:
         y_label = "% of Start Price" if normalize else "Price"
-        fig_compare = px.line(
-            compare_df,
-            x=compare_df.index,
-            y=compare_df.columns,
-            title="Stock/Crypto Comparison (Close Price)",
-            labels={"value": y_label},
+        fig_compare = figures.get(
+            ("compare", tuple(compare_df.columns), normalize, start_date, end_date, detail),
+            data_version(compare_df),
+            lambda: line_figure(
+                compare_df, "Stock/Crypto Comparison (Close Price)", max_points, y_label
+            ),
         )
         st.plotly_chart(fig_compare, use_container_width=True, key="compare-close")
 
+    # --- Indicator Screen ---
+    st.subheader("Indicator Screen (Latest Bar)")
+    screen = indicators.screen(10, 30)
+    screen["SMA 10/30"] = screen["SMA 10/30"].map({1: "Buy", -1: "Sell", 0: "Hold"})
+    st.dataframe(screen.round(2))
+
+    # --- Portfolio Analytics ---
+    st.subheader("Portfolio Analytics (Daily Returns, Selected Range)")
+    correlation = portfolio.correlation(tickers, start_date, end_date)
+    st.plotly_chart(
+        figures.get(
+            ("correlation", tuple(tickers), start_date, end_date),
+            data_version(correlation),
+            lambda: heatmap_figure(correlation, "Correlation of Daily Returns"),
+        ),
+        use_container_width=True,
+        key="portfolio-correlation",
+    )
+    rolling_beta = portfolio.rolling_beta(tickers, BENCHMARK, start_date, end_date, ROLLING_WINDOW)
+    st.plotly_chart(
+        figures.get(
+            ("rolling-beta", tuple(tickers), start_date, end_date, detail),
+            data_version(rolling_beta),
+            lambda: line_figure(
+                rolling_beta.drop(columns=BENCHMARK, errors="ignore"),
+                f"Rolling {ROLLING_WINDOW}-Day Beta vs {BENCHMARK}",
+                max_points,
+                "Beta",
+            ),
+        ),
+        use_container_width=True,
+        key="portfolio-beta",
+    )
+    frontier = portfolio.frontier(tickers, start_date, end_date)
+    st.plotly_chart(
+        figures.get(
+            ("frontier", tuple(tickers), start_date, end_date),
+            data_version(frontier[["return", "volatility"]]),
+            lambda: frontier_figure(frontier, "Efficient Frontier"),
+        ),
+        use_container_width=True,
+        key="portfolio-frontier",
+    )
+    covariance = portfolio.covariance(tickers, start_date, end_date)
+    portfolio_table = portfolio.weights(tickers, start_date, end_date) * 100
+    portfolio_table.columns = [f"{column} Weight %" for column in portfolio_table.columns]
+    beta = portfolio.beta(tickers, BENCHMARK, start_date, end_date)
+    portfolio_table.insert(0, f"Beta vs {BENCHMARK}", beta)
+    portfolio_table.insert(1, "Volatility %", covariance.to_numpy().diagonal() ** 0.5 * 100)
+    st.dataframe(portfolio_table.round(2))
+
+# --- Backtest (SMA Crossover) ---
+st.subheader("Backtest: SMA Crossover Strategy (Selected Range)")
+st.caption(
+    "Long while the fast SMA is above the slow one, flat otherwise, acting on the "
+    f"next bar. Best pair out of {len(BACKTEST_GRID)} (fast, slow) windows by Sharpe ratio."
+)
+grid = backtest_grid(panel["Close"], BACKTEST_GRID)
+if not grid.empty:
+    current = grid[(grid["fast"] == 10) & (grid["slow"] == 30)].set_index("ticker")
+    best = best_pairs(grid)
+    backtest_table = pd.DataFrame(
+        {
+            "SMA 10/30 Return %": current["total_return"] * 100,
+            "SMA 10/30 Sharpe": current["sharpe"],
+            "SMA 10/30 Max Drawdown %": current["max_drawdown"] * 100,
+            "SMA 10/30 Trades": current["trades"],
+            "Best Pair": best["fast"].astype(str) + "/" + best["slow"].astype(str),
+            "Best Return %": best["total_return"] * 100,
+            "Best Sharpe": best["sharpe"],
+            "Buy & Hold %": backtester.buy_and_hold() * 100,
+        }
+    )
+    st.dataframe(backtest_table.round(2))
+
 # --- Individual Stock Details ---
 for ticker in tickers:
     st.markdown(f"## {ticker.upper()}")
-    try:
-        stock = yf.Ticker(ticker)
-        hist = stock.history(start=start_date, end=end_date)
-        info = stock.info
-    except Exception as e:
-        st.error(f"Error fetching data for {ticker}: {e}")
+    if ticker in fetch_errors:
+        st.error(f"Error fetching data for {ticker}: {fetch_errors[ticker]}")
         continue
+    hist = ticker_history(panel, ticker)
+    # Whatever ticker info is cached right now; missing fields fall back to
+    # the last bar below and fill in on a later rerun.
+    info = metadata.get(ticker)
 
     # --- Key Stats ---
     st.subheader(f"Key Stats for {ticker.upper()}")
@@ -197,21 +328,20 @@ for ticker in tickers:
 
     # --- Price Chart ---
     st.subheader("Price Chart (Selected Range)")
-    fig = px.line(
-        hist, x=hist.index, y="Close", title=f"{ticker.upper()} Closing Price"
+    # Figures are reused across reruns until the ticker's data changes.
+    chart_key = (ticker, start_date, end_date, detail)
+    version = data_version(hist)
+    fig = figures.get(
+        (*chart_key, "close"),
+        version,
+        lambda: line_figure(hist[["Close"]], f"{ticker.upper()} Closing Price", max_points),
     )
     st.plotly_chart(fig, use_container_width=True, key=f"{ticker}-close")
 
     # --- Buy/Sell Recommendation (SMA Crossover) ---
     st.subheader(f"Buy/Sell Recommendations for {ticker.upper()} (SMA 10/30)")
     if not hist.empty and "Close" in hist.columns:
-        df = hist.copy()
-        df["SMA10"] = df["Close"].rolling(window=10).mean()
-        df["SMA30"] = df["Close"].rolling(window=30).mean()
-        df["Signal"] = 0
-        df.loc[df["SMA10"] > df["SMA30"], "Signal"] = 1
-        df.loc[df["SMA10"] < df["SMA30"], "Signal"] = -1
-        df["Trade"] = df["Signal"].diff()
+        df = hist[["Close"]].assign(Signal=signal[ticker], Trade=trade[ticker])
         buy_signals = df[df["Trade"] == 2]
         sell_signals = df[df["Trade"] == -2]
         # Use the most recent available data for the recommendation
@@ -234,48 +364,79 @@ for ticker in tickers:
             axis=1,
         )
         st.dataframe(signals_table.tail(5))
+        st.markdown("**Backtested Trades (SMA 10/30):**")
+        st.dataframe(backtester.trades(ticker, 10, 30).tail(5))
 
     # --- Candlestick Chart ---
     st.subheader("Candlestick Chart (Selected Range)")
-    fig_candle = go.Figure(
-        data=[
-            go.Candlestick(
-                x=hist.index,
-                open=hist["Open"],
-                high=hist["High"],
-                low=hist["Low"],
-                close=hist["Close"],
-                name=ticker,
-            )
-        ]
-    )
-    fig_candle.update_layout(
-        title=f"{ticker.upper()} Candlestick Chart",
-        xaxis_title="Date",
-        yaxis_title="Price",
+    fig_candle = figures.get(
+        (*chart_key, "candle"),
+        version,
+        lambda: candlestick_figure(hist, f"{ticker.upper()} Candlestick Chart", max_points),
     )
     st.plotly_chart(fig_candle, use_container_width=True, key=f"{ticker}-candle")
 
     # --- Volume Chart ---
     st.subheader("Volume (Selected Range)")
-    fig2 = px.bar(hist, x=hist.index, y="Volume", title=f"{ticker.upper()} Volume")
+    fig2 = figures.get(
+        (*chart_key, "volume"),
+        version,
+        lambda: volume_figure(hist, f"{ticker.upper()} Volume", max_points),
+    )
     st.plotly_chart(fig2, use_container_width=True, key=f"{ticker}-volume")
 
     # --- Company Description ---
     st.subheader("Company Description")
-    st.write(info.get("longBusinessSummary", "No description available."))
-
-    # --- Price Alerts ---
-    st.sidebar.markdown("---")
-    st.sidebar.header("Price Alerts")
-    alert_price = st.sidebar.number_input(
-        f"Alert if {ticker.upper()} crosses:",
-        min_value=0.0,
-        value=float(info.get("currentPrice", 0) or 0),
-        key=f"alert-{ticker}",
-    )
-    if info.get("currentPrice"):
-        if info["currentPrice"] >= alert_price > 0:
-            st.warning(
-                f"ALERT: {ticker.upper()} has reached or exceeded ${alert_price}!"
+    if "longBusinessSummary" not in info and metadata.pending(ticker):
+        st.write("Loading description...")
+    else:
+        st.write(info.get("longBusinessSummary", "No description available."))
+
+# --- Price Alerts ---
+# Rules are stored and checked server-side by the alert worker (and by the
+# live stream's ticks), so they keep working after the page is closed.
+st.sidebar.markdown("---")
+st.sidebar.header("Price Alerts")
+with st.sidebar.form("new-alert"):
+    alert_ticker = st.selectbox("Ticker", tickers)
+    alert_kind = st.selectbox("Alert when", list(KINDS), format_func=KINDS.get)
+    alert_value = st.number_input("Price, or % move", min_value=0.0, value=0.0)
+    fast_col, slow_col = st.columns(2)
+    alert_fast = fast_col.number_input("Fast SMA", min_value=1, value=10)
+    alert_slow = slow_col.number_input("Slow SMA", min_value=2, value=30)
+    alert_repeat = st.checkbox("Keep alerting after it fires")
+    if st.form_submit_button("Add Alert"):
+        try:
+            alerts.add_rule(
+                alert_ticker,
+                alert_kind,
+                value=alert_value,
+                fast=alert_fast,
+                slow=alert_slow,
+                repeat=alert_repeat,
             )
+        except ValueError as e:
+            st.error(str(e))
+rules = alerts.rules()
+rules = rules[rules["ticker"].isin(tickers)]
+for _, rule in rules.iterrows():
+    if rule["kind"] == "sma_cross":
+        condition = f"SMA {rule['fast']:.0f}/{rule['slow']:.0f} crossover"
+    elif rule["kind"] == "percent_move":
+        condition = f"moves {rule['value']:g}% from ${rule['reference']:,.2f}"
+    else:
+        condition = f"{KINDS[rule['kind']].lower()} ${rule['value']:,.2f}"
+    text_col, remove_col = st.sidebar.columns([4, 1])
+    text_col.caption(f"{rule['ticker']} {condition}{' (repeats)' if rule['repeat'] else ''}")
+    if remove_col.button("✕", key=f"remove-alert-{rule['id']}"):
+        alerts.remove_rule(rule["id"])
+        st.rerun()
+
+# --- Ticker Info Cache Stats ---
+cache_stats = metadata.stats()
+st.sidebar.markdown("---")
+st.sidebar.caption(
+    f"Ticker info cache: {cache_stats['hits']} hits, {cache_stats['stale']} stale, "
+    f"{cache_stats['misses']} misses, {cache_stats['fetches']} fetches"
+)
+st.sidebar.caption(f"Figure cache: {figures.hits} hits, {figures.misses} builds")
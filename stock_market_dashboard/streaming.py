@@ -0,0 +1,203 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from indicators import IndicatorEngine
+from market_calendar import session_date
+
+
+class RingBuffer:
+    # The last capacity (time, price) ticks for one ticker in two fixed
+    # numpy arrays; once full, each new tick overwrites the oldest.
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.times = np.zeros(capacity)
+        self.prices = np.zeros(capacity)
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, when, price):
+        slot = self.count % self.capacity
+        self.times[slot] = when
+        self.prices[slot] = price
+        self.count += 1
+
+    def last(self):
+        if not self.count:
+            return None
+        slot = (self.count - 1) % self.capacity
+        return self.times[slot], self.prices[slot]
+
+    def values(self):
+        # (times, prices), oldest first.
+        if self.count <= self.capacity:
+            return self.times[: self.count].copy(), self.prices[: self.count].copy()
+        start = self.count % self.capacity
+        order = np.r_[start : self.capacity, 0:start]
+        return self.times[order], self.prices[order]
+
+
+class ReplayProvider:
+    # Plays back recorded ticks (time, ticker, price) as if they were live
+    # quotes: each quote(ticker) returns that ticker's next tick, and the
+    # last one again once they run out. Lets the streaming mode run and be
+    # tested offline; QuoteStream.save_ticks() records the input.
+    name = "replay"
+
+    def __init__(self, ticks):
+        ticks = pd.DataFrame(ticks, columns=["time", "ticker", "price"]).sort_values("time", kind="stable")
+        self._ticks = {
+            ticker: list(zip(group["time"], group["price"])) for ticker, group in ticks.groupby("ticker")
+        }
+        self._cursor = dict.fromkeys(self._ticks, 0)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_csv(cls, path):
+        return cls(pd.read_csv(path))
+
+    def exhausted(self):
+        with self._lock:
+            return all(self._cursor[ticker] >= len(ticks) for ticker, ticks in self._ticks.items())
+
+    def quote(self, ticker):
+        self.calls.append(("quote", ticker))
+        with self._lock:
+            ticks = self._ticks.get(ticker)
+            if not ticks:
+                raise KeyError(f"No recorded ticks for {ticker}")
+            position = min(self._cursor[ticker], len(ticks) - 1)
+            self._cursor[ticker] += 1
+        when, price = ticks[position]
+        return {"currentPrice": price, "time": when}
+
+
+class QuoteStream:
+    # Live quotes for a set of tickers on top of their stored history. A
+    # background asyncio task polls provider.quote() for every ticker each
+    # interval seconds (concurrently, on worker threads) and feeds each new
+    # price into a per-ticker ring buffer, the IndicatorEngine (as the bar
+    # for the quote's exchange session, so indicators move with the live
+    # price without recomputing history) and the listeners. A quote with
+    # the same price as the last one is not a new tick.
+    def __init__(self, provider, closes, interval=5.0, capacity=4096, clock=time.time):
+        self.provider = provider
+        self.interval = interval
+        self.clock = clock
+        self.tickers = list(closes.columns)
+        self.engine = IndicatorEngine(closes)
+        self.previous_close = self.engine.latest(self.engine.bars)
+        self.buffers = {ticker: RingBuffer(capacity) for ticker in self.tickers}
+        # Called with (ticker, time, price) for every new tick.
+        self.listeners = []
+        self.errors = {}
+        self.polls = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- Updates ---
+
+    def update(self, ticker, when, price):
+        # Applies one tick. Returns False for a repeat of the last price.
+        with self._lock:
+            buffer = self.buffers[ticker]
+            last = buffer.last()
+            if last is not None and (last[1] == price or when < last[0]):
+                return False
+            buffer.append(when, price)
+            # The tick is the close of its exchange session's bar. Outside a
+            # session (a weekend, holiday or pre-open quote) it revises the
+            # last bar rather than adding one; a tick for a session older
+            # than the newest bar can't become a bar of its own.
+            date = session_date(ticker, when)
+            if date is None or date == self.engine.last_date(ticker):
+                self.engine.update_last({ticker: price})
+            elif not len(self.engine.index) or date >= self.engine.index[-1]:
+                self.engine.append(date, {ticker: price})
+            for listener in self.listeners:
+                listener(ticker, when, price)
+            return True
+
+    async def _quote(self, ticker):
+        return await asyncio.to_thread(self.provider.quote, ticker)
+
+    async def poll_once(self):
+        # One round of quotes for every ticker. Returns how many were new.
+        results = await asyncio.gather(*(self._quote(t) for t in self.tickers), return_exceptions=True)
+        now = self.clock()
+        ticks = []
+        for ticker, result in zip(self.tickers, results):
+            if isinstance(result, Exception):
+                self.errors[ticker] = result
+                continue
+            self.errors.pop(ticker, None)
+            price = result.get("currentPrice")
+            if price is not None:
+                ticks.append((result.get("time", now), ticker, float(price)))
+        self.polls += 1
+        return sum(self.update(ticker, when, price) for when, ticker, price in sorted(ticks))
+
+    async def run(self, polls=None):
+        # Polls every interval seconds until stop() (or for a fixed number
+        # of polls).
+        count = 0
+        while not self._stop.is_set() and (polls is None or count < polls):
+            await self.poll_once()
+            count += 1
+            await asyncio.to_thread(self._stop.wait, self.interval)
+
+    def start(self):
+        # Runs the polling task on its own event loop in a daemon thread.
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=asyncio.run, args=(self.run(),), daemon=True, name="quote-stream"
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # --- Reading ---
+
+    def snapshot(self, fast=10, slow=30, period=14):
+        # One row per ticker: latest price and time, change since the last
+        # stored close, tick count and the live indicator readings.
+        with self._lock:
+            screen = self.engine.screen(fast, slow, period)
+            rows = {}
+            for ticker in self.tickers:
+                last = self.buffers[ticker].last()
+                rows[ticker] = {
+                    "Updated": pd.Timestamp(last[0], unit="s") if last else pd.NaT,
+                    "Ticks": self.buffers[ticker].count,
+                }
+        table = pd.DataFrame.from_dict(rows, orient="index")
+        table.insert(0, "Price", screen["Close"])
+        table.insert(1, "Change %", (screen["Close"] / self.previous_close - 1) * 100)
+        return table.join(screen.drop(columns="Close"))
+
+    def ticks(self, ticker):
+        # A ticker's buffered ticks as a price Series indexed by time.
+        with self._lock:
+            times, prices = self.buffers[ticker].values()
+        return pd.Series(prices, index=pd.to_datetime(times, unit="s"), name=ticker)
+
+    def save_ticks(self, path):
+        # Writes every buffered tick as (time, ticker, price) for a ReplayProvider.
+        frames = []
+        with self._lock:
+            for ticker, buffer in self.buffers.items():
+                times, prices = buffer.values()
+                frames.append(pd.DataFrame({"time": times, "ticker": ticker, "price": prices}))
+        pd.concat(frames).sort_values("time", kind="stable").to_csv(path, index=False)
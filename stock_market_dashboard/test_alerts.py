@@ -0,0 +1,144 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from alerts import AlertEngine, AlertStore, AlertWorker, LevelIndex
+from streaming import ReplayProvider
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = AlertStore(tmp_path / "alerts.sqlite")
+    yield store
+    store.close()
+
+
+def test_level_index_finds_levels_passed():
+    index = LevelIndex()
+    for rule_id, level in enumerate([90.0, 100.0, 100.0, 110.0, 120.0]):
+        index.add(level, rule_id)
+    assert index.rising(100.0, 115.0) == [(110.0, 3)]
+    assert index.rising(95.0, 100.0) == [(100.0, 1), (100.0, 2)]
+    assert index.falling(110.0, 100.0) == [(100.0, 1), (100.0, 2)]
+    assert index.falling(100.0, 80.0) == [(90.0, 0)]
+    index.remove(100.0, 1)
+    assert index.rising(95.0, 125.0) == [(100.0, 2), (110.0, 3), (120.0, 4)]
+
+
+def test_price_rules_fire_once_and_persist(store):
+    engine = AlertEngine(store, clock=lambda: 0.0)
+    up = engine.add_rule("AAPL", "cross_up", 105.0)
+    down = engine.add_rule("AAPL", "cross_down", 95.0, repeat=True)
+    engine.add_rule("MSFT", "cross_up", 50.0)
+
+    assert engine.on_quote("AAPL", 1.0, 100.0) == []
+    fired = engine.on_quote("AAPL", 2.0, 106.0)
+    assert [alert["rule_id"] for alert in fired] == [up]
+    assert fired[0]["message"] == "AAPL rose above $105.00 (now $106.00)"
+    # One-shot: crossing again does nothing.
+    engine.on_quote("AAPL", 3.0, 100.0)
+    assert engine.on_quote("AAPL", 4.0, 107.0) == []
+    # Repeating: fires on every crossing down.
+    assert len(engine.on_quote("AAPL", 5.0, 94.0)) == 1
+    engine.on_quote("AAPL", 6.0, 96.0)
+    assert len(engine.on_quote("AAPL", 7.0, 90.0)) == 1
+    # A quote older than the last one is ignored.
+    assert engine.on_quote("AAPL", 6.5, 200.0) == []
+
+    assert len(store.triggered()) == 3
+    assert store.triggered().iloc[0]["time"] == pd.Timestamp(7.0, unit="s")
+    # A fresh engine on the same store watches only what is still active.
+    reloaded = AlertEngine(store)
+    assert sorted(reloaded.rules()["id"]) == [down, up + 2]
+    assert reloaded.tickers() == ["AAPL", "MSFT"]
+
+
+def test_percent_move_from_last_quote(store):
+    engine = AlertEngine(store)
+    with pytest.raises(ValueError):
+        engine.add_rule("NVDA", "percent_move", 5)
+    engine.on_quote("NVDA", 1.0, 200.0)
+    engine.add_rule("NVDA", "percent_move", 5)
+    assert engine.on_quote("NVDA", 2.0, 209.0) == []
+    fired = engine.on_quote("NVDA", 3.0, 189.0)
+    assert fired[0]["message"] == "NVDA fell below $190.00 (now $189.00)"
+    # Both levels belonged to one rule, now switched off.
+    assert engine.on_quote("NVDA", 4.0, 250.0) == []
+    with pytest.raises(ValueError):
+        engine.add_rule("NVDA", "sma_cross", fast=30, slow=10)
+
+
+def test_sma_crossover_uses_history_and_live_price(store):
+    # Ten flat days at 100, then the fast SMA is dragged up by live quotes.
+    days = pd.date_range("2024-03-01", periods=10)
+    history = pd.Series([100.0] * 5 + [99.0] * 5, index=days)
+    engine = AlertEngine(store, history=lambda ticker: history)
+    rule = engine.add_rule("AAPL", "sma_cross", fast=3, slow=10)
+
+    next_day = pd.Timestamp("2024-03-11 15:00").timestamp()
+    assert engine.on_quote("AAPL", next_day, 99.5) == []
+    fired = engine.on_quote("AAPL", next_day + 60, 104.0)
+    assert [alert["rule_id"] for alert in fired] == [rule]
+    assert fired[0]["message"] == "AAPL SMA 3 crossed above SMA 10 (now $104.00)"
+
+
+def test_sma_closes_follow_exchange_sessions(store):
+    # Closes through Friday 2024-03-08; quotes on Saturday and before
+    # Monday's open revise Friday's close instead of adding days.
+    days = pd.bdate_range("2024-02-26", "2024-03-08")
+    engine = AlertEngine(store, history=lambda ticker: pd.Series(100.0, index=days))
+    engine.add_rule("AAPL", "sma_cross", fast=3, slow=10)
+
+    engine.on_quote("AAPL", pd.Timestamp("2024-03-09 15:00").timestamp(), 101.0)
+    engine.on_quote("AAPL", pd.Timestamp("2024-03-11 12:00").timestamp(), 102.0)
+    dates, closes = engine._recent_closes("AAPL")
+    assert dates[-1] == pd.Timestamp("2024-03-08") and closes[-1] == 102.0
+    assert len(dates) == 10
+
+    engine.on_quote("AAPL", pd.Timestamp("2024-03-11 15:00").timestamp(), 103.0)
+    assert dates[-1] == pd.Timestamp("2024-03-11") and closes[-2:] == [102.0, 103.0]
+
+
+def test_worker_polls_tickers_with_rules(store):
+    ticks = [(t, "AAPL", price) for t, price in enumerate([100.0, 103.0, 108.0, 101.0])]
+    ticks += [(t, "MSFT", 50.0) for t in range(4)]
+    engine = AlertEngine(store)
+    engine.add_rule("AAPL", "cross_up", 105.0)
+    engine.add_rule("AAPL", "cross_down", 102.0)
+    provider = ReplayProvider(ticks)
+    worker = AlertWorker(engine, provider, interval=0)
+    asyncio.run(worker.run(polls=4))
+    assert worker.polls == 4
+    # MSFT has no rules, so it is never quoted.
+    assert {ticker for _, ticker in provider.calls} == {"AAPL"}
+    assert list(store.triggered()["message"]) == [
+        "AAPL fell below $102.00 (now $101.00)",
+        "AAPL rose above $105.00 (now $108.00)",
+    ]
+
+
+
+def test_worker_survives_failing_tickers(store):
+    # AAPL's SMA rule needs a history that cannot be fetched; MSFT's alerts
+    # still fire, and AAPL's error is kept until a poll goes through.
+    failing = {"AAPL"}
+
+    def history(ticker):
+        if ticker in failing:
+            raise ConnectionError(f"no history for {ticker}")
+        return pd.Series(dtype=float)
+
+    AlertEngine(store).add_rule("AAPL", "sma_cross", fast=2, slow=3)
+    engine = AlertEngine(store, history=history)
+    engine.add_rule("MSFT", "cross_up", 101.5)
+    ticks = [(t, ticker, 100.0 + t) for t in range(4) for ticker in ("AAPL", "MSFT")]
+    worker = AlertWorker(engine, ReplayProvider(ticks), interval=0)
+    asyncio.run(worker.run(polls=3))
+    assert worker.polls == 3
+    assert isinstance(worker.errors["AAPL"], ConnectionError)
+    assert list(store.triggered()["message"]) == ["MSFT rose above $101.50 (now $102.00)"]
+
+    failing.clear()
+    asyncio.run(worker.run(polls=1))
+    assert worker.errors == {}
@@ -0,0 +1,77 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest
+from backtest import Backtester, best_pairs, run_grid, window_grid
+from data_providers import StubProvider
+from market_calendar import bars_per_year
+from market_data import build_panel
+
+START = datetime.date(2022, 1, 1)
+END = datetime.date(2024, 6, 30)
+TICKERS = ["AAPL", "BTC-USD", "MSFT"]
+
+
+@pytest.fixture(scope="module")
+def closes():
+    provider = StubProvider()
+    histories = {ticker: provider.history(ticker, START, END) for ticker in TICKERS}
+    histories["MSFT"] = histories["MSFT"].loc["2023-03-01":]
+    return build_panel(histories, TICKERS)["Close"]
+
+
+def reference(close, fast, slow, allow_short=False, periods_per_year=252):
+    # The rule written out for a single ticker with pandas.
+    diff = close.rolling(fast).mean() - close.rolling(slow).mean()
+    signal = np.sign(diff.fillna(0))
+    if not allow_short:
+        signal = signal.clip(lower=0)
+    held = signal.shift(1).fillna(0)
+    strategy = held * close.pct_change().fillna(0)
+    equity = (1 + strategy).cumprod()
+    returns = strategy.iloc[1:]
+    return {
+        "total_return": equity.iloc[-1] - 1,
+        "sharpe": returns.mean() / returns.std(ddof=0) * np.sqrt(periods_per_year),
+        "max_drawdown": (equity / equity.cummax() - 1).min(),
+        "trades": int(((held != 0) & (held != held.shift(1))).sum()),
+    }
+
+
+@pytest.mark.parametrize("allow_short", [False, True])
+def test_matches_per_ticker_reference(closes, allow_short):
+    results = run_grid(closes, [(10, 30), (5, 50)], workers=1, allow_short=allow_short)
+    assert len(results) == 6
+    for row in results.itertuples():
+        expected = reference(closes[row.ticker].dropna(), row.fast, row.slow, allow_short, bars_per_year(row.ticker))
+        assert row.total_return == pytest.approx(expected["total_return"], rel=1e-9)
+        assert row.sharpe == pytest.approx(expected["sharpe"], rel=1e-6)
+        assert row.max_drawdown == pytest.approx(expected["max_drawdown"], rel=1e-9)
+        assert row.trades == expected["trades"]
+
+
+def test_trade_list_compounds_to_total_return(closes):
+    tester = Backtester(closes)
+    total = tester.run(10, 30)["total_return"]
+    for col, ticker in enumerate(TICKERS):
+        trades = tester.trades(ticker, 10, 30)
+        assert len(trades) == tester.run(10, 30)["trades"][col]
+        assert (trades["Entry Date"] < trades["Exit Date"]).all()
+        assert trades["Open"].sum() <= 1
+        assert (1 + trades["Return"]).prod() - 1 == pytest.approx(total[col], rel=1e-9)
+
+
+def test_process_pool_matches_in_process(closes, monkeypatch):
+    pairs = window_grid(range(2, 20, 3), range(10, 60, 10))
+    inline = run_grid(closes, pairs, workers=1)
+    monkeypatch.setattr(backtest, "MIN_PARALLEL_PAIRS", 0)
+    pooled = run_grid(closes, pairs, workers=2)
+    pd.testing.assert_frame_equal(pooled, inline)
+
+    best = best_pairs(inline)
+    assert list(best.index) == sorted(TICKERS)
+    for ticker, row in best.iterrows():
+        assert row["sharpe"] == inline[inline["ticker"] == ticker]["sharpe"].max()
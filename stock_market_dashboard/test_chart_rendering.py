@@ -0,0 +1,112 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+from chart_rendering import (
+    FigureCache,
+    candlestick_figure,
+    data_version,
+    downsample,
+    line_figure,
+    lttb,
+    resample_ohlc,
+    volume_figure,
+)
+from data_providers import StubProvider
+
+
+@pytest.fixture(scope="module")
+def hist():
+    return StubProvider().history("AAPL", datetime.date(2014, 1, 1), datetime.date(2023, 12, 31))
+
+
+def reference_lttb(x, y, threshold):
+    # The algorithm as usually published, one point at a time.
+    n = len(x)
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n) if i < threshold - 3 else n
+        next_start = end if i < threshold - 3 else n - 1
+        avg_x = sum(x[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(y[next_start:next_end]) / (next_end - next_start)
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    return selected + [n - 1]
+
+
+def test_lttb_matches_reference():
+    rng = np.random.default_rng(1)
+    x = np.arange(1000.0)
+    y = np.cumsum(rng.normal(size=1000))
+    for threshold in (3, 10, 97, 500):
+        assert list(lttb(x, y, threshold)) == reference_lttb(list(x), list(y), threshold)
+    assert list(lttb(x, y, 2000)) == list(range(1000))
+
+
+def test_downsample_keeps_ends_and_extremes(hist):
+    close = hist["Close"]
+    small = downsample(close, 500)
+    assert len(small) == 500
+    assert small.index[0] == close.index[0] and small.index[-1] == close.index[-1]
+    assert close.idxmax() in small.index and close.idxmin() in small.index
+
+
+def test_resample_ohlc_rolls_up_weeks(hist):
+    week = hist.loc["2023-06-05":"2023-06-09"]
+    bars = resample_ohlc(hist, "W-FRI")
+    bar = bars.loc["2023-06-09"]
+    assert bar["Open"] == week["Open"].iloc[0]
+    assert bar["High"] == week["High"].max()
+    assert bar["Low"] == week["Low"].min()
+    assert bar["Close"] == week["Close"].iloc[-1]
+    assert bar["Volume"] == week["Volume"].sum()
+    # Bars are labelled with their last trading day, never a future date.
+    assert bars.index[-1] == hist.index[-1]
+    assert bars.index.isin(hist.index).all()
+
+
+def test_figures_fit_the_point_budget(hist):
+    # Ten years of daily bars: weekly candles for a medium budget, monthly
+    # for a low one, and every bar when drawing in full.
+    assert "Weekly" in candlestick_figure(hist, "AAPL", 8000).layout.title.text
+    assert "Monthly" in volume_figure(hist, "AAPL", 1500).layout.title.text
+    assert len(candlestick_figure(hist, "AAPL", None).data[0].x) == len(hist)
+
+    frame = hist[["Close"]]
+    assert isinstance(line_figure(frame, "AAPL", 1500).data[0], go.Scatter)
+    assert len(line_figure(frame, "AAPL", 1500).data[0].x) == 1500
+    full = line_figure(frame, "AAPL", None).data[0]
+    assert isinstance(full, go.Scattergl) and len(full.x) == len(hist)
+
+
+def test_figure_cache_rebuilds_when_data_changes(hist):
+    cache = FigureCache(capacity=2)
+    builds = []
+
+    def build(data):
+        return lambda: builds.append(len(data)) or len(data)
+
+    older = hist.iloc[:-1]
+    assert cache.get(("AAPL", "line"), data_version(older), build(older)) == len(older)
+    assert cache.get(("AAPL", "line"), data_version(older), build(older)) == len(older)
+    assert cache.get(("AAPL", "line"), data_version(hist), build(hist)) == len(hist)
+    assert builds == [len(older), len(hist)]
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    cache.get(("MSFT", "line"), (0,), build(older))
+    cache.get(("NVDA", "line"), (0,), build(older))
+    # Capacity 2: the least recently used AAPL figure is gone.
+    cache.get(("AAPL", "line"), data_version(hist), build(hist))
+    assert builds[-1] == len(hist) and cache.misses == 5
@@ -0,0 +1,117 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_providers import StubProvider
+from indicators import IndicatorEngine, ema_columns
+from market_data import build_panel
+
+START = datetime.date(2023, 1, 1)
+END = datetime.date(2024, 6, 30)
+TICKERS = ["AAPL", "BTC-USD", "MSFT", "ETH-USD"]
+
+
+@pytest.fixture(scope="module")
+def closes():
+    provider = StubProvider()
+    histories = {ticker: provider.history(ticker, START, END) for ticker in TICKERS}
+    # A ticker that only starts trading partway through the range.
+    histories["MSFT"] = histories["MSFT"].loc["2024-02-01":]
+    return build_panel(histories, TICKERS)["Close"]
+
+
+def assert_matches(frame, expected, ticker):
+    got = frame[ticker].dropna()
+    expected = expected.dropna()
+    assert got.index.equals(expected.index)
+    np.testing.assert_allclose(got, expected, rtol=1e-9)
+
+
+@pytest.mark.parametrize("ticker", TICKERS)
+def test_matches_per_ticker_pandas(closes, ticker):
+    engine = IndicatorEngine(closes)
+    close = closes[ticker].dropna()
+    assert_matches(engine.sma(10), close.rolling(10).mean(), ticker)
+    assert_matches(engine.ema(20), close.ewm(span=20, adjust=False).mean(), ticker)
+
+    middle, upper, lower = engine.bollinger(20, 2.0)
+    std = close.rolling(20).std(ddof=0)
+    assert_matches(upper, close.rolling(20).mean() + 2 * std, ticker)
+    assert_matches(lower, close.rolling(20).mean() - 2 * std, ticker)
+
+    change = close.diff()
+    gain = change.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    loss = (-change).clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    assert_matches(engine.rsi(14), 100 - 100 / (1 + gain / loss), ticker)
+
+    line = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    macd, signal, histogram = engine.macd(12, 26, 9)
+    assert_matches(macd, line, ticker)
+    assert_matches(histogram, line - line.ewm(span=9, adjust=False).mean(), ticker)
+
+
+@pytest.mark.parametrize("ticker", TICKERS)
+def test_crossover_matches_dashboard_signals(closes, ticker):
+    # The per-ticker logic the dashboard used before.
+    df = pd.DataFrame({"Close": closes[ticker].dropna()})
+    df["SMA10"] = df["Close"].rolling(window=10).mean()
+    df["SMA30"] = df["Close"].rolling(window=30).mean()
+    df["Signal"] = 0
+    df.loc[df["SMA10"] > df["SMA30"], "Signal"] = 1
+    df.loc[df["SMA10"] < df["SMA30"], "Signal"] = -1
+    df["Trade"] = df["Signal"].diff()
+
+    signal, trade = IndicatorEngine(closes).crossover(10, 30)
+    assert signal[ticker].dropna().equals(df["Signal"].astype(float))
+    assert trade[ticker].dropna().equals(df["Trade"].dropna())
+
+
+def test_append_matches_full_recompute(closes):
+    engine = IndicatorEngine(closes.iloc[:-40], capacity=16)
+    engine.sma(10)
+    engine.rsi(14)
+    engine.macd()
+    engine.bollinger()
+    for date, row in closes.iloc[-40:].iterrows():
+        engine.append(date, row.dropna().to_dict())
+    # An intraday update: a second bar for the same date replaces the first.
+    engine.append(closes.index[-1], {"BTC-USD": 1.0})
+    engine.append(closes.index[-1], closes.iloc[-1].dropna().to_dict())
+
+    full = IndicatorEngine(closes)
+    assert engine.index.equals(full.index)
+    pd.testing.assert_frame_equal(engine.sma(10), full.sma(10), rtol=1e-9)
+    pd.testing.assert_frame_equal(engine.rsi(14), full.rsi(14), rtol=1e-9)
+    pd.testing.assert_frame_equal(engine.macd()[2], full.macd()[2], rtol=1e-9)
+    pd.testing.assert_frame_equal(engine.bollinger()[1], full.bollinger()[1], rtol=1e-9)
+    pd.testing.assert_series_equal(
+        engine.latest(engine.rsi_bars(14)), full.latest(full.rsi_bars(14)), rtol=1e-9
+    )
+
+    with pytest.raises(ValueError):
+        engine.append(closes.index[0], {"AAPL": 1.0})
+
+
+def test_ema_columns_long_series_stays_finite():
+    # Far more rows than one unrolled block covers.
+    x = np.linspace(1.0, 2.0, 20_000)[:, None]
+    expected = pd.Series(x[:, 0]).ewm(alpha=0.5, adjust=False).mean()
+    np.testing.assert_allclose(ema_columns(x, 0.5)[:, 0], expected, rtol=1e-9)
+
+
+def test_screen_reads_each_tickers_last_bar(closes):
+    engine = IndicatorEngine(closes)
+    table = engine.screen()
+    assert list(table.index) == TICKERS
+    # MSFT's last bar is a Friday; BTC-USD trades through the weekend.
+    assert table.loc["MSFT", "Close"] == closes["MSFT"].dropna().iloc[-1]
+    assert table.loc["BTC-USD", "RSI 14"] == pytest.approx(engine.rsi(14)["BTC-USD"].iloc[-1])
+    middle, upper, lower = engine.bollinger(20)
+    last = closes["AAPL"].last_valid_index()
+    expected = (closes.loc[last, "AAPL"] - lower.loc[last, "AAPL"]) / (
+        upper.loc[last, "AAPL"] - lower.loc[last, "AAPL"]
+    )
+    assert table.loc["AAPL", "Bollinger %B"] == pytest.approx(expected)
+    assert table.loc["AAPL", "SMA 10/30"] == engine.crossover()[0].loc[last, "AAPL"]
@@ -0,0 +1,50 @@
+import datetime
+
+from data_providers import StubProvider
+from market_data import MarketData, ticker_history
+from price_cache import PriceCache
+
+START = datetime.date(2024, 1, 1)
+END = datetime.date(2024, 3, 31)
+
+
+def market(tmp_path, **provider_options):
+    provider = StubProvider(**provider_options)
+    return MarketData(PriceCache(provider, tmp_path / "prices.sqlite"), backoff=0.001), provider
+
+
+def test_one_batched_request_and_aligned_panel(tmp_path):
+    data, provider = market(tmp_path)
+    panel, errors = data.panel(["AAPL", "BTC-USD", "MSFT"], START, END)
+    assert errors == {}
+    assert provider.calls == [(("AAPL", "BTC-USD", "MSFT"), START, END)]
+    assert list(panel["Close"].columns) == ["AAPL", "BTC-USD", "MSFT"]
+    # Crypto trades every day, so the panel has weekend rows where the
+    # stocks are empty; a single ticker's history drops them again.
+    assert len(panel) == 91
+    assert len(ticker_history(panel, "AAPL")) == 65
+    assert ticker_history(panel, "AAPL").equals(data.cache.stored("AAPL", START, END))
+
+    # Everything is stored now, so the next panel makes no requests.
+    data.panel(["AAPL", "MSFT"], START, END)
+    assert len(provider.calls) == 1
+
+
+def test_failed_tickers_are_retried_one_at_a_time(tmp_path):
+    data, provider = market(tmp_path, failures={"MSFT": 2, "NVDA": 10})
+    panel, errors = data.panel(["AAPL", "MSFT", "NVDA"], START, END)
+    assert list(errors) == ["NVDA"]
+    assert list(panel["Close"].columns) == ["AAPL", "MSFT"]
+    # The batch, then the MSFT retry that succeeds after one more failure,
+    # then NVDA giving up after the first try and three retries.
+    assert provider.calls.count(("MSFT", START, END)) == 2
+    assert provider.calls.count(("NVDA", START, END)) == 4
+
+
+def test_pool_without_batching(tmp_path):
+    data, provider = market(tmp_path)
+    data.batch = False
+    panel, errors = data.panel(["AAPL", "MSFT"], START, END)
+    assert errors == {}
+    assert sorted(provider.calls) == [("AAPL", START, END), ("MSFT", START, END)]
+    assert ticker_history(panel, "GOOGL").empty
@@ -0,0 +1,74 @@
+from concurrent.futures import wait
+
+from data_providers import StubProvider
+from metadata_cache import DAY, MetadataCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_fields_expire_on_their_own_ttls():
+    provider = StubProvider()
+    clock = Clock()
+    cache = MetadataCache(provider, clock=clock)
+
+    # Nothing is stored yet: get() returns at once and fetches in the background.
+    assert cache.get("AAPL") == {}
+    assert cache.stats()["misses"] == 5
+    wait(cache.refresh(["AAPL"]))
+
+    info = cache.get("AAPL")
+    assert set(info) == {"currentPrice", "open", "dayHigh", "dayLow", "longBusinessSummary"}
+    assert cache.stats()["hits"] == 5
+
+    # A minute later only the quote is stale, so only quote() is called.
+    clock.now = 60
+    calls = len(provider.calls)
+    wait(cache.refresh(["AAPL"]))
+    assert provider.calls[calls:] == [("quote", "AAPL")]
+    assert cache.get("AAPL", ["longBusinessSummary"]) == {"longBusinessSummary": info["longBusinessSummary"]}
+
+    # After a few days the summary is refetched as well.
+    clock.now = 4 * DAY
+    calls = len(provider.calls)
+    wait(cache.refresh(["AAPL", "MSFT"]))
+    assert sorted(provider.calls[calls:]) == [("info", "AAPL"), ("info", "MSFT"), ("quote", "AAPL"), ("quote", "MSFT")]
+    cache.close()
+
+
+def test_failed_fetch_is_counted_and_retried():
+    provider = StubProvider(failures={"AAPL": 2})
+    cache = MetadataCache(provider)
+    wait(cache.refresh(["AAPL"]))
+    assert cache.stats()["errors"] == 2
+    wait(cache.refresh(["AAPL"]))
+    assert "currentPrice" in cache.get("AAPL")
+    cache.close()
+
+
+def test_fields_the_provider_lacks_are_not_refetched():
+    # Yahoo has no summary for many funds and coins; once info() has been
+    # asked, the missing field keeps for its TTL like a value.
+    class NoSummary(StubProvider):
+        def info(self, ticker):
+            values = super().info(ticker)
+            values.pop("longBusinessSummary", None)
+            return values
+
+    provider = NoSummary()
+    clock = Clock()
+    cache = MetadataCache(provider, clock=clock)
+    wait(cache.refresh(["SPY"]))
+    assert "longBusinessSummary" not in cache.get("SPY")
+    assert cache.refresh(["SPY"]) == []
+    assert provider.calls.count(("info", "SPY")) == 1
+
+    clock.now = 4 * DAY
+    wait(cache.refresh(["SPY"]))
+    assert provider.calls.count(("info", "SPY")) == 2
+    cache.close()
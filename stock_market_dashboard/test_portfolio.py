@@ -0,0 +1,156 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_providers import StubProvider
+from market_data import MarketData
+from portfolio import PortfolioAnalytics, frontier_weights, max_sharpe_weights, pairwise_moments
+from price_cache import PriceCache
+
+START = datetime.date(2023, 1, 1)
+END = datetime.date(2024, 6, 30)
+TICKERS = ["AAPL", "MSFT", "BTC-USD", "SPY"]
+
+
+@pytest.fixture
+def analytics(tmp_path):
+    cache = PriceCache(StubProvider(), path=tmp_path / "prices.sqlite")
+    yield PortfolioAnalytics(MarketData(cache))
+    cache.close()
+
+
+def test_pairwise_moments_match_pandas_with_gaps():
+    rng = np.random.default_rng(3)
+    returns = pd.DataFrame(rng.normal(0, 0.01, (120, 4)), columns=list("abcd"))
+    returns.iloc[:40, 1] = np.nan
+    returns.iloc[::7, 2] = np.nan
+    count, covariance, correlation = pairwise_moments(returns.to_numpy())
+    np.testing.assert_allclose(covariance, returns.cov().to_numpy(), atol=1e-15)
+    np.testing.assert_allclose(correlation, returns.corr().to_numpy(), atol=1e-12)
+    assert count[0, 1] == 80
+
+
+def test_closes_are_read_as_one_aligned_matrix(analytics):
+    analytics.market.download(TICKERS, START, END)
+    closes = analytics.market.cache.closes(TICKERS, START, END)
+    assert list(closes.columns) == TICKERS
+    for ticker in TICKERS:
+        stored = analytics.market.cache.stored(ticker, START, END)["Close"]
+        pd.testing.assert_series_equal(
+            closes[ticker].dropna(), stored, check_names=False, check_freq=False
+        )
+
+
+def test_returns_are_on_weekdays_with_weekend_moves_on_monday(analytics):
+    returns = analytics.returns(TICKERS, START, END)
+    assert (returns.index.dayofweek < 5).all()
+    closes = analytics.market.cache.closes(["BTC-USD"], START, END)["BTC-USD"]
+    monday = pd.Timestamp("2024-03-04")
+    friday = pd.Timestamp("2024-03-01")
+    assert returns.loc[monday, "BTC-USD"] == pytest.approx(closes[monday] / closes[friday] - 1)
+
+
+def test_statistics_match_pandas(analytics):
+    returns = analytics.returns(TICKERS, START, END)
+    pd.testing.assert_frame_equal(
+        analytics.correlation(TICKERS, START, END), returns.corr(), check_names=False
+    )
+    pd.testing.assert_frame_equal(
+        analytics.covariance(TICKERS, START, END), returns.cov() * 252, check_names=False
+    )
+    beta = analytics.beta(["AAPL", "MSFT"], "SPY", START, END)
+    expected = returns.cov()["SPY"] / returns["SPY"].var()
+    np.testing.assert_allclose(beta.to_numpy(), expected[["AAPL", "MSFT"]].to_numpy())
+
+    rolling = analytics.rolling_beta(["AAPL"], "SPY", START, END, window=60)
+    window = returns.iloc[-60:]
+    assert rolling["AAPL"].iloc[-1] == pytest.approx(
+        window["AAPL"].cov(window["SPY"]) / window["SPY"].var()
+    )
+    assert rolling["AAPL"].iloc[:59].isna().all()
+
+    dates, matrices = analytics.rolling_correlation(TICKERS, START, END, window=60, step=20)
+    assert dates[-1] == returns.index[-1]
+    np.testing.assert_allclose(matrices[-1], window.corr().to_numpy(), atol=1e-12)
+    assert matrices.shape == (len(dates), 4, 4)
+
+
+def test_frontier_is_efficient(analytics):
+    points = analytics.frontier(TICKERS, START, END, points=20, samples=500)
+    frontier = points[points["kind"] == "frontier"]
+    assert len(frontier) == 20 and (points["kind"] == "portfolio").sum() == 500
+    assert list(points.loc[points["kind"] == "ticker", "label"]) == TICKERS
+    # No long-only portfolio beats the frontier: at its return, the frontier
+    # has no more volatility.
+    for _, portfolio in points[points["kind"] != "frontier"].iterrows():
+        closest = np.interp(portfolio["return"], frontier["return"], frontier["volatility"])
+        if frontier["return"].min() <= portfolio["return"] <= frontier["return"].max():
+            assert closest <= portfolio["volatility"] + 1e-9
+
+    weights = analytics.weights(TICKERS, START, END)
+    np.testing.assert_allclose(weights.sum(), 1.0)
+    minimum = weights["Min Variance"].to_numpy()
+    assert np.sqrt(minimum @ analytics.covariance(TICKERS, START, END).to_numpy() @ minimum) == (
+        pytest.approx(frontier["volatility"].min())
+    )
+
+
+def test_frontier_weights_hit_their_targets():
+    rng = np.random.default_rng(1)
+    samples = rng.normal(0.001, 0.02, (250, 5))
+    mean, covariance = samples.mean(axis=0), np.cov(samples, rowvar=False)
+    weights = frontier_weights(mean, covariance, [0.0005, 0.001, 0.002])
+    np.testing.assert_allclose(weights.sum(axis=1), 1.0)
+    np.testing.assert_allclose(weights @ mean, [0.0005, 0.001, 0.002])
+
+
+def test_moving_the_window_inside_the_loaded_span_does_not_reload(analytics):
+    analytics.correlation(TICKERS, START, END)
+    first = analytics.correlation(TICKERS, START, END)
+    assert analytics.correlation(TICKERS, START, END) is first
+    analytics.beta(TICKERS, "SPY", START, END)
+    analytics.correlation(TICKERS, datetime.date(2023, 6, 1), END)
+    assert analytics.loads == 1
+    # Reaching past it loads once more, over both ranges together.
+    analytics.correlation(TICKERS, datetime.date(2022, 6, 1), END)
+    analytics.correlation(TICKERS, datetime.date(2022, 9, 1), datetime.date(2023, 9, 1))
+    assert analytics.loads == 2
+
+
+def test_results_expire_after_the_ttl(tmp_path):
+    now = [0.0]
+    cache = PriceCache(StubProvider(), path=tmp_path / "prices.sqlite")
+    analytics = PortfolioAnalytics(MarketData(cache), ttl=60, clock=lambda: now[0])
+    first = analytics.returns(TICKERS, START, END)
+    now[0] = 30
+    assert analytics.returns(TICKERS, START, END) is first
+
+    # Past the TTL results are recomputed, but an unchanged cache is not reread.
+    now[0] = 100
+    again = analytics.returns(TICKERS, START, END)
+    assert again is not first and again.equals(first)
+    assert analytics.loads == 1
+
+    # New bars in the cache show up once the TTL has passed again.
+    day = datetime.date(2024, 6, 3)
+    cache.store("AAPL", StubProvider().history("AAPL", day, day) * 2, day, day)
+    assert analytics.returns(TICKERS, START, END) is again
+    now[0] = 200
+    changed = analytics.returns(TICKERS, START, END)
+    assert analytics.loads == 2
+    assert changed.loc["2024-06-03", "AAPL"] == pytest.approx(2 * (1 + first.loc["2024-06-03", "AAPL"]) - 1)
+    cache.close()
+
+
+def test_max_sharpe_falls_back_to_min_variance(analytics):
+    # Every expected return negative: there is no tangency portfolio, and
+    # normalizing its weights would flip their sign.
+    mean, covariance = np.array([-0.1, -0.2]), np.diag([0.04, 0.09])
+    assert max_sharpe_weights(mean, covariance) is None
+    analytics._annualized_moments = lambda tickers, start, end: (mean, covariance)
+    weights = analytics.weights(["A", "B"], START, END)
+    assert list(weights.columns) == ["Min Variance", "Max Sharpe (n/a: Min Variance)"]
+    np.testing.assert_allclose(weights.iloc[:, 1], weights["Min Variance"])
+    assert max_sharpe_weights(-mean, covariance) @ -mean > 0
@@ -0,0 +1,118 @@
+import datetime
+
+from data_providers import StubProvider
+from market_calendar import had_session
+from price_cache import PriceCache, merge_spans
+
+D = datetime.date
+
+
+def test_fetches_only_missing_spans(tmp_path):
+    provider = StubProvider()
+    cache = PriceCache(provider, tmp_path / "prices.sqlite")
+
+    first = cache.history("AAPL", D(2024, 3, 1), D(2024, 3, 31))
+    assert provider.calls == [("AAPL", D(2024, 3, 1), D(2024, 3, 31))]
+    assert len(first) == 21  # business days in March 2024
+
+    # A rerun with the same range is served locally.
+    assert cache.history("AAPL", D(2024, 3, 1), D(2024, 3, 31)).equals(first)
+    assert len(provider.calls) == 1
+
+    # Widening the range fetches just the two new ends.
+    wider = cache.history("AAPL", D(2024, 2, 1), D(2024, 4, 30))
+    assert provider.calls[1:] == [
+        ("AAPL", D(2024, 2, 1), D(2024, 2, 29)),
+        ("AAPL", D(2024, 4, 1), D(2024, 4, 30)),
+    ]
+    assert wider.loc["2024-03-01":"2024-03-31"].equals(first)
+    direct = StubProvider().history("AAPL", D(2024, 2, 1), D(2024, 4, 30))
+    assert (wider["Close"].values == direct["Close"].values).all()
+    cache.close()
+
+    # The cache survives a restart.
+    provider = StubProvider()
+    cache = PriceCache(provider, tmp_path / "prices.sqlite")
+    assert len(cache.history("AAPL", D(2024, 2, 10), D(2024, 4, 10))) > 0
+    assert provider.calls == []
+    cache.close()
+
+
+def test_todays_bar_is_refetched_after_ttl(tmp_path):
+    provider = StubProvider()
+    cache = PriceCache(provider, tmp_path / "prices.sqlite", live_ttl=60)
+    today = datetime.date.today()
+    start = today - datetime.timedelta(days=10)
+    cache.history("BTC-USD", start, today)
+    assert cache.missing_spans("BTC-USD", start, today) == []
+    cache.live_ttl = -1
+    assert cache.missing_spans("BTC-USD", start, today) == [(today, today)]
+
+
+def test_empty_fetch_is_retried(tmp_path):
+    class FailingProvider(StubProvider):
+        failing = True
+
+        def history(self, ticker, start, end):
+            hist = super().history(ticker, start, end)
+            return hist.iloc[:0] if self.failing else hist
+
+    provider = FailingProvider()
+    cache = PriceCache(provider, tmp_path / "prices.sqlite")
+    assert cache.history("AAPL", D(2024, 3, 1), D(2024, 3, 31)).empty
+    assert cache.missing_spans("AAPL", D(2024, 3, 1), D(2024, 3, 31)) == [(D(2024, 3, 1), D(2024, 3, 31))]
+
+    provider.failing = False
+    assert len(cache.history("AAPL", D(2024, 3, 1), D(2024, 3, 31))) == 21
+
+    # No bars before the first stored one is an answer, not a failure.
+    provider.failing = True
+    cache.history("AAPL", D(2024, 1, 1), D(2024, 2, 29))
+    assert cache.missing_spans("AAPL", D(2024, 1, 1), D(2024, 3, 31)) == []
+    cache.close()
+
+
+def test_spans_without_a_session_are_not_fetched(tmp_path):
+    provider = StubProvider()
+    cache = PriceCache(provider, tmp_path / "prices.sqlite")
+
+    # A weekend and a holiday (Independence Day) have no bars to fetch, and
+    # stay covered on reruns.
+    for _ in range(2):
+        assert cache.history("AAPL", D(2024, 3, 2), D(2024, 3, 3)).empty
+        assert cache.history("AAPL", D(2024, 7, 4), D(2024, 7, 4)).empty
+    assert provider.calls == []
+    assert cache.missing_spans("AAPL", D(2024, 3, 2), D(2024, 3, 3)) == []
+
+    # Widening a covered weekend fetches just the days with sessions;
+    # crypto trades on weekends.
+    cache.history("AAPL", D(2024, 3, 1), D(2024, 3, 4))
+    cache.history("BTC-USD", D(2024, 3, 2), D(2024, 3, 3))
+    assert provider.calls == [
+        ("AAPL", D(2024, 3, 1), D(2024, 3, 1)),
+        ("AAPL", D(2024, 3, 4), D(2024, 3, 4)),
+        ("BTC-USD", D(2024, 3, 2), D(2024, 3, 3)),
+    ]
+    cache.close()
+
+
+def test_had_session_before_the_open():
+    # Monday 2024-03-04: 9:00 and 9:45 in New York.
+    before, after = 1709560800, 1709563500
+    monday = D(2024, 3, 4)
+    assert not had_session("AAPL", monday, monday, when=before)
+    assert had_session("AAPL", monday, monday, when=after)
+    assert had_session("BTC-USD", monday, monday, when=before)
+    assert not had_session("AAPL", D(2024, 3, 2), monday, when=before)
+
+
+def test_merge_spans():
+    spans = [
+        (D(2024, 1, 10), D(2024, 1, 20), 1.0),
+        (D(2024, 1, 1), D(2024, 1, 9), 2.0),
+        (D(2024, 2, 1), D(2024, 2, 5), 3.0),
+    ]
+    assert merge_spans(spans) == [
+        (D(2024, 1, 1), D(2024, 1, 20), 1.0),
+        (D(2024, 2, 1), D(2024, 2, 5), 3.0),
+    ]
@@ -0,0 +1,127 @@
+import asyncio
+import datetime
+import time
+
+import pandas as pd
+import pytest
+
+from data_providers import StubProvider
+from indicators import IndicatorEngine
+from market_data import build_panel
+from streaming import QuoteStream, ReplayProvider, RingBuffer
+
+START = datetime.date(2024, 1, 1)
+END = datetime.date(2024, 3, 28)
+TICKERS = ["AAPL", "BTC-USD"]
+# The next session, Monday 10:30 New York time (14:30 UTC), in epoch
+# seconds; 2024-03-29 was Good Friday.
+OPEN = pd.Timestamp("2024-04-01 14:30").timestamp()
+
+
+@pytest.fixture
+def closes():
+    provider = StubProvider()
+    return build_panel({t: provider.history(t, START, END) for t in TICKERS}, TICKERS)["Close"]
+
+
+def recorded_ticks(closes):
+    # Five polls a minute apart: AAPL rises 1% a tick, BTC-USD repeats its
+    # price once (not a new tick) and then falls.
+    last = closes.ffill().iloc[-1]
+    ticks = []
+    for i in range(5):
+        ticks.append((OPEN + 60 * i, "AAPL", last["AAPL"] * (1 + 0.01 * (i + 1))))
+        ticks.append((OPEN + 60 * i, "BTC-USD", last["BTC-USD"] * (1 - 0.01 * max(i - 1, 0))))
+    return pd.DataFrame(ticks, columns=["time", "ticker", "price"])
+
+
+def test_ring_buffer_keeps_the_newest_ticks():
+    buffer = RingBuffer(capacity=3)
+    assert buffer.last() is None
+    for i in range(5):
+        buffer.append(float(i), 10.0 * i)
+    times, prices = buffer.values()
+    assert list(times) == [2.0, 3.0, 4.0]
+    assert list(prices) == [20.0, 30.0, 40.0]
+    assert buffer.last() == (4.0, 40.0)
+    assert len(buffer) == 3 and buffer.count == 5
+
+
+def test_replayed_ticks_update_indicators(closes, tmp_path):
+    ticks = recorded_ticks(closes)
+    stream = QuoteStream(ReplayProvider(ticks), closes, interval=0)
+    seen = []
+    stream.listeners.append(lambda ticker, when, price: seen.append((ticker, when)))
+    asyncio.run(stream.run(polls=5))
+
+    assert stream.polls == 5
+    assert stream.buffers["AAPL"].count == 5
+    # BTC-USD's second quote repeated the first.
+    assert stream.buffers["BTC-USD"].count == 4
+
+    # Every tick landed on one new bar for the day, with the same readings
+    # as building the engine over history plus that bar from scratch.
+    final = ticks.groupby("ticker")["price"].last()
+    with_today = closes.copy()
+    with_today.loc[pd.Timestamp("2024-04-01")] = final
+    expected = IndicatorEngine(with_today)
+    assert stream.engine.index[-1] == pd.Timestamp("2024-04-01")
+    pd.testing.assert_frame_equal(stream.engine.screen(), expected.screen(), rtol=1e-9)
+    snapshot = stream.snapshot()
+    assert snapshot.loc["AAPL", "Price"] == final["AAPL"]
+    assert snapshot.loc["AAPL", "Change %"] == pytest.approx(5.0)
+
+    # Listeners hear every new tick, and not the repeated price.
+    assert len(seen) == 9
+    assert ("BTC-USD", OPEN + 60) not in seen
+
+    # Recording the buffers and replaying them gives the same stream.
+    path = tmp_path / "ticks.csv"
+    stream.save_ticks(path)
+    replay = QuoteStream(ReplayProvider.from_csv(path), closes, interval=0)
+    asyncio.run(replay.run(polls=5))
+    pd.testing.assert_frame_equal(replay.snapshot(), snapshot)
+
+
+def test_quotes_outside_a_session_revise_the_last_bar(closes):
+    stream = QuoteStream(ReplayProvider([]), closes, interval=0)
+    bars = stream.engine.lengths.copy()
+    sma = stream.engine.screen()
+    last = closes["AAPL"].dropna().iloc[-1]
+
+    # A Saturday quote at Thursday's close (Friday was a holiday) changes
+    # nothing for AAPL, while BTC-USD trades and gets a bar for the day.
+    saturday = pd.Timestamp("2024-03-30 15:00").timestamp()
+    stream.update("AAPL", saturday, last + 1e-9)
+    stream.update("BTC-USD", saturday, 70000.0)
+    assert stream.engine.last_date("AAPL") == pd.Timestamp("2024-03-28")
+    assert stream.engine.lengths[0] == bars[0]
+    assert stream.engine.last_date("BTC-USD") == pd.Timestamp("2024-03-30")
+    assert stream.engine.screen().loc["AAPL", "SMA 10/30"] == sma.loc["AAPL", "SMA 10/30"]
+
+    # A pre-open quote on Monday still revises Thursday's bar in place.
+    stream.update("AAPL", pd.Timestamp("2024-04-01 12:00").timestamp(), last * 1.02)
+    assert stream.engine.lengths[0] == bars[0]
+    revised = closes.copy()
+    revised.loc[pd.Timestamp("2024-03-28"), "AAPL"] = last * 1.02
+    revised.loc[pd.Timestamp("2024-03-30")] = [float("nan"), 70000.0]
+    pd.testing.assert_frame_equal(stream.engine.screen(), IndicatorEngine(revised).screen(), rtol=1e-9)
+
+
+def test_failed_quotes_are_reported_per_ticker(closes):
+    ticks = recorded_ticks(closes)
+    stream = QuoteStream(ReplayProvider(ticks[ticks["ticker"] == "AAPL"]), closes, interval=0)
+    assert asyncio.run(stream.poll_once()) == 1
+    assert list(stream.errors) == ["BTC-USD"]
+    assert pd.isna(stream.snapshot().loc["BTC-USD", "Updated"])
+
+
+def test_background_thread_polls_until_stopped(closes):
+    provider = ReplayProvider(recorded_ticks(closes))
+    stream = QuoteStream(provider, closes, interval=0.01).start()
+    deadline = time.monotonic() + 5
+    while not provider.exhausted() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stream.stop()
+    assert provider.exhausted()
+    assert stream.ticks("AAPL").index[0] == pd.Timestamp(OPEN, unit="s")
@@ -0,0 +1,70 @@
+# Top 50 US stocks by market cap (as of 2025, static list) + popular cryptocurrencies
+top_50_tickers = [
+    "AAPL",
+    "MSFT",
+    "GOOGL",
+    "AMZN",
+    "NVDA",
+    "META",
+    "BRK-B",
+    "TSLA",
+    "LLY",
+    "V",
+    "JPM",
+    "UNH",
+    "WMT",
+    "MA",
+    "XOM",
+    "AVGO",
+    "PG",
+    "JNJ",
+    "HD",
+    "MRK",
+    "COST",
+    "ABBV",
+    "ADBE",
+    "PEP",
+    "CVX",
+    "KO",
+    "BAC",
+    "MCD",
+    "TMO",
+    "PFE",
+    "ORCL",
+    "DIS",
+    "CSCO",
+    "ABT",
+    "ACN",
+    "DHR",
+    "LIN",
+    "VZ",
+    "NKE",
+    "WFC",
+    "INTC",
+    "TXN",
+    "MS",
+    "AMGN",
+    "NEE",
+    "PM",
+    "UNP",
+    "BMY",
+    "QCOM",
+    "IBM",
+]
+crypto_tickers = [
+    "BTC-USD",
+    "ETH-USD",
+    "SOL-USD",
+    "BNB-USD",
+    "XRP-USD",
+    "ADA-USD",
+    "DOGE-USD",
+    "AVAX-USD",
+    "DOT-USD",
+    "LINK-USD",
+    "MATIC-USD",
+    "TRX-USD",
+    "LTC-USD",
+    "BCH-USD",
+]
+all_tickers = top_50_tickers + crypto_tickers